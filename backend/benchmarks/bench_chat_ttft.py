@@ -0,0 +1,110 @@
+"""
+Benchmark time-to-first-token of follow-up turns in a long chat, per prompt layout.
+
+Runs against the local Ollama server with a synthetic chat of --turns earlier
+turns and, on every follow-up, freshly retrieved context (as RAG or a scraped
+page would add):
+- per-turn-first: retrieved context before the project system prompt and the
+  history (the layout before prompts were made prefix-stable);
+- stable-first: system prompt, history, then the retrieved context, as
+  ChatService builds prompts now.
+Each follow-up extends the history with the previous turn. Reported per turn:
+time to first token, and how many prompt tokens Ollama actually evaluated
+(the rest came from its KV cache).
+
+Both layouts use the same num_ctx and keep_alive (OLLAMA_NUM_CTX /
+OLLAMA_KEEP_ALIVE), since a changed num_ctx reloads the model.
+
+Usage (from the backend directory):
+    python benchmarks/bench_chat_ttft.py --model qwen2.5:7b [--turns 12] [--followups 4] [--message-chars 600]
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.ollama_client import OLLAMA_BASE_URL, ollama_client
+
+WORDS = ("model context cache token prompt layout history summary retrieval chunk source answer "
+         "question latency budget window project system user assistant stream").split()
+
+
+def _text(rng: random.Random, chars: int) -> str:
+    words = []
+    while sum(len(word) + 1 for word in words) < chars:
+        words.append(rng.choice(WORDS))
+    return " ".join(words)
+
+
+def _messages(layout: str, system_prompt: str, history: list, retrieved: str, question: str) -> list:
+    context = {"role": "system", "content": f"Use the following context from the user's files:\n\n{retrieved}"}
+    system = {"role": "system", "content": system_prompt}
+    if layout == "per-turn-first":
+        return [context, system, *history, {"role": "user", "content": question}]
+    return [system, *history, context, {"role": "user", "content": question}]
+
+
+def _generate(model: str, messages: list, max_tokens: int):
+    """Returns (seconds to first token, prompt tokens evaluated, response text)."""
+    payload = ollama_client._payload(model, messages, True, {"num_predict": max_tokens}, None)
+    started = time.perf_counter()
+    first_token = None
+    text = ""
+    with ollama_client.session.post(f"{OLLAMA_BASE_URL}/api/chat", json=payload, stream=True) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            if not line:
+                continue
+            body = json.loads(line)
+            content = body.get("message", {}).get("content", "")
+            if content and first_token is None:
+                first_token = time.perf_counter() - started
+            text += content
+            if body.get("done"):
+                return first_token or time.perf_counter() - started, body.get("prompt_eval_count", 0), text
+    return first_token, 0, text
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", required=True)
+    parser.add_argument("--turns", type=int, default=12)
+    parser.add_argument("--followups", type=int, default=4)
+    parser.add_argument("--message-chars", type=int, default=600)
+    parser.add_argument("--context-chars", type=int, default=2000)
+    parser.add_argument("--max-tokens", type=int, default=32)
+    args = parser.parse_args()
+
+    print(f"model {args.model}, num_ctx {ollama_client.context_window(args.model)}, "
+          f"keep_alive {ollama_client.keep_alive}\n")
+    print(f"{'layout':<16} {'turn':>4} {'ttft':>9} {'evaluated':>10}")
+    for layout in ("per-turn-first", "stable-first"):
+        rng = random.Random(0)
+        # A layout-specific system prompt keeps the other layout's cache out of the comparison
+        system_prompt = f"You are Jarvis ({layout}). Answer briefly. {_text(rng, 300)}"
+        history = []
+        for turn in range(args.turns):
+            history.append({"role": "user", "content": _text(rng, args.message_chars)})
+            history.append({"role": "assistant", "content": _text(rng, args.message_chars)})
+
+        ttfts = []
+        # Turn 0 fills the cache; the follow-ups are what a user waits for
+        for turn in range(args.followups + 1):
+            question = f"Question {turn}: {_text(rng, 80)}?"
+            messages = _messages(layout, system_prompt, history, _text(rng, args.context_chars), question)
+            ttft, evaluated, answer = _generate(args.model, messages, args.max_tokens)
+            print(f"{layout:<16} {turn:>4} {ttft * 1000:>7.0f}ms {evaluated:>10}")
+            if turn:
+                ttfts.append(ttft)
+            history.append({"role": "user", "content": question})
+            history.append({"role": "assistant", "content": answer})
+        print(f"{layout:<16} median follow-up ttft {statistics.median(ttfts) * 1000:.0f}ms\n")
+
+
+if __name__ == "__main__":
+    main()
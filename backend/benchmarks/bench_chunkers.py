@@ -0,0 +1,86 @@
+"""
+Benchmark the chunking strategies against the legacy 1000/100 character splitter.
+
+For every file under a directory (grouped by the strategy its extension maps
+to) reports chunk count, mean tokens per chunk, chunks over the embedding
+model's max sequence length and throughput in MB/s.
+
+Usage (from the backend directory):
+    python benchmarks/bench_chunkers.py <directory> [--approx]
+
+--approx counts tokens with the ~4 chars/token heuristic instead of loading
+the embedding model's tokenizer.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import settings
+from services.chunkers import EXTENSION_STRATEGIES, approximate_token_counter, get_chunker
+from services.document_parser import read_file
+
+
+def _legacy_chunks(text: str, chunk_size: int = 1000, overlap: int = 100) -> list:
+    chunks = []
+    start = 0
+    while start < len(text):
+        chunks.append(text[start:start + chunk_size])
+        start += chunk_size - overlap
+    return chunks
+
+
+def _collect(directory: str) -> dict:
+    """strategy -> [(path, ext, text)]"""
+    files = defaultdict(list)
+    for root, dirs, names in os.walk(directory):
+        dirs[:] = [d for d in dirs if not d.startswith('.') and d not in ('node_modules', 'venv', '__pycache__')]
+        for name in names:
+            ext = os.path.splitext(name)[1].lower()
+            path = os.path.join(root, name)
+            text = read_file(path, ext)
+            if text.strip():
+                files[EXTENSION_STRATEGIES.get(ext, "window")].append((path, ext, text))
+    return files
+
+
+def _run(label: str, files: list, chunk_fn, count_tokens, model_max: int):
+    size_mb = sum(len(text.encode("utf-8")) for _, _, text in files) / (1024 * 1024)
+    started = time.perf_counter()
+    chunks = [chunk for _, ext, text in files for chunk in chunk_fn(text, ext)]
+    elapsed = time.perf_counter() - started
+    counts = count_tokens(chunks) if chunks else [0]
+    over = sum(1 for c in counts if c > model_max)
+    print(f"{label:<24} chunks {len(chunks):7d}   mean tokens {statistics.mean(counts):7.1f}   "
+          f"over max {over:6d}   {size_mb / elapsed if elapsed else 0:8.2f} MB/s")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("directory")
+    parser.add_argument("--approx", action="store_true", help="Approximate token counts instead of the model tokenizer")
+    args = parser.parse_args()
+
+    if args.approx:
+        count_tokens = approximate_token_counter
+        max_tokens, model_max = settings.CHUNK_MAX_TOKENS, 256
+    else:
+        from services.rag_service import rag_service
+        count_tokens = rag_service._count_tokens
+        max_tokens, model_max = rag_service.chunk_max_tokens, rag_service.model.max_seq_length
+
+    files = _collect(args.directory)
+    for strategy, strategy_files in sorted(files.items()):
+        print(f"\n[{strategy}] {len(strategy_files)} files")
+        _run("  legacy 1000/100 chars", strategy_files, lambda text, ext: _legacy_chunks(text), count_tokens, model_max)
+        _run(f"  {strategy} {max_tokens}/{settings.CHUNK_OVERLAP_TOKENS} tokens", strategy_files,
+             lambda text, ext: get_chunker(ext, count_tokens, max_tokens, settings.CHUNK_OVERLAP_TOKENS).chunk(text),
+             count_tokens, model_max)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Benchmark embedding backends: throughput and parity with the PyTorch model.
+
+Loads the embedding model with PyTorch and with ONNX Runtime (one run per
+--onnx-files entry, e.g. the float32 export and an int8-quantized one), and
+reports chunks/s on the same chunks plus the min/mean cosine similarity of
+each backend's embeddings to PyTorch's. Use it to pick EMBEDDING_BACKEND /
+EMBEDDING_ONNX_FILE; the ONNX runs need optimum[onnxruntime].
+
+Usage (from the backend directory):
+    python benchmarks/bench_embedding_backends.py [--chunks 1000] [--model all-MiniLM-L6-v2]
+        [--onnx-files onnx/model.onnx,onnx/model_qint8_avx2.onnx]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.embedding_executor import PARITY_TEXTS, check_parity, load_embedding_model
+
+
+def _chunks(n: int, rng: random.Random) -> list:
+    words = [f"{rng.choice('bcdfghklmnprst')}{rng.choice('aeiou')}{rng.choice('nrstl')}{i}" for i in range(3000)]
+    return [" ".join(rng.choices(words, k=rng.choice([rng.randint(150, 200), rng.randint(10, 120)]))) for _ in range(n)]
+
+
+def _throughput(model, chunks: list, rounds: int = 2) -> float:
+    model.encode(chunks[:32])
+    best = 0.0
+    for _ in range(rounds):
+        started = time.perf_counter()
+        model.encode(chunks, batch_size=32)
+        best = max(best, len(chunks) / (time.perf_counter() - started))
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=1000)
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    parser.add_argument("--onnx-files", default="onnx/model.onnx,onnx/model_qint8_avx2.onnx")
+    args = parser.parse_args()
+
+    chunks = _chunks(args.chunks, random.Random(0))
+    # Parity over real-looking text plus a sample of the benchmark chunks
+    parity_texts = PARITY_TEXTS + chunks[:50]
+
+    reference = load_embedding_model(args.model)
+    print(f"{'backend':<40} {'chunks/s':>10} {'min cos':>8} {'mean cos':>9}")
+    print(f"{'torch':<40} {_throughput(reference, chunks):>10.1f} {1.0:>8.4f} {1.0:>9.4f}")
+    for onnx_file in args.onnx_files.split(","):
+        label = f"onnx {onnx_file}"
+        try:
+            model = load_embedding_model(args.model, "onnx", onnx_file)
+        except Exception as e:
+            print(f"{label:<40} failed to load: {e}")
+            continue
+        parity = check_parity(model, reference, parity_texts)
+        print(f"{label:<40} {_throughput(model, chunks):>10.1f} {parity['min_cosine']:>8.4f} {parity['mean_cosine']:>9.4f}")
+
+
+if __name__ == "__main__":
+    main()
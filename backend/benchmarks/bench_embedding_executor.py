@@ -0,0 +1,101 @@
+"""
+Benchmark embedding throughput (chunks/s) per encode configuration.
+
+Encodes the same chunks with:
+- the previous ingestion path: `model.encode` on unsorted batches of 100;
+- the EmbeddingExecutor in-process with fixed and autotuned batch sizes;
+- the EmbeddingExecutor with 2..N worker processes.
+
+Chunks are the files under --dir, chunked like ingestion does, or synthetic
+text of mixed length (as produced by the token-budgeted chunkers) when no
+directory is given.
+
+Usage (from the backend directory):
+    python benchmarks/bench_embedding_executor.py [--dir <directory>] [--chunks 2000] [--workers 1,2,4]
+        [--model all-MiniLM-L6-v2]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from constants import VALID_EXTENSIONS
+from services.chunkers import approximate_token_counter, get_chunker
+from services.document_parser import read_file
+from services.embedding_executor import EmbeddingExecutor
+
+
+def _synthetic_chunks(n: int, rng: random.Random) -> list:
+    words = [f"{rng.choice('bcdfghklmnprst')}{rng.choice('aeiou')}{rng.choice('nrstl')}{i}" for i in range(3000)]
+    # Mostly full chunks plus a tail of short ones (last chunks of files, CSV rows, small functions)
+    return [
+        " ".join(rng.choices(words, k=rng.choice([rng.randint(150, 200), rng.randint(10, 120)])))
+        for _ in range(n)
+    ]
+
+
+def _directory_chunks(directory: str, limit: int) -> list:
+    chunks = []
+    for root, dirs, names in os.walk(directory):
+        for name in names:
+            ext = os.path.splitext(name)[1].lower()
+            if ext not in VALID_EXTENSIONS:
+                continue
+            text = read_file(os.path.join(root, name), ext)
+            chunks.extend(get_chunker(ext, approximate_token_counter, 240, 32).chunk(text))
+            if len(chunks) >= limit:
+                return chunks[:limit]
+    return chunks
+
+
+def _run(label: str, encode, chunks: list, rounds: int):
+    encode(chunks[:64])  # load models / start workers
+    best = 0.0
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for start in range(0, len(chunks), 512):
+            encode(chunks[start:start + 512])
+        best = max(best, len(chunks) / (time.perf_counter() - started))
+    print(f"{label:<36} {best:>10.1f} chunks/s")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dir")
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--workers", default=f"1,2,{os.cpu_count() or 1}")
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    parser.add_argument("--rounds", type=int, default=2)
+    args = parser.parse_args()
+
+    chunks = _directory_chunks(args.dir, args.chunks) if args.dir else _synthetic_chunks(args.chunks, random.Random(0))
+    print(f"{len(chunks)} chunks, mean {sum(map(len, chunks)) / len(chunks):.0f} chars, {os.cpu_count()} CPUs\n")
+
+    from sentence_transformers import SentenceTransformer
+    model = SentenceTransformer(args.model, device="cpu")
+
+    def baseline(texts):
+        for start in range(0, len(texts), 100):
+            model.encode(texts[start:start + 100])
+
+    _run("model.encode, unsorted batches of 100", baseline, chunks, args.rounds)
+    for batch_size in (32, 0):
+        executor = EmbeddingExecutor(lambda: model, args.model, workers=1, batch_size=batch_size)
+        _run(f"executor in-process, batch {batch_size or 'auto'}", executor.encode, chunks, args.rounds)
+        if executor.tuner:
+            print(f"  autotuned batch size {executor.batch_size}")
+
+    for workers in sorted({int(w) for w in args.workers.split(",")} - {1}):
+        executor = EmbeddingExecutor(lambda: model, args.model, workers=workers, batch_size=0)
+        try:
+            _run(f"executor {workers} processes, batch auto", executor.encode, chunks, args.rounds)
+            print(f"  autotuned batch size {executor.batch_size}")
+        finally:
+            executor.close()
+
+
+if __name__ == "__main__":
+    main()
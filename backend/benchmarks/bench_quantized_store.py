@@ -0,0 +1,96 @@
+"""
+Benchmark quantized vector storage: memory, recall and query latency.
+
+Builds int8 and float16 NumpyVectorStores over the same clustered, unit-norm
+vectors (MiniLM-like, 384 dims) and compares them with exact float32 search:
+bytes scanned per query (what stays resident), recall@k of the quantized scan
+alone and after exact rescoring, and query latency.
+
+Usage (from the backend directory):
+    python benchmarks/bench_quantized_store.py [--chunks 100000] [--queries 200] [--k 10]
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.numpy_store import PRECISIONS, NumpyVectorStore
+
+
+def _vectors(n: int, dim: int, rng) -> np.ndarray:
+    centers = rng.normal(size=(max(10, n // 250), dim))
+    vectors = centers[rng.integers(0, len(centers), n)] + 0.7 * rng.normal(size=(n, dim))
+    vectors = vectors.astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def _exact_top_k(vectors: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    norms = np.einsum("ij,ij->i", vectors, vectors)
+    top = []
+    for start in range(0, len(queries), 50):
+        distances = norms[None, :] - 2 * queries[start:start + 50] @ vectors.T
+        top.append(np.argsort(distances, axis=1)[:, :k])
+    return np.concatenate(top)
+
+
+def _recall(found, exact: np.ndarray) -> float:
+    return statistics.mean(len(set(f) & set(e)) / len(e) for f, e in zip(found, exact))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vectors = _vectors(args.chunks, args.dim, rng)
+    # Paraphrase-like queries: a chunk vector moved by noise of ~0.3 of its norm
+    queries = vectors[rng.integers(0, args.chunks, args.queries)] + 0.3 / np.sqrt(args.dim) * rng.normal(size=(args.queries, args.dim))
+    queries = (queries / np.linalg.norm(queries, axis=1, keepdims=True)).astype(np.float32)
+    exact = _exact_top_k(vectors, queries, args.k)
+    ids = [str(i) for i in range(args.chunks)]
+
+    print(f"{args.chunks} chunks x {args.dim} dims, float32 matrix {vectors.nbytes / 1e6:.1f} MB\n")
+    for precision in PRECISIONS:
+        tmp = tempfile.mkdtemp()
+        try:
+            store = NumpyVectorStore(os.path.join(tmp, "store"), "bench", precision=precision)
+            started = time.perf_counter()
+            for start in range(0, args.chunks, 5000):
+                store.upsert(ids=ids[start:start + 5000], embeddings=vectors[start:start + 5000])
+            ingest_s = time.perf_counter() - started
+
+            slot_ids = {slot: int(doc_id) for doc_id, slot in store._slots.items()}
+            scan_only = [[slot_ids[int(slot)] for slot in slots] for slots in store._scan(queries, args.k)]
+            timings = []
+            found = []
+            for query in queries:
+                started = time.perf_counter()
+                result = store.query([query], n_results=args.k)
+                timings.append((time.perf_counter() - started) * 1000)
+                found.append([int(doc_id) for doc_id in result["ids"][0]])
+
+            # Size exactly to the live rows, as after compaction
+            store.compact()
+            stats = store.stats()
+            print(f"[{precision}] ingest {args.chunks / ingest_s:8.0f} chunks/s   "
+                  f"scanned {stats['scanned_bytes'] / 1e6:7.1f} MB ({vectors.nbytes / stats['scanned_bytes']:.1f}x smaller)")
+            print(f"  recall@{args.k} scan only {_recall(scan_only, exact):.4f}   rescored {_recall(found, exact):.4f}")
+            print(f"  query p50 {statistics.median(timings):7.2f} ms   mean {statistics.mean(timings):7.2f} ms\n")
+            store.drop()
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Benchmark the RAG query hot path (what every chat turn pays before the first token).
+
+Compares the uncached path (get_or_create_collection + count() + encode per query)
+with RAGService.query_project using cached collection handles, cached counts and
+the query-embedding LRU.
+
+Usage (from the backend directory):
+    python benchmarks/bench_query_path.py [--chunks 5000] [--queries 200]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.rag_service import rag_service
+
+BENCH_PROJECT_ID = -1001
+
+WORDS = "index vector chunk query model embed token source file parse cache latency prompt context".split()
+
+
+def _sentence(n: int = 40) -> str:
+    return " ".join(random.choice(WORDS) for _ in range(n))
+
+
+def _populate(chunks: int):
+    collection = rag_service._get_collection(BENCH_PROJECT_ID)
+    batch = 256
+    for start in range(0, chunks, batch):
+        docs = [_sentence() for _ in range(min(batch, chunks - start))]
+        collection.upsert(
+            ids=[f"bench:{start + i}" for i in range(len(docs))],
+            documents=docs,
+            embeddings=rag_service.model.encode(docs).tolist(),
+            metadatas=[{"source": "bench", "project_id": BENCH_PROJECT_ID}] * len(docs),
+        )
+
+
+def _uncached_query(query_text: str):
+    collection = rag_service.chroma_client.get_or_create_collection(name=f"project_{BENCH_PROJECT_ID}")
+    if collection.count() == 0:
+        return []
+    embedding = rag_service.model.encode([query_text]).tolist()
+    return collection.query(query_embeddings=embedding, n_results=3)
+
+
+def _measure(fn, queries) -> list:
+    timings = []
+    for q in queries:
+        started = time.perf_counter()
+        fn(q)
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def _report(label: str, timings: list):
+    timings = sorted(timings)
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(f"{label:<28} mean {statistics.mean(timings):7.2f} ms   p50 {statistics.median(timings):7.2f} ms   p95 {p95:7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--distinct", type=int, default=20, help="Distinct questions; the rest are repeats")
+    args = parser.parse_args()
+
+    random.seed(0)
+    rag_service.delete_project_index(BENCH_PROJECT_ID)
+    try:
+        _populate(args.chunks)
+        questions = [_sentence(12) for _ in range(args.distinct)]
+        queries = [random.choice(questions) for _ in range(args.queries)]
+
+        # Warm the model once so neither side pays the load
+        rag_service.model.encode(["warm up"])
+
+        _report("before (uncached)", _measure(_uncached_query, queries))
+        _report("after (query_project)", _measure(lambda q: rag_service.query_project(BENCH_PROJECT_ID, q), queries))
+    finally:
+        rag_service.delete_project_index(BENCH_PROJECT_ID)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Compare vector-store backends across corpus sizes: ingest throughput and query latency.
+
+For each corpus size, loads the same clustered unit-norm vectors (MiniLM-like,
+384 dims) into a Chroma collection and into NumPy stores (float32, int8), then
+times single-query lookups. Use the output to pick RAG_VECTOR_STORAGE / the
+per-project storage mode.
+
+Usage (from the backend directory):
+    python benchmarks/bench_vector_stores.py [--sizes 1000,10000,50000] [--queries 100]
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.numpy_store import NumpyVectorStore
+from services.vector_store import ChromaVectorStore
+
+
+def _vectors(n: int, dim: int, rng) -> np.ndarray:
+    centers = rng.normal(size=(max(10, n // 250), dim))
+    vectors = (centers[rng.integers(0, len(centers), n)] + 0.7 * rng.normal(size=(n, dim))).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def _bench(store, vectors: np.ndarray, queries: np.ndarray, k: int, batch: int = 1000) -> tuple:
+    ids = [f"chunk:{i}" for i in range(len(vectors))]
+    started = time.perf_counter()
+    for start in range(0, len(vectors), batch):
+        store.upsert(
+            ids=ids[start:start + batch],
+            embeddings=vectors[start:start + batch],
+            documents=[f"document {i}" for i in range(start, min(start + batch, len(vectors)))],
+            metadatas=[{"source_id": i % 5} for i in range(start, min(start + batch, len(vectors)))],
+        )
+    ingest_rate = len(vectors) / (time.perf_counter() - started)
+
+    store.query([queries[0]], n_results=k)  # warm caches / load the index
+    timings = []
+    for query in queries:
+        started = time.perf_counter()
+        store.query([query], n_results=k)
+        timings.append((time.perf_counter() - started) * 1000)
+    return ingest_rate, statistics.median(timings), sorted(timings)[int(len(timings) * 0.95) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="1000,10000,50000")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--k", type=int, default=12)
+    args = parser.parse_args()
+
+    import chromadb
+
+    rng = np.random.default_rng(0)
+    print(f"{'size':>8} {'backend':<10} {'ingest/s':>10} {'p50 ms':>8} {'p95 ms':>8}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        vectors = _vectors(size, args.dim, rng)
+        queries = vectors[rng.integers(0, size, args.queries)]
+        tmp = tempfile.mkdtemp()
+        try:
+            client = chromadb.PersistentClient(path=os.path.join(tmp, "chroma"))
+            backends = [
+                ("chroma", ChromaVectorStore(client, os.path.join(tmp, "chroma"), "bench")),
+                ("numpy", NumpyVectorStore(os.path.join(tmp, "float32"), "bench", precision="float32")),
+                ("int8", NumpyVectorStore(os.path.join(tmp, "int8"), "bench", precision="int8")),
+            ]
+            for label, store in backends:
+                ingest_rate, p50, p95 = _bench(store, vectors, queries, args.k)
+                print(f"{size:>8} {label:<10} {ingest_rate:>10.0f} {p50:>8.2f} {p95:>8.2f}")
+                store.drop()
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Load test: how chat streams scale with concurrency, per streaming path.
+
+Starts a fake Ollama server that behaves like a local model server: it
+generates for at most --server-parallel requests at once (Ollama's
+OLLAMA_NUM_PARALLEL), queues the rest in arrival order, and streams --tokens
+tokens with --token-delay seconds between them. For every number of
+concurrent streams it runs:
+- sync: `OllamaClient.chat` iterated the way Starlette serves a sync
+  generator (every next() in the threadpool, as the send_message route did),
+  with no generation limit, like that route had;
+- async: `OllamaClient.achat` iterated on the event loop, through the
+  per-model limiter capped at --max-concurrent (OLLAMA_MAX_CONCURRENT_PER_MODEL
+  by default), as the app runs it.
+The sync path is not given a limit: a stream waiting for a slot would hold a
+threadpool thread, and once waiters fill the threadpool (40 threads) the
+streams holding slots can no longer advance.
+
+Reported per run: wall time, tokens/s, time to first token (p50/p95/p99)
+and how long a trivial sync endpoint (like /api/tools/todos) waits for a
+threadpool thread meanwhile (probe p50/max). Both paths get the same
+generation throughput from the server; what differs is what the waiting
+costs the rest of the app.
+
+Usage (from the backend directory):
+    python benchmarks/load_chat_streams.py [--streams 1,10,40,80,160,320] [--tokens 20] [--token-delay 0.01]
+        [--server-parallel 4] [--max-concurrent 4]
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start_fake_ollama(port: int, tokens: int, token_delay: float, parallel: int):
+    import uvicorn
+    from starlette.applications import Starlette
+    from starlette.responses import StreamingResponse
+    from starlette.routing import Route
+
+    slots = {}
+
+    async def chat(request):
+        # Created on the server's own loop; asyncio.Semaphore wakes waiters in FIFO order
+        if "semaphore" not in slots:
+            slots["semaphore"] = asyncio.Semaphore(parallel)
+
+        async def body():
+            async with slots["semaphore"]:
+                for i in range(tokens):
+                    await asyncio.sleep(token_delay)
+                    yield json.dumps({"message": {"role": "assistant", "content": f"tok{i} "}, "done": False}) + "\n"
+            yield json.dumps({"message": {"role": "assistant", "content": ""}, "done": True}) + "\n"
+        return StreamingResponse(body(), media_type="application/x-ndjson")
+
+    config = uvicorn.Config(Starlette(routes=[Route("/api/chat", chat, methods=["POST"])]),
+                            host="127.0.0.1", port=port, log_level="warning", backlog=4096)
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+async def _sync_stream(client) -> tuple:
+    from starlette.concurrency import iterate_in_threadpool
+    started = time.perf_counter()
+    first_token = None
+    tokens = 0
+    async for _ in iterate_in_threadpool(client.chat("fake", [{"role": "user", "content": "hi"}])):
+        if first_token is None:
+            first_token = time.perf_counter() - started
+        tokens += 1
+    return tokens, first_token
+
+
+async def _async_stream(client) -> tuple:
+    started = time.perf_counter()
+    first_token = None
+    tokens = 0
+    async for _ in client.achat("fake", [{"role": "user", "content": "hi"}]):
+        if first_token is None:
+            first_token = time.perf_counter() - started
+        tokens += 1
+    return tokens, first_token
+
+
+async def _probe(stop: asyncio.Event, latencies: list):
+    from starlette.concurrency import run_in_threadpool
+    while not stop.is_set():
+        started = time.perf_counter()
+        await run_in_threadpool(lambda: None)
+        latencies.append(time.perf_counter() - started)
+        await asyncio.sleep(0.05)
+
+
+def _percentile(values: list, p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+
+async def _run(label: str, stream, client, n: int):
+    stop = asyncio.Event()
+    latencies = []
+    probe = asyncio.create_task(_probe(stop, latencies))
+    started = time.perf_counter()
+    results = await asyncio.gather(*(stream(client) for _ in range(n)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await probe
+    tokens = sum(count for count, _ in results)
+    ttfts = [ttft * 1000 for _, ttft in results if ttft is not None]
+    print(f"{label:<6} {n:>7} {elapsed:>8.2f}s {tokens / elapsed:>9.0f} "
+          f"{_percentile(ttfts, 50):>8.0f}ms {_percentile(ttfts, 95):>7.0f}ms {_percentile(ttfts, 99):>7.0f}ms "
+          f"{statistics.median(latencies) * 1000:>8.1f}ms {max(latencies) * 1000:>8.1f}ms")
+
+
+async def _main(args):
+    from services.ollama_client import OllamaClient
+    sync_client = OllamaClient(max_concurrent_per_model=0)
+    async_client = OllamaClient(max_concurrent_per_model=args.max_concurrent)
+    generation = args.tokens * args.token_delay
+    print(f"one generation: {args.tokens} tokens x {args.token_delay}s = {generation:.2f}s; "
+          f"server runs {args.server_parallel} at once; async limiter: {args.max_concurrent or 'unlimited'} per model\n")
+    print(f"{'path':<6} {'streams':>7} {'wall':>9} {'tokens/s':>9} "
+          f"{'ttft p50':>10} {'p95':>9} {'p99':>9} {'probe p50':>10} {'max':>10}")
+    try:
+        # Open the connection pools (and the async client) before measuring
+        await _sync_stream(sync_client)
+        await _async_stream(async_client)
+        for n in [int(s) for s in args.streams.split(",")]:
+            for label, stream, client in (("sync", _sync_stream, sync_client), ("async", _async_stream, async_client)):
+                await _run(label, stream, client, n)
+    finally:
+        await sync_client.aclose()
+        await async_client.aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--streams", default="1,10,40,80,160,320")
+    parser.add_argument("--tokens", type=int, default=20)
+    parser.add_argument("--token-delay", type=float, default=0.01)
+    parser.add_argument("--server-parallel", type=int, default=None,
+                        help="generations the fake server runs at once (default: OLLAMA_MAX_CONCURRENT_PER_MODEL)")
+    parser.add_argument("--max-concurrent", type=int, default=None,
+                        help="per-model limit of the async client, 0 for none (default: OLLAMA_MAX_CONCURRENT_PER_MODEL)")
+    args = parser.parse_args()
+
+    port = _free_port()
+    # Point the client at the fake server (read by config at import time)
+    os.environ["OLLAMA_BASE_URL"] = f"http://127.0.0.1:{port}"
+    from config import settings
+    if args.server_parallel is None:
+        args.server_parallel = settings.OLLAMA_MAX_CONCURRENT_PER_MODEL
+    if args.max_concurrent is None:
+        args.max_concurrent = settings.OLLAMA_MAX_CONCURRENT_PER_MODEL
+    _start_fake_ollama(port, args.tokens, args.token_delay, args.server_parallel)
+    asyncio.run(_main(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -10,12 +10,93 @@ class Settings:
     # LLM Settings
     DIGEST_LLM_MODEL = os.getenv("DIGEST_LLM_MODEL", "qwen2.5:14b")
     OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+    # Seconds to connect to Ollama, and to wait for the next bytes of a response (0 = no limit)
+    OLLAMA_CONNECT_TIMEOUT = float(os.getenv("OLLAMA_CONNECT_TIMEOUT", "10"))
+    OLLAMA_READ_TIMEOUT = float(os.getenv("OLLAMA_READ_TIMEOUT", "300"))
+    # Generations sent to Ollama at once per model (0 = no limit); more wait in a FIFO queue.
+    # Match the server's OLLAMA_NUM_PARALLEL
+    OLLAMA_MAX_CONCURRENT_PER_MODEL = int(os.getenv("OLLAMA_MAX_CONCURRENT_PER_MODEL", "4"))
+    # Keep-alive connections to Ollama kept open
+    OLLAMA_POOL_SIZE = int(os.getenv("OLLAMA_POOL_SIZE", "10"))
+    # Seconds the web search, URL scrapes and RAG retrieval of a chat turn may take
+    # together (they run concurrently); late ones are left out of the prompt
+    CONTEXT_DEADLINE_SECONDS = float(os.getenv("CONTEXT_DEADLINE_SECONDS", "8"))
+    # Context window: sent to Ollama as num_ctx with every request (capped by the model's own
+    # context length; changing it per request would make Ollama reload the model) and used
+    # as the chat prompt budget, minus the tokens kept free for the reply
+    OLLAMA_NUM_CTX = int(os.getenv("OLLAMA_NUM_CTX", "4096"))
+    # How long Ollama keeps a model and its prompt cache loaded after a request
+    # (duration like "30m", or seconds; -1 = forever, empty = server default)
+    OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+    CHAT_RESPONSE_TOKENS = int(os.getenv("CHAT_RESPONSE_TOKENS", "1024"))
+    # Earlier turns that no longer fit are folded into a per-chat summary once this many are pending
+    CHAT_SUMMARY_MIN_MESSAGES = int(os.getenv("CHAT_SUMMARY_MIN_MESSAGES", "4"))
 
     # Paths
     # Ensure these are relative to where the app is run (usually backend dir)
     DATA_DIR = os.getenv("DATA_DIR", "../data")
     STATIC_DIR = os.getenv("STATIC_DIR", "../static")
     
+    # RAG Ingestion
+    # Chunks embedded and upserted per batch; bounds ingestion memory
+    INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "100"))
+    # Embedding encode processes (1 = in-process, 0 = one per CPU core) and texts per
+    # encode batch (0 = autotune on measured throughput)
+    EMBED_WORKERS = int(os.getenv("EMBED_WORKERS", "1"))
+    EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "0"))
+    # Embedding runtime: torch, or onnx (ONNX Runtime, needs optimum[onnxruntime]);
+    # EMBEDDING_ONNX_FILE picks an export in the model repo, e.g. an int8-quantized one
+    EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+    EMBEDDING_ONNX_FILE = os.getenv("EMBEDDING_ONNX_FILE", "")
+    # Minimum cosine similarity to the PyTorch model's embeddings a non-torch backend
+    # must reach when loaded, or torch is used instead; 0 skips the check
+    EMBEDDING_PARITY_MIN = float(os.getenv("EMBEDDING_PARITY_MIN", "0.99"))
+    # Chunk size in embedding-model tokens (capped at the model's max sequence length) and overlap
+    CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", "240"))
+    CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "32"))
+    # Processes used to extract PDF/DOCX text; 0 means one per CPU core, 1 parses inline
+    INGEST_PARSE_WORKERS = int(os.getenv("INGEST_PARSE_WORKERS", "0"))
+    # Seconds a single file may spend in the parser before it is skipped
+    INGEST_PARSE_TIMEOUT = float(os.getenv("INGEST_PARSE_TIMEOUT", "120"))
+    # Ingestion jobs run at once (different projects only; a project's jobs run in order)
+    INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "1"))
+    # Attempts per ingestion job, and the delay before the first retry (doubles per retry)
+    INGEST_MAX_ATTEMPTS = int(os.getenv("INGEST_MAX_ATTEMPTS", "3"))
+    INGEST_RETRY_BACKOFF = float(os.getenv("INGEST_RETRY_BACKOFF", "30"))
+    # Load the embedding model and Chroma client in the background at startup
+    RAG_WARMUP = os.getenv("RAG_WARMUP", "true").lower() == "true"
+    # Fuse BM25 lexical matches with vector neighbours in query_project
+    RAG_HYBRID_SEARCH = os.getenv("RAG_HYBRID_SEARCH", "true").lower() == "true"
+    # Select RAG results by maximal marginal relevance out of POOL_FACTOR x as many
+    # candidates (skips near-duplicate chunks); LAMBDA 1 = relevance only, 0 = diversity only
+    RAG_MMR = os.getenv("RAG_MMR", "false").lower() == "true"
+    RAG_MMR_LAMBDA = float(os.getenv("RAG_MMR_LAMBDA", "0.7"))
+    RAG_MMR_POOL_FACTOR = int(os.getenv("RAG_MMR_POOL_FACTOR", "3"))
+    # Return consecutive chunks of the same file as one result, without their overlap
+    RAG_MERGE_ADJACENT = os.getenv("RAG_MERGE_ADJACENT", "true").lower() == "true"
+    # Rerank retrieved candidates with a local cross-encoder
+    RAG_RERANK = os.getenv("RAG_RERANK", "false").lower() == "true"
+    RAG_RERANK_MODEL = os.getenv("RAG_RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+    # Candidates scored per query, and the time they may take before falling back to retrieval order
+    RAG_RERANK_CANDIDATES = int(os.getenv("RAG_RERANK_CANDIDATES", "30"))
+    RAG_RERANK_BUDGET_MS = float(os.getenv("RAG_RERANK_BUDGET_MS", "250"))
+    # Vector storage for new projects: chroma, numpy (in-process brute force), or
+    # int8/float16 (NumPy with quantized vectors, for large projects)
+    RAG_VECTOR_STORAGE = os.getenv("RAG_VECTOR_STORAGE", "chroma")
+    # Recent query embeddings kept in memory for repeated/regenerated questions
+    QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "256"))
+    # Size cap of the on-disk embedding cache shared across projects; 0 disables it
+    EMBEDDING_CACHE_MAX_MB = int(os.getenv("EMBEDDING_CACHE_MAX_MB", "1024"))
+    # Size cap of the on-disk cache of text extracted from PDF/DOCX files; 0 disables it
+    TEXT_CACHE_MAX_MB = int(os.getenv("TEXT_CACHE_MAX_MB", "512"))
+    # Watched knowledge sources: a batch of changes is re-indexed once no change
+    # arrived for DEBOUNCE_MS, or after MAX_BATCH_MS of continuous changes
+    SOURCE_WATCH_DEBOUNCE_MS = int(os.getenv("SOURCE_WATCH_DEBOUNCE_MS", "1000"))
+    SOURCE_WATCH_MAX_BATCH_MS = int(os.getenv("SOURCE_WATCH_MAX_BATCH_MS", "10000"))
+    # Poll instead of using OS change notifications (e.g. network drives, WSL mounts)
+    SOURCE_WATCH_POLLING = os.getenv("SOURCE_WATCH_POLLING", "false").lower() == "true"
+    SOURCE_WATCH_POLL_INTERVAL_MS = int(os.getenv("SOURCE_WATCH_POLL_INTERVAL_MS", "2000"))
+
     # Server Settings
     _origins_str = os.getenv("ALLOWED_ORIGINS", "http://localhost:5173,http://localhost:3000")
     ALLOWED_ORIGINS = [origin.strip() for origin in _origins_str.split(",") if origin.strip()]
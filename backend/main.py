@@ -1,13 +1,19 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import os
-from database import engine, Base
+import threading
+from database import engine, Base, add_missing_columns
 from routers import models, chat, projects, knowledge, tools
 from config import settings
+from services.rag_service import rag_service
+from services.source_watcher import source_watcher
+from services.job_queue import job_queue
+from services.ollama_client import ollama_client
 
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
+add_missing_columns()
 
 from fastapi.staticfiles import StaticFiles
 
@@ -35,9 +41,28 @@ app.include_router(tools.router)
 
 @app.get("/")
 def read_root():
-    return {"message": "Jarvis Backend is running"}
+    return {"message": "Jarvis Backend is running", "rag_ready": rag_service.is_ready}
 
 @app.on_event("startup")
 def startup_event():
     # Ensure data directory exists
     os.makedirs(settings.DATA_DIR, exist_ok=True)
+
+    # Load the embedding model without blocking requests that don't need it
+    if settings.RAG_WARMUP:
+        threading.Thread(target=rag_service.warm_up, daemon=True).start()
+
+    # Resume ingestion jobs a previous run left unfinished
+    job_queue.start()
+
+    # Re-index watched sources' offline changes and keep watching them
+    knowledge.resume_watched_sources()
+
+@app.on_event("shutdown")
+def shutdown_event():
+    source_watcher.stop_all()
+    job_queue.stop()
+
+@app.on_event("shutdown")
+async def close_http_clients():
+    await ollama_client.aclose()
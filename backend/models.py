@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Boolean
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from database import Base
@@ -24,6 +24,9 @@ class Chat(Base):
     project_id = Column(Integer, ForeignKey("projects.id"))
     title = Column(String, nullable=True) # Auto-generated or user set
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Rolling summary of the turns that no longer fit the prompt, up to and including summary_message_id
+    summary = Column(Text, nullable=True)
+    summary_message_id = Column(Integer, nullable=True)
 
     project = relationship("Project", back_populates="chats")
     messages = relationship("Message", back_populates="chat", cascade="all, delete-orphan")
@@ -47,5 +50,22 @@ class KnowledgeSource(Base):
     path = Column(String, nullable=False)
     status = Column(String, default="pending") # pending, indexed, error
     last_indexed = Column(DateTime, nullable=True)
+    watch = Column(Boolean, default=False, server_default="0") # re-index changed files live
+    ingest_stats = Column(Text, nullable=True) # JSON counters/timings of the latest ingestion run
 
     project = relationship("Project", back_populates="knowledge_sources")
+
+class IngestJob(Base):
+    __tablename__ = "ingest_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    project_id = Column(Integer, index=True)
+    source_id = Column(Integer, nullable=True) # None for ad-hoc files (e.g. digest papers)
+    path = Column(String, nullable=False)
+    paths = Column(Text, nullable=True) # JSON list of changed files; None = the whole source
+    status = Column(String, default="queued", index=True) # queued, running, done, failed
+    attempts = Column(Integer, default=0)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    run_after = Column(DateTime, default=datetime.utcnow) # retry backoff
+    finished_at = Column(DateTime, nullable=True)
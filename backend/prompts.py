@@ -41,3 +41,16 @@ Research Papers:
 Tech Blogs:
 {tech_blogs}
 """
+
+CHAT_SUMMARY_PROMPT = """
+You maintain a running summary of a conversation between a user and an AI assistant.
+Update the summary with the new messages below. Keep facts, decisions, names, numbers,
+open questions and the user's preferences; drop small talk. Write at most 200 words
+and reply with the updated summary only.
+
+Current summary:
+{summary}
+
+New messages:
+{messages}
+"""
@@ -123,7 +123,7 @@ def update_chat(chat_id: int, chat_update: schemas.ChatCreate, db: Session = Dep
     return chat
 
 @router.post("/{chat_id}/message")
-def send_message(chat_id: int, request: schemas.ChatRequest, db: Session = Depends(get_db)) -> StreamingResponse:
+async def send_message(chat_id: int, request: schemas.ChatRequest, db: Session = Depends(get_db)) -> StreamingResponse:
     """
     Send a message to the chat and stream the AI response.
 
@@ -147,7 +147,7 @@ def send_message(chat_id: int, request: schemas.ChatRequest, db: Session = Depen
 
     try:
         # Delegate to service
-        response_generator = chat_service.process_message(
+        response_generator = await chat_service.process_message(
             db=db,
             chat_id=chat_id,
             message_content=last_msg.content,
@@ -1,54 +1,60 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+import asyncio
+import json
 from database import get_db
 import models
 import schemas
-from datetime import datetime
 from services.rag_service import rag_service
+from services.source_watcher import source_watcher
+from services.job_queue import job_queue
 
 router = APIRouter(
     prefix="/api/projects",
     tags=["knowledge"]
 )
 
-def ingest_background(project_id: int, source_id: int, path: str, db: Session):
-    # This runs in background
-    # 1. Update status to indexing
-    # We need a new session for background task if we want to be safe, 
-    # but here we might just rely on the service updating status if we passed DB.
-    # Actually rag_service is independent of SQL DB (uses Chroma).
-    # We update SQL DB status here.
-    
-    # Re-create session since the request session is closed
+def _source_progress(source: models.KnowledgeSource) -> Optional[dict]:
+    """Counters/timings of the source's running or latest ingestion (persisted ones after a restart)."""
+    progress = rag_service.ingest_progress(source.project_id, source.path)
+    if progress is None and source.ingest_stats:
+        progress = json.loads(source.ingest_stats)
+    return progress
+
+def _source_response(source: models.KnowledgeSource) -> schemas.KnowledgeSource:
+    response = schemas.KnowledgeSource.model_validate(source)
+    response.progress = _source_progress(source)
+    return response
+
+def watch_source(project_id: int, source_id: int, path: str):
+    """Re-index a source's files as they change on disk."""
+    source_watcher.watch(
+        source_id, path, lambda changed: job_queue.enqueue(project_id, path, source_id=source_id, paths=changed)
+    )
+
+def resume_watched_sources():
+    """
+    Restart the watches of sources with watch mode enabled (e.g. at startup) and
+    catch up on changes made while they were not watched.
+    """
     from database import SessionLocal
     local_db = SessionLocal()
     try:
-        source = local_db.query(models.KnowledgeSource).filter(models.KnowledgeSource.id == source_id).first()
-        if source:
-            source.status = "indexing"
-            local_db.commit()
-            
-            # 2. Run Ingestion
-            rag_service.ingest_source(project_id, path)
-            
-            # 3. Update status to indexed
-            source.status = "indexed"
-            source.last_indexed = datetime.utcnow()
-            local_db.commit()
-    except Exception as e:
-        print(f"Ingestion error: {e}")
-        if source:
-            source.status = "error"
-            local_db.commit()
+        sources = local_db.query(models.KnowledgeSource).filter(models.KnowledgeSource.watch == True).all()
+        watched = [(source.project_id, source.id, source.path) for source in sources]
     finally:
         local_db.close()
 
+    for project_id, source_id, path in watched:
+        watch_source(project_id, source_id, path)
+        job_queue.enqueue(project_id, path, source_id=source_id)
+
 @router.post("/{project_id}/sources", response_model=schemas.KnowledgeSource)
 def add_knowledge_source(
     project_id: int, 
     source_data: schemas.KnowledgeSourceCreate, 
-    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db)
 ):
     project = db.query(models.Project).filter(models.Project.id == project_id).first()
@@ -61,21 +67,26 @@ def add_knowledge_source(
         models.KnowledgeSource.path == source_data.path
     ).first()
     if existing:
-        return existing
+        return _source_response(existing)
 
     new_source = models.KnowledgeSource(
         project_id=project_id,
         path=source_data.path,
-        status="pending"
+        status="pending",
+        watch=source_data.watch
     )
     db.add(new_source)
     db.commit()
     db.refresh(new_source)
 
-    # Trigger background ingestion
-    background_tasks.add_task(ingest_background, project_id, new_source.id, new_source.path, db)
+    # Watch before the initial ingestion so edits made meanwhile are not missed
+    if new_source.watch:
+        watch_source(project_id, new_source.id, new_source.path)
+
+    # Queue the ingestion (runs on the ingestion workers, survives restarts)
+    job_queue.enqueue(project_id, new_source.path, source_id=new_source.id)
 
-    return new_source
+    return _source_response(new_source)
 
 @router.get("/{project_id}/sources", response_model=List[schemas.KnowledgeSource])
 def get_knowledge_sources(project_id: int, db: Session = Depends(get_db)):
@@ -84,7 +95,55 @@ def get_knowledge_sources(project_id: int, db: Session = Depends(get_db)):
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
         
-    return db.query(models.KnowledgeSource).filter(models.KnowledgeSource.project_id == project_id).all()
+    sources = db.query(models.KnowledgeSource).filter(models.KnowledgeSource.project_id == project_id).all()
+    return [_source_response(source) for source in sources]
+
+def _poll_source(source_id: int):
+    """(status, progress) of a source, read with a session of its own."""
+    from database import SessionLocal
+    local_db = SessionLocal()
+    try:
+        current = local_db.query(models.KnowledgeSource).filter(models.KnowledgeSource.id == source_id).first()
+        status = current.status if current else "deleted"
+        progress = _source_progress(current) if current else None
+    finally:
+        local_db.close()
+    return status, progress
+
+@router.get("/{project_id}/sources/{source_id}/progress")
+async def stream_source_progress(project_id: int, source_id: int, interval: float = 1.0, db: Session = Depends(get_db)):
+    """
+    Stream a source's status and ingestion progress (files, chunks, bytes, stage
+    timings) as server-sent events every `interval` seconds, until it is no longer
+    pending or indexing. Waits between events on the event loop, so an open
+    stream does not hold a threadpool thread; only the DB polls run in one.
+    """
+    source = await asyncio.to_thread(lambda: db.query(models.KnowledgeSource).filter(
+        models.KnowledgeSource.id == source_id,
+        models.KnowledgeSource.project_id == project_id
+    ).first())
+
+    if not source:
+        raise HTTPException(status_code=404, detail="Source not found")
+
+    interval = max(0.2, interval)
+
+    async def event_stream():
+        while True:
+            status, progress = await asyncio.to_thread(_poll_source, source_id)
+            yield f"data: {json.dumps({'source_id': source_id, 'status': status, 'progress': progress})}\n\n"
+            if status not in ("pending", "indexing"):
+                return
+            await asyncio.sleep(interval)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+@router.get("/{project_id}/jobs", response_model=List[schemas.IngestJob])
+def get_ingest_jobs(project_id: int, limit: int = 50, db: Session = Depends(get_db)):
+    """Recent ingestion jobs of a project, newest first (queued, running, done or failed)."""
+    return db.query(models.IngestJob).filter(
+        models.IngestJob.project_id == project_id
+    ).order_by(models.IngestJob.id.desc()).limit(limit).all()
 
 @router.delete("/{project_id}/sources/{source_id}")
 def delete_knowledge_source(project_id: int, source_id: int, db: Session = Depends(get_db)):
@@ -95,13 +154,80 @@ def delete_knowledge_source(project_id: int, source_id: int, db: Session = Depen
     
     if not source:
         raise HTTPException(status_code=404, detail="Source not found")
+
+    source_watcher.unwatch(source.id)
+    job_queue.cancel(project_id, source.id)
+
+    # Remove the source's chunks (tagged with its ID) from the vector and lexical indexes
+    removed_chunks = rag_service.delete_source(project_id, source.path, source.id)
         
     db.delete(source)
     db.commit()
     
-    # We might want to clear from Chroma too, but Chroma deletes by Collection usually.
-    # rag_service doesn't have delete_source yet, and deleting single docs is harder if we don't track IDs perfectly.
-    # For now, we accept that the embeddings might stay until project is deleted or re-indexed.
-    # A full re-sync feature could be added later.
-    
-    return {"status": "success"}
+    return {"status": "success", "removed_chunks": removed_chunks}
+
+@router.put("/{project_id}/sources/{source_id}/watch", response_model=schemas.KnowledgeSource)
+def set_source_watch(
+    project_id: int,
+    source_id: int,
+    update: schemas.KnowledgeSourceWatchUpdate,
+    db: Session = Depends(get_db)
+):
+    """
+    Enable or disable live re-indexing of a source's changed files.
+    Enabling also re-indexes whatever changed while the source was not watched.
+    """
+    source = db.query(models.KnowledgeSource).filter(
+        models.KnowledgeSource.id == source_id,
+        models.KnowledgeSource.project_id == project_id
+    ).first()
+
+    if not source:
+        raise HTTPException(status_code=404, detail="Source not found")
+
+    source.watch = update.watch
+    db.commit()
+    db.refresh(source)
+
+    if source.watch:
+        watch_source(project_id, source.id, source.path)
+        job_queue.enqueue(project_id, source.path, source_id=source.id)
+    else:
+        source_watcher.unwatch(source.id)
+
+    return _source_response(source)
+
+@router.post("/{project_id}/index/compact")
+def compact_project_index(project_id: int, db: Session = Depends(get_db)):
+    """
+    Rebuild the project's index to reclaim the space of deleted chunks.
+
+    Returns:
+        dict: Chunk count, on-disk size before/after and reclaimed bytes.
+    """
+    project = db.query(models.Project).filter(models.Project.id == project_id).first()
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    if any(source.status == "indexing" for source in project.knowledge_sources):
+        raise HTTPException(status_code=409, detail="Project is being indexed")
+
+    return rag_service.compact_project_index(project_id)
+
+@router.put("/{project_id}/index/storage")
+def set_index_storage(project_id: int, update: schemas.IndexStorageUpdate, db: Session = Depends(get_db)):
+    """
+    Move the project's vectors to another storage backend (chroma, numpy, int8 or float16).
+
+    Returns:
+        dict: The new storage mode and the number of chunks moved.
+    """
+    project = db.query(models.Project).filter(models.Project.id == project_id).first()
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    if any(source.status == "indexing" for source in project.knowledge_sources):
+        raise HTTPException(status_code=409, detail="Project is being indexed")
+
+    try:
+        return rag_service.set_storage_mode(project_id, update.storage)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -1,13 +1,12 @@
 from fastapi import APIRouter
-from services.ollama_client import OllamaClient
+from services.ollama_client import ollama_client
+from services.rag_service import rag_service
 
 router = APIRouter(
     prefix="/api/models",
     tags=["models"]
 )
 
-ollama_client = OllamaClient()
-
 @router.get("/")
 def get_models():
     """
@@ -15,3 +14,17 @@ def get_models():
     """
     models = ollama_client.list_models()
     return {"models": models}
+
+@router.get("/embeddings/stats")
+def get_embedding_stats():
+    """
+    Embedding cache hit/miss counters and the encode time they saved.
+    """
+    return rag_service.stats()
+
+@router.get("/stats")
+def get_generation_stats():
+    """
+    Generations running and queued per Ollama model.
+    """
+    return ollama_client.stats()
@@ -7,6 +7,8 @@ from database import get_db
 import models
 import schemas
 from services.rag_service import rag_service
+from services.source_watcher import source_watcher
+from services.job_queue import job_queue
 
 router = APIRouter(
     prefix="/api/projects",
@@ -105,6 +107,9 @@ def delete_project(project_id: int, db: Session = Depends(get_db)) -> Dict[str,
         db.delete(chat)
     
     # Clean up RAG index
+    for source in project.knowledge_sources:
+        source_watcher.unwatch(source.id)
+    job_queue.cancel(project_id)
     rag_service.delete_project_index(project_id)
         
     db.delete(project)
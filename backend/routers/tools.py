@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from pydantic import BaseModel
@@ -33,12 +33,12 @@ class DigestResponse(BaseModel):
     message: str
 
 @router.post("/digest", response_model=DigestResponse)
-def create_digest(background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+def create_digest(db: Session = Depends(get_db)):
     """
     Triggers the generation of a daily digest.
     """
     try:
-        chat_id = digest_service.generate_daily_digest(db, PROJECT_NAME, background_tasks)
+        chat_id = digest_service.generate_daily_digest(db, PROJECT_NAME)
         return DigestResponse(chat_id=chat_id, message="Digest generated successfully")
     except Exception as e:
         # In a real app we might want to log this properly
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from datetime import datetime
 
 # --- Message Schemas ---
@@ -62,13 +62,36 @@ class KnowledgeSourceBase(BaseModel):
     path: str
 
 class KnowledgeSourceCreate(KnowledgeSourceBase):
-    pass
+    watch: bool = False
+
+class KnowledgeSourceWatchUpdate(BaseModel):
+    watch: bool
+
+class IngestJob(BaseModel):
+    id: int
+    project_id: int
+    source_id: Optional[int] = None
+    path: str
+    status: str
+    attempts: int
+    error: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class IndexStorageUpdate(BaseModel):
+    storage: str  # chroma, numpy, int8 or float16
 
 class KnowledgeSource(KnowledgeSourceBase):
     id: int
     project_id: int
     status: str
     last_indexed: Optional[datetime] = None
+    watch: bool = False
+    # Counters and stage timings of the running or latest ingestion
+    progress: Optional[Dict[str, Any]] = None
 
     class Config:
         from_attributes = True
@@ -0,0 +1,258 @@
+import os
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+_TOKEN_RE = re.compile(r"\w+")
+_CAMEL_RE = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+")
+
+# Bump when `tokenize` or the table layout changes; indexes built with another
+# version are deleted on load and rebuilt from the collection.
+INDEX_VERSION = 2
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercased word tokens for lexical search.
+
+    Words are Unicode (`příliš` is one token, not `p`, `li`, `š`). Identifiers
+    are kept whole and also split on snake_case/camelCase, so `get_user_by_id`
+    and `getUserById` match both exactly and by their parts.
+    """
+    tokens = []
+    for word in _TOKEN_RE.findall(text):
+        tokens.append(word.lower())
+        parts = [p.lower() for piece in word.split("_")
+                 for p in (_CAMEL_RE.findall(piece) if piece.isascii() else [piece])]
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
+
+
+class BM25Index:
+    """
+    Incremental BM25 inverted index for one project, stored in SQLite next to
+    the Chroma data.
+
+    Chunk text is pre-tokenized and kept in an FTS5 table, which maintains the
+    inverted index on disk, so adding or removing a chunk only touches that
+    chunk and opening an index only loads chunk lengths. Posting lists are read
+    through `fts5vocab`, scored with NumPy and kept in an LRU cache, so
+    repeated lookups stay sub-millisecond even on 100k-chunk projects.
+    """
+
+    # Terms found in more than this share of chunks carry almost no signal and
+    # have the longest postings, so they are skipped at query time.
+    MAX_DOC_FREQUENCY = 0.5
+    # Posting lists kept in memory between queries
+    TERM_CACHE_SIZE = 20000
+
+    def __init__(self, path: str, k1: float = 1.2, b: float = 0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._conn = None
+        self._reset()
+
+    def _reset(self):
+        self._slots: Dict[str, int] = {}
+        self._slot_ids: Dict[int, str] = {}
+        self._lengths = np.zeros(1024, dtype=np.float32)
+        self.total_length = 0
+        # term -> posting arrays, or None for terms too common to score
+        self._term_cache: "OrderedDict[str, Optional[Tuple[np.ndarray, np.ndarray]]]" = OrderedDict()
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        index = cls(path)
+        if os.path.exists(path) and index._stored_version() != INDEX_VERSION:
+            # Built by an older tokenizer: drop it so it is rebuilt from the collection
+            index.delete()
+        if os.path.exists(path):
+            try:
+                for slot, doc_id, length in index._connection().execute("SELECT slot, id, length FROM docs"):
+                    index._track(slot, doc_id, length)
+            except Exception as e:
+                print(f"Error loading lexical index {path}: {e}")
+        return index
+
+    def _stored_version(self) -> int:
+        try:
+            conn = sqlite3.connect(self.path)
+            try:
+                return conn.execute("PRAGMA user_version").fetchone()[0]
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            print(f"Error reading lexical index {self.path}: {e}")
+            return 0
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS docs (slot INTEGER PRIMARY KEY, id TEXT UNIQUE NOT NULL, length INTEGER NOT NULL)"
+            )
+            # Text is stored already tokenized, so FTS5 only needs to split on spaces; the ascii
+            # tokenizer keeps non-ASCII characters (and diacritics) as they are, so its terms
+            # are exactly the tokens `search` looks up
+            self._conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS chunks USING fts5(body, tokenize=\"ascii tokenchars '_'\")"
+            )
+            self._conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS chunk_terms USING fts5vocab(chunks, instance)")
+            self._conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS term_stats USING fts5vocab(chunks, row)")
+            self._conn.execute(f"PRAGMA user_version = {INDEX_VERSION}")
+        return self._conn
+
+    def save(self):
+        """Commit pending additions and removals to disk."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.commit()
+
+    def compact(self):
+        """Merge the FTS5 index segments and reclaim the space of removed chunks."""
+        with self._lock:
+            conn = self._connection()
+            conn.execute("INSERT INTO chunks (chunks) VALUES ('optimize')")
+            conn.commit()
+            conn.execute("VACUUM")
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def disk_usage(self) -> int:
+        """Bytes of the index file and its write-ahead log."""
+        with self._lock:
+            return sum(os.path.getsize(self.path + suffix) for suffix in ("", "-wal")
+                       if os.path.exists(self.path + suffix))
+
+    def delete(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+            self._reset()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(self.path + suffix):
+                os.remove(self.path + suffix)
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def _track(self, slot: int, doc_id: str, length: int):
+        if slot >= len(self._lengths):
+            grown = np.zeros(max(slot + 1, len(self._lengths) * 2), dtype=np.float32)
+            grown[:len(self._lengths)] = self._lengths
+            self._lengths = grown
+        self._slots[doc_id] = slot
+        self._slot_ids[slot] = doc_id
+        self._lengths[slot] = length
+        self.total_length += length
+
+    def add(self, doc_ids: List[str], texts: List[str]):
+        """Index chunks, replacing any previous version with the same ID."""
+        with self._lock:
+            conn = self._connection()
+            for doc_id, text in zip(doc_ids, texts):
+                self._remove(conn, doc_id)
+                tokens = tokenize(text)
+                slot = conn.execute("INSERT INTO docs (id, length) VALUES (?, ?)", (doc_id, len(tokens))).lastrowid
+                conn.execute("INSERT INTO chunks (rowid, body) VALUES (?, ?)", (slot, " ".join(tokens)))
+                self._track(slot, doc_id, len(tokens))
+                for term in set(tokens):
+                    self._term_cache.pop(term, None)
+
+    def remove(self, doc_ids: List[str]):
+        with self._lock:
+            conn = self._connection()
+            for doc_id in doc_ids:
+                self._remove(conn, doc_id)
+
+    def _remove(self, conn: sqlite3.Connection, doc_id: str):
+        slot = self._slots.pop(doc_id, None)
+        if slot is None:
+            return
+        del self._slot_ids[slot]
+        self.total_length -= int(self._lengths[slot])
+        self._lengths[slot] = 0
+
+        row = conn.execute("SELECT body FROM chunks WHERE rowid = ?", (slot,)).fetchone()
+        for term in set(row[0].split()) if row else ():
+            self._term_cache.pop(term, None)
+        conn.execute("DELETE FROM chunks WHERE rowid = ?", (slot,))
+        conn.execute("DELETE FROM docs WHERE slot = ?", (slot,))
+
+    def _postings(self, term: str, max_df: float) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        (slots, term frequencies) for a term, from the LRU cache or the FTS5
+        vocabulary. Returns None for terms that are missing or too common to
+        score, without reading their (long) posting lists.
+        """
+        if term in self._term_cache:
+            self._term_cache.move_to_end(term)
+            arrays = self._term_cache[term]
+            return arrays if arrays is not None and len(arrays[0]) <= max_df else None
+
+        conn = self._connection()
+        row = conn.execute("SELECT doc FROM term_stats WHERE term = ?", (term,)).fetchone()
+        if not row or row[0] > max_df:
+            arrays = None
+        else:
+            rows = conn.execute(
+                "SELECT doc, COUNT(*) FROM chunk_terms WHERE term = ? GROUP BY doc", (term,)
+            ).fetchall()
+            arrays = (
+                np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows)),
+                np.fromiter((r[1] for r in rows), dtype=np.float32, count=len(rows)),
+            )
+        self._term_cache[term] = arrays
+        if len(self._term_cache) > self.TERM_CACHE_SIZE:
+            self._term_cache.popitem(last=False)
+        return arrays
+
+    def search(self, query: str, n_results: int) -> List[Tuple[str, float]]:
+        """Return the top `n_results` (chunk_id, score) pairs by BM25 score."""
+        with self._lock:
+            n_docs = len(self._slots)
+            if not n_docs:
+                return []
+            avg_length = self.total_length / n_docs or 1.0
+
+            matched_slots, matched_scores = [], []
+            max_df = n_docs * self.MAX_DOC_FREQUENCY if n_docs > 10 else n_docs
+            for term in set(tokenize(query)):
+                postings = self._postings(term, max_df)
+                if postings is None:
+                    continue
+                slots, tfs = postings
+                df = len(slots)
+                idf = np.log1p((n_docs - df + 0.5) / (df + 0.5))
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[slots] / avg_length)
+                matched_slots.append(slots)
+                matched_scores.append(idf * tfs * (self.k1 + 1) / (tfs + norm))
+
+            if not matched_slots:
+                return []
+            slots, inverse = np.unique(np.concatenate(matched_slots), return_inverse=True)
+            scores = np.bincount(inverse, weights=np.concatenate(matched_scores))
+            if len(scores) > n_results:
+                top = np.argpartition(-scores, n_results)[:n_results]
+            else:
+                top = np.arange(len(scores))
+            top = top[np.argsort(-scores[top])]
+            return [(self._slot_ids[int(slots[i])], float(scores[i])) for i in top]
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """Fuse several ranked ID lists into one, scoring each ID by sum(1 / (k + rank))."""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
@@ -1,28 +1,49 @@
 
 from sqlalchemy.orm import Session
-from typing import Generator, List, Dict, Any, Optional
+from typing import AsyncGenerator, List, Dict, Any, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, wait
+import asyncio
 import json
 import re
 
 import models
 import schemas
-from services.ollama_client import OllamaClient
+from services.ollama_client import ollama_client
 from services.rag_service import rag_service
 from services.analysis_service import analysis_service
 from services.web_service import web_service
-from prompts import DATA_ANALYSIS_PROMPT
+from services.prompt_assembler import PromptAssembler, PromptPart
+from prompts import DATA_ANALYSIS_PROMPT, CHAT_SUMMARY_PROMPT
+from config import settings
+
+# Seconds the web search, URL scrapes and retrieval may take together before the
+# prompt is built without the ones still running
+CONTEXT_DEADLINE_SECONDS = settings.CONTEXT_DEADLINE_SECONDS
+# Part of the context window kept free for the reply
+CHAT_RESPONSE_TOKENS = settings.CHAT_RESPONSE_TOKENS
+# Ollama's default context window, for when neither OLLAMA_NUM_CTX nor the model sets one
+OLLAMA_DEFAULT_NUM_CTX = 2048
+# Messages that must have fallen out of the prompt before they are folded into the chat's summary;
+# the history window also moves in steps of this many messages to keep the prompt prefix stable
+CHAT_SUMMARY_MIN_MESSAGES = settings.CHAT_SUMMARY_MIN_MESSAGES
 
 class ChatService:
     def __init__(self):
-        self.ollama_client = OllamaClient()
+        self.ollama_client = ollama_client
+        # Shared by all chats; lookups that miss the deadline finish here in the background
+        self.context_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="context")
+        self.assembler = PromptAssembler()
+        # Rolling summaries are updated after the reply, one at a time
+        self.summary_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="summary")
+        self._summarizing = set()
 
-    def process_message(
+    async def process_message(
         self, 
         db: Session, 
         chat_id: int, 
         message_content: str, 
         model: str
-    ) -> Generator[str, None, None]:
+    ) -> AsyncGenerator[str, None]:
         """
         Process a new user message:
         1. Save to DB.
@@ -30,23 +51,16 @@ class ChatService:
         3. Stream response from LLM.
         4. Execute analysis code if generated.
         5. Save assistant response to DB.
+
+        Blocking steps (DB, retrieval, web requests, code execution) run in
+        worker threads; the LLM stream itself only holds a coroutine.
         """
         
-        # 1. Fetch Chat & Project
-        chat = db.query(models.Chat).filter(models.Chat.id == chat_id).first()
-        if not chat:
-            raise ValueError("Chat not found")
-
-        # 2. Save User Message
-        user_msg = models.Message(chat_id=chat_id, role="user", content=message_content)
-        db.add(user_msg)
-        db.commit()
-
-        # 3. Build Context
-        context_messages = self._build_context(db, chat, message_content)
+        # 1-3. Fetch Chat, Save User Message, Build Context
+        context_messages, window_start = await asyncio.to_thread(self._start_turn, db, chat_id, message_content, model)
 
         # 4. Stream & Execute
-        def generate() -> Generator[str, None, None]:
+        async def generate() -> AsyncGenerator[str, None]:
             full_response = ""
             content_accumulator = ""
             
@@ -55,14 +69,14 @@ class ChatService:
 
             try:
                 # Stream from Ollama
-                for chunk in self.ollama_client.chat(model=model, messages=context_messages, stream=True):
+                async for chunk in self.ollama_client.achat(model=model, messages=context_messages, stream=True):
                     full_response += chunk
                     content_accumulator += chunk
                     yield chunk
                 
                 # Post-processing (Analysis Execution)
                 if is_analysis_request:
-                    analysis_output = self._handle_analysis_execution(content_accumulator)
+                    analysis_output = await asyncio.to_thread(self._handle_analysis_execution, content_accumulator)
                     if analysis_output:
                         yield analysis_output
                         full_response += analysis_output
@@ -72,87 +86,228 @@ class ChatService:
                 yield error_msg
                 full_response += error_msg
             
-            # 5. Save Assistant Message (in a separate DB session or re-using passed db carefully)
-            # Since generator runs longer than the route function, we might need a fresh session 
-            # or Ensure the session passed is still valid. 
-            # Standard pattern is using a new session for the background/post-yield part usually, 
-            # but here we can just use a local session for safety.
-            from database import SessionLocal
-            db_local = SessionLocal()
-            try:
-                asst_msg = models.Message(chat_id=chat_id, role="assistant", content=full_response)
-                db_local.add(asst_msg)
-                db_local.commit()
-            finally:
-                db_local.close()
+            # 5. Save Assistant Message
+            # The generator outlives the route's session, so a local session is used
+            await asyncio.to_thread(self._save_message, chat_id, "assistant", full_response)
+
+            # Fold turns that no longer fit into the chat's summary, for the next turns
+            if window_start is not None:
+                self._schedule_summary(chat_id, model, window_start)
 
         return generate()
 
-    def _build_context(self, db: Session, chat: models.Chat, last_user_msg: str) -> List[Dict[str, str]]:
-        messages = []
+    def _start_turn(self, db: Session, chat_id: int, message_content: str, model: str) -> Tuple[List[Dict[str, str]], Optional[int]]:
+        """
+        Save the user's message and build the context messages for the model.
+
+        Returns:
+            Tuple[List[dict], Optional[int]]: The messages, and the ID of the oldest
+            history message in them if older ones did not fit.
+        """
+        chat = db.query(models.Chat).filter(models.Chat.id == chat_id).first()
+        if not chat:
+            raise ValueError("Chat not found")
+
+        user_msg = models.Message(chat_id=chat_id, role="user", content=message_content)
+        db.add(user_msg)
+        db.commit()
+
+        return self._build_context(db, chat, user_msg.id, message_content, model)
+
+    def _save_message(self, chat_id: int, role: str, content: str):
+        from database import SessionLocal
+        db_local = SessionLocal()
+        try:
+            db_local.add(models.Message(chat_id=chat_id, role=role, content=content))
+            db_local.commit()
+        finally:
+            db_local.close()
+
+    def _prompt_budget(self, model: str) -> int:
+        """Tokens available for the prompt of `model`."""
+        context_tokens = self.ollama_client.context_window(model) or settings.OLLAMA_NUM_CTX or OLLAMA_DEFAULT_NUM_CTX
+        return max(context_tokens - CHAT_RESPONSE_TOKENS, context_tokens // 2)
+
+    def _build_context(self, db: Session, chat: models.Chat, user_msg_id: int, last_user_msg: str,
+                       model: str) -> Tuple[List[Dict[str, str]], Optional[int]]:
+        budget = self._prompt_budget(model)
+        # Retrieved text may take up to a third of the budget per source
+        context_cap = budget // 3
+        # Stable parts go before the history and per-turn context after it, so consecutive
+        # turns share a prompt prefix and Ollama can reuse its cache for it
+        system = []
+        parts = []
+
+        # System Prompt
+        if chat.project.system_prompt:
+            system.append(PromptPart(chat.project.system_prompt, required=True))
+
+        has_knowledge = db.query(models.KnowledgeSource).filter(
+            models.KnowledgeSource.project_id == chat.project_id, 
+            models.KnowledgeSource.status == 'indexed'
+        ).first()
+        search_query = last_user_msg.replace("/search ", "").strip() if last_user_msg.startswith("/search ") else None
+        # Regex to find http/https URLs
+        urls = re.findall(r'(https?://[^\s]+)', last_user_msg)
+        results, skipped = self._gather_context(chat.project_id, last_user_msg, search_query, urls, has_knowledge is not None)
         
         # Web Search Integration
-        if last_user_msg.startswith("/search "):
-            query = last_user_msg.replace("/search ", "").strip()
-            results = web_service.search_web(query)
-            if results:
-                search_context = "\n\n".join([f"Title: {r['title']}\nLink: {r['href']}\nSnippet: {r['body']}" for r in results])
-                web_prompt = f"\n\nResults from web search for '{query}':\n\n{search_context}\n\nUse these results to answer the user's request."
-                messages.append({"role": "system", "content": web_prompt})
+        if search_query is not None and "web search" not in skipped:
+            search_results = results.get("web search")
+            if search_results:
+                search_context = "\n\n".join([f"Title: {r['title']}\nLink: {r['href']}\nSnippet: {r['body']}" for r in search_results])
+                web_prompt = f"\n\nResults from web search for '{search_query}':\n\n{search_context}\n\nUse these results to answer the user's request."
+                parts.append(PromptPart(web_prompt, max_tokens=context_cap))
             else:
-                messages.append({"role": "system", "content": f"\n\nWeb search for '{query}' returned no results or failed due to rate limiting. Apologize to the user and unable to retrieve external information."})
+                parts.append(PromptPart(f"\n\nWeb search for '{search_query}' returned no results or failed due to rate limiting. Apologize to the user and unable to retrieve external information.", required=True))
                 
         # URL Scraping Integration
-        # Regex to find http/https URLs
-        urls = re.findall(r'(https?://[^\s]+)', last_user_msg)
         for url in urls:
-            # Skip internal API calls if any (simplistic check)
-            content = web_service.scrape_url(url)
+            content = results.get(url)
             if content:
                 scrape_prompt = f"\n\nContent from {url}:\n\n{content}\n\n"
-                messages.append({"role": "system", "content": scrape_prompt})
+                parts.append(PromptPart(scrape_prompt, max_tokens=context_cap))
         
-        # System Prompt
-        if chat.project.system_prompt:
-            messages.append({"role": "system", "content": chat.project.system_prompt})
-
         # RAG Context
-        has_knowledge = db.query(models.KnowledgeSource).filter(
-            models.KnowledgeSource.project_id == chat.project_id, 
-            models.KnowledgeSource.status == 'indexed'
-        ).first()
+        retrieved_docs = results.get("knowledge base")
+        if retrieved_docs:
+            context_str = "\n\n".join([f"Source: {doc['metadata']['source']}\nContent: {doc['content']}" for doc in retrieved_docs])
+            rag_prompt = f"\n\nUse the following context from the user's files to answer the question if relevant:\n\n{context_str}\n\n"
+            parts.append(PromptPart(rag_prompt, max_tokens=context_cap))
 
-        if has_knowledge:
-            retrieved_docs = rag_service.query_project(chat.project_id, last_user_msg)
-            if retrieved_docs:
-                context_str = "\n\n".join([f"Source: {doc['metadata']['source']}\nContent: {doc['content']}" for doc in retrieved_docs])
-                rag_prompt = f"\n\nUse the following context from the user's files to answer the question if relevant:\n\n{context_str}\n\n"
-                messages.append({"role": "system", "content": rag_prompt})
+        if skipped:
+            parts.append(PromptPart(f"\n\nThese sources did not respond in time and are missing from the context: {', '.join(skipped)}. Mention this if it limits your answer.", required=True))
 
         # Analysis Prompt
         if self._is_analysis_request(last_user_msg):
-            messages.append({"role": "system", "content": DATA_ANALYSIS_PROMPT})
-            
-        # Chat History (Current Request Messages - Usually passed from frontend, 
-        # but in this refactor I'm simplifying to just context construction. 
-        # If we need history, we should fetch it from DB or expect it in request.)
-        # For now, let's assume we just send the current turn + context, or we should fetch last N messages.
-        # The original code iterated `request.messages`.
-        # Let's adjust api to pass `request.messages` to this method if needed, 
-        # OR we can fetch from DB. Fetching from DB is more "backend-centric".
-        
-        # Let's fetch last 10 messages from DB for history
-        history = db.query(models.Message).filter(models.Message.chat_id == chat.id).order_by(models.Message.created_at.asc()).all()
-        # Exclude the very last one we just added? Or include it? 
-        # We just added the user message. So it's in history.
-        
-        # We need to format them for Ollama
-        # Limit to last N to avoid context window issues
-        recent_history = history[-10:] 
-        for msg in recent_history:
-            messages.append({"role": msg.role, "content": msg.content})
-            
-        return messages
+            parts.append(PromptPart(DATA_ANALYSIS_PROMPT, required=True))
+
+        # Chat History: turns since the summary, newest first, as far as the budget reaches
+        history_query = db.query(models.Message).filter(models.Message.chat_id == chat.id, models.Message.id < user_msg_id)
+        if chat.summary_message_id is not None:
+            history_query = history_query.filter(models.Message.id > chat.summary_message_id)
+        history = self._history(db, chat.id, user_msg_id, chat.summary_message_id)
+        return self.assembler.assemble(
+            budget, system, parts, history, last_user_msg, summary=chat.summary,
+            history_count=history_query.count(), align=CHAT_SUMMARY_MIN_MESSAGES,
+        )
+
+    def _history(self, db: Session, chat_id: int, before_id: int, after_id: Optional[int], page_size: int = 50):
+        """Yield (id, role, content) of a chat's messages between two IDs, newest first, a page at a time."""
+        while True:
+            query = db.query(models.Message.id, models.Message.role, models.Message.content).filter(
+                models.Message.chat_id == chat_id,
+                models.Message.id < before_id,
+            )
+            if after_id is not None:
+                query = query.filter(models.Message.id > after_id)
+            page = query.order_by(models.Message.id.desc()).limit(page_size).all()
+            yield from page
+            if len(page) < page_size:
+                return
+            before_id = page[-1][0]
+
+    def _schedule_summary(self, chat_id: int, model: str, window_start: int):
+        if chat_id in self._summarizing:
+            return
+        self._summarizing.add(chat_id)
+        self.summary_pool.submit(self._update_summary, chat_id, model, window_start)
+
+    def _update_summary(self, chat_id: int, model: str, window_start: int):
+        """
+        Fold the messages before `window_start` that are not in the chat's summary
+        yet into it. Runs in the background after a reply, so only turns that fell
+        out of the prompt are summarized, once, and never on the request path.
+        """
+        from database import SessionLocal
+        db_local = SessionLocal()
+        try:
+            chat = db_local.query(models.Chat).filter(models.Chat.id == chat_id).first()
+            if not chat:
+                return
+            query = db_local.query(models.Message).filter(
+                models.Message.chat_id == chat_id,
+                models.Message.id < window_start,
+            )
+            if chat.summary_message_id is not None:
+                query = query.filter(models.Message.id > chat.summary_message_id)
+            pending = query.order_by(models.Message.id.asc()).all()
+            if len(pending) < CHAT_SUMMARY_MIN_MESSAGES:
+                return
+
+            # Summarize in rounds that fit the model's context
+            budget = self._prompt_budget(model) // 2
+            while pending:
+                batch, tokens = [], 0
+                for msg in pending:
+                    text = f"{msg.role}: {self.assembler.truncate(msg.content, budget // 4)}"
+                    tokens += self.assembler.count(text)
+                    if batch and tokens > budget:
+                        break
+                    batch.append(text)
+                prompt = CHAT_SUMMARY_PROMPT.format(summary=chat.summary or "(none yet)", messages="\n\n".join(batch))
+                summary = "".join(self.ollama_client.chat(model=model, messages=[{"role": "user", "content": prompt}], stream=True))
+                if not summary.strip() or summary.startswith("Error:"):
+                    print(f"Error summarizing chat {chat_id}: {summary}")
+                    return
+                chat.summary = summary.strip()
+                chat.summary_message_id = pending[len(batch) - 1].id
+                db_local.commit()
+                pending = pending[len(batch):]
+        except Exception as e:
+            print(f"Error summarizing chat {chat_id}: {e}")
+        finally:
+            db_local.close()
+            self._summarizing.discard(chat_id)
+
+    def _gather_context(self, project_id: int, last_user_msg: str, search_query: Optional[str],
+                        urls: List[str], has_knowledge: bool) -> Tuple[Dict[str, Any], List[str]]:
+        """
+        Run the web search, URL scrapes and knowledge-base retrieval concurrently,
+        waiting at most CONTEXT_DEADLINE_SECONDS for all of them.
+
+        Returns:
+            Tuple[dict, List[str]]: Results by step name ("web search", the URL,
+            "knowledge base"; None if the step failed) and the names of the steps
+            that missed the deadline.
+        """
+        lookups = {}
+        if search_query is not None:
+            lookups["web search"] = self.context_pool.submit(web_service.search_web, search_query)
+        for url in urls:
+            lookups[url] = self.context_pool.submit(web_service.scrape_url, url)
+        if has_knowledge:
+            # Sub-questions are retrieved separately but in a single batched query
+            queries = self._retrieval_queries(last_user_msg)
+            lookups["knowledge base"] = self.context_pool.submit(
+                rag_service.query_project_many, project_id, queries, n_results=3 if len(queries) == 1 else 2
+            )
+        if not lookups:
+            return {}, []
+
+        done, _ = wait(lookups.values(), timeout=CONTEXT_DEADLINE_SECONDS)
+        results, skipped = {}, []
+        for name, future in lookups.items():
+            if future not in done:
+                # Left running in the background; its result is discarded
+                future.cancel()
+                skipped.append(name)
+                continue
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                print(f"Error gathering context from {name}: {e}")
+                results[name] = None
+        if skipped:
+            print(f"Context deadline of {CONTEXT_DEADLINE_SECONDS}s exceeded, skipped: {', '.join(skipped)}")
+        return results, skipped
+
+    def _retrieval_queries(self, text: str) -> List[str]:
+        """Split a message asking several questions into one retrieval query per question."""
+        questions = [q.strip() for q in re.findall(r"[^?.!\n]+\?", text) if len(q.split()) >= 3]
+        if len(questions) < 2:
+            return [text]
+        return questions[:4]
 
     def _is_analysis_request(self, text: str) -> bool:
         keywords = ['analyze', 'plot', 'graph', 'chart', 'visualize', 'calculate', 'correlation', 'load data']
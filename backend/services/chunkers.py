@@ -0,0 +1,290 @@
+import re
+from abc import ABC, abstractmethod
+from typing import Callable, List, Optional, Tuple
+
+# Counts tokens for a batch of strings, one count per string
+TokenCounter = Callable[[List[str]], List[int]]
+
+
+def approximate_token_counter(pieces: List[str]) -> List[int]:
+    """Fallback counter (~4 characters per token) when no tokenizer is available."""
+    return [max(1, -(-len(piece) // 4)) for piece in pieces]
+
+
+class Chunker(ABC):
+    """
+    Base chunking strategy.
+
+    Subclasses split text into structural pieces (sentences, code blocks, CSV
+    rows); `_pack` then greedily groups pieces into chunks of at most
+    `max_tokens` model tokens, repeating up to `overlap_tokens` of trailing
+    pieces at the start of the next chunk.
+    """
+
+    name = "base"
+
+    def __init__(self, count_tokens: TokenCounter, max_tokens: int, overlap_tokens: int, ext: str = ""):
+        self.ext = ext
+        self.count_tokens = count_tokens
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+
+    def chunk(self, text: str) -> List[str]:
+        if not text or not text.strip():
+            return []
+        return self._pack(self._split(text))
+
+    @abstractmethod
+    def _split(self, text: str) -> List[str]:
+        """Structural pieces of `text`, in order; joined they give the text back."""
+
+    def _pack(self, pieces: List[str], joiner: str = "", overlap: Optional[int] = None) -> List[str]:
+        return [chunk for chunk, _ in self._pack_counted(*self._fit(pieces), joiner=joiner, overlap=overlap)]
+
+    def _pack_counted(self, pieces: List[str], counts: List[int], joiner: str = "",
+                      overlap: Optional[int] = None) -> List[Tuple[str, int]]:
+        """Greedily pack pre-counted pieces; returns (chunk, token count) pairs."""
+        overlap = self.overlap_tokens if overlap is None else overlap
+
+        chunks = []
+        current, current_counts = [], []
+        for piece, count in zip(pieces, counts):
+            if current and sum(current_counts) + count > self.max_tokens:
+                chunks.append((joiner.join(current), sum(current_counts)))
+                # Carry trailing pieces over as overlap
+                carried, carried_counts = [], []
+                for prev, prev_count in zip(reversed(current), reversed(current_counts)):
+                    if sum(carried_counts) + prev_count > overlap or sum(carried_counts) + prev_count + count > self.max_tokens:
+                        break
+                    carried.insert(0, prev)
+                    carried_counts.insert(0, prev_count)
+                current, current_counts = carried, carried_counts
+            current.append(piece)
+            current_counts.append(count)
+        if current:
+            chunks.append((joiner.join(current), sum(current_counts)))
+        return [(chunk, count) for chunk, count in chunks if chunk.strip()]
+
+    def _fit(self, pieces: List[str]):
+        """Count tokens per piece, splitting any piece that alone exceeds the budget."""
+        counts = self.count_tokens(pieces) if pieces else []
+        fitted, fitted_counts = [], []
+        for piece, count in zip(pieces, counts):
+            if count <= self.max_tokens:
+                fitted.append(piece)
+                fitted_counts.append(count)
+                continue
+            parts = _split_evenly(piece, -(-count // self.max_tokens))
+            for part, part_count in zip(parts, self.count_tokens(parts)):
+                if part_count > self.max_tokens:
+                    # Dense text without whitespace; fall back to a hard cut
+                    sub_parts = _split_evenly(part, -(-part_count // self.max_tokens), on_whitespace=False)
+                    fitted.extend(sub_parts)
+                    fitted_counts.extend(self.count_tokens(sub_parts))
+                else:
+                    fitted.append(part)
+                    fitted_counts.append(part_count)
+        return fitted, fitted_counts
+
+
+def _split_evenly(text: str, n_parts: int, on_whitespace: bool = True) -> List[str]:
+    """Split text into roughly `n_parts` equal pieces, preferring whitespace boundaries."""
+    target = max(1, len(text) // n_parts)
+    parts, start = [], 0
+    while start < len(text):
+        end = min(len(text), start + target)
+        if on_whitespace and end < len(text):
+            space = text.rfind(" ", start + target // 2, end)
+            newline = text.rfind("\n", start + target // 2, end)
+            cut = max(space, newline)
+            if cut > start:
+                end = cut + 1
+        parts.append(text[start:end])
+        start = end
+    return parts
+
+
+class TokenWindowChunker(Chunker):
+    """Fixed windows of whitespace-separated words, measured in tokens. Used for formats without useful structure."""
+
+    name = "window"
+
+    def _split(self, text: str) -> List[str]:
+        return re.findall(r"\S+\s*", text)
+
+
+class ProseChunker(Chunker):
+    """Sentence- and paragraph-aware chunking for documents (Markdown, text, PDF, DOCX)."""
+
+    name = "prose"
+
+    _PARAGRAPH_RE = re.compile(r"\n\s*\n")
+    _SENTENCE_RE = re.compile(r"(?<=[.!?])\s+(?=[\"'(\[]?[A-Z0-9])")
+
+    def chunk(self, text: str) -> List[str]:
+        if not text or not text.strip():
+            return []
+        chunks = []
+        pending = []
+        pending_tokens = 0
+        # Paragraphs that fit are kept whole; long ones are packed by sentence
+        paragraphs = [p.strip() for p in self._PARAGRAPH_RE.split(text) if p.strip()]
+        for paragraph, count in zip(paragraphs, self.count_tokens(paragraphs)):
+            if count > self.max_tokens:
+                if pending:
+                    chunks.append("\n\n".join(pending))
+                    pending, pending_tokens = [], 0
+                sentences = [s + " " for s in self._SENTENCE_RE.split(paragraph)]
+                chunks.extend(chunk.strip() for chunk in self._pack(sentences))
+                continue
+            if pending and pending_tokens + count > self.max_tokens:
+                chunks.append("\n\n".join(pending))
+                pending, pending_tokens = [], 0
+            pending.append(paragraph)
+            pending_tokens += count
+        if pending:
+            chunks.append("\n\n".join(pending))
+        return chunks
+
+    def _split(self, text: str) -> List[str]:
+        return [s + " " for s in self._SENTENCE_RE.split(text)]
+
+
+class CodeChunker(Chunker):
+    """
+    Chunks source code at top-level function/class boundaries.
+
+    A boundary is an unindented line that starts a definition; comments and
+    decorators directly above it stay with the definition. Small definitions
+    are packed together, oversized ones are split by lines.
+    """
+
+    name = "code"
+
+    _PYTHON_DEF_RE = re.compile(r"^(?:async\s+def|def|class)\s")
+    _C_LIKE_DEF_RE = re.compile(
+        r"^(?:export\s+)?(?:default\s+)?(?:pub(?:\([^)]*\))?\s+)?(?:async\s+)?"
+        r"(?:function|class|interface|type|enum|struct|impl|trait|fn|func|const|let|var|namespace|template|"
+        r"public|private|protected|internal|static|abstract|final|mod)\b"
+        r"|^[A-Za-z_][\w\s\*&:<>,\[\]]*\([^;]*\)\s*(?:const\s*)?\{?\s*$"
+    )
+    _COMMENT_RE = re.compile(r"^(?:#|//|/\*|\*|@|\"\"\"|''')")
+
+    def __init__(self, count_tokens: TokenCounter, max_tokens: int, overlap_tokens: int, ext: str = ""):
+        super().__init__(count_tokens, max_tokens, overlap_tokens, ext)
+        self.def_re = self._PYTHON_DEF_RE if ext == '.py' else self._C_LIKE_DEF_RE
+
+    def chunk(self, text: str) -> List[str]:
+        if not text or not text.strip():
+            return []
+        pieces = self._split_counted(text)
+        # Whole definitions are the unit; no overlap between them
+        return [chunk for chunk, _ in self._pack_counted([p for p, _ in pieces], [c for _, c in pieces], overlap=0)]
+
+    def _split(self, text: str) -> List[str]:
+        return [piece for piece, _ in self._split_counted(text)]
+
+    def _split_counted(self, text: str, indent: str = "") -> List[Tuple[str, int]]:
+        """Definition blocks that fit the budget, with their token counts."""
+        lines = text.splitlines(keepends=True)
+        starts = [0]
+        for i, line in enumerate(lines):
+            if i == 0 or not line.startswith(indent) or not self.def_re.match(line[len(indent):]):
+                continue
+            # Pull leading comments/decorators along with the definition
+            start = i
+            while start - 1 > starts[-1] and self._COMMENT_RE.match(lines[start - 1][len(indent):]):
+                start -= 1
+            starts.append(start)
+
+        blocks = ["".join(lines[a:b]) for a, b in zip(starts, starts[1:] + [len(lines)])]
+        pieces = []
+        for block, count in zip(blocks, self.count_tokens(blocks)):
+            if count <= self.max_tokens:
+                pieces.append((block, count))
+                continue
+            # Oversized definition: try its members (e.g. class methods) one level down,
+            # then fall back to lines, with overlap for continuity
+            member_indent = self._member_indent(block) if not indent else None
+            if member_indent:
+                pieces.extend(self._split_counted(block, member_indent))
+            else:
+                pieces.extend(self._pack_counted(*self._fit(block.splitlines(keepends=True))))
+        return pieces
+
+    def _member_indent(self, block: str) -> Optional[str]:
+        """Indentation of the first nested definition in a block, if any."""
+        for line in block.splitlines()[1:]:
+            stripped = line.lstrip(" \t")
+            if len(stripped) < len(line) and self.def_re.match(stripped):
+                return line[:len(line) - len(stripped)]
+        return None
+
+
+class CsvChunker(Chunker):
+    """
+    Row-group chunking for CSV: every chunk repeats the header followed by whole rows.
+
+    A row too long for a chunk on its own is split into word windows, each
+    behind the header. A header that takes half the budget or more leaves no
+    useful room for rows, so such files are chunked as plain word windows.
+    """
+
+    name = "csv"
+
+    def chunk(self, text: str) -> List[str]:
+        if not text or not text.strip():
+            return []
+        lines = text.splitlines(keepends=True)
+        header, rows = lines[0], lines[1:]
+        if not rows:
+            return [header]
+        header_tokens = self.count_tokens([header])[0]
+        if header_tokens * 2 >= self.max_tokens:
+            return TokenWindowChunker(self.count_tokens, self.max_tokens, self.overlap_tokens, ext=self.ext).chunk(text)
+        budget = self.max_tokens - header_tokens
+
+        chunks, current, current_tokens = [], [], 0
+        for row, count in zip(rows, self.count_tokens(rows)):
+            if count > budget:
+                if current:
+                    chunks.append(header + "".join(current))
+                    current, current_tokens = [], 0
+                windows = TokenWindowChunker(self.count_tokens, budget, 0).chunk(row)
+                chunks.extend(header + window for window in windows)
+                continue
+            if current and current_tokens + count > budget:
+                chunks.append(header + "".join(current))
+                current, current_tokens = [], 0
+            current.append(row)
+            current_tokens += count
+        if current:
+            chunks.append(header + "".join(current))
+        return chunks
+
+    def _split(self, text: str) -> List[str]:
+        return text.splitlines(keepends=True)
+
+
+STRATEGIES = {
+    "window": TokenWindowChunker,
+    "prose": ProseChunker,
+    "code": CodeChunker,
+    "csv": CsvChunker,
+}
+
+# Strategy per file extension; anything else uses "window"
+EXTENSION_STRATEGIES = {
+    **{ext: "prose" for ext in ('.txt', '.md', '.markdown', '.pdf', '.docx')},
+    **{ext: "code" for ext in ('.py', '.js', '.jsx', '.ts', '.tsx', '.java', '.c', '.cpp', '.h', '.hpp', '.cs', '.go', '.rs')},
+    '.csv': "csv",
+}
+
+# Bump when chunking behaviour changes so manifests re-chunk unchanged files
+CHUNKER_VERSION = 2
+
+
+def get_chunker(ext: str, count_tokens: TokenCounter, max_tokens: int, overlap_tokens: int) -> Chunker:
+    """Return the chunking strategy for a file extension."""
+    strategy = STRATEGIES[EXTENSION_STRATEGIES.get(ext, "window")]
+    return strategy(count_tokens, max_tokens, overlap_tokens, ext=ext)
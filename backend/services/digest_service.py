@@ -1,10 +1,9 @@
 from sqlalchemy.orm import Session
-from fastapi import BackgroundTasks
 import datetime
 import models
 from prompts import FINANCIAL_REPORT_PROMPT, TECH_REPORT_PROMPT, DIGEST_LLM_MODEL
-from services.chat_service import chat_service
-from services.rag_service import rag_service
+from services.ollama_client import ollama_client
+from services.job_queue import job_queue
 
 class DigestService:
     def __init__(self, finance_service=None, research_service=None, weather_service=None):
@@ -38,7 +37,7 @@ class DigestService:
             }
         }
 
-    def generate_daily_digest(self, db: Session, project_name: str, background_tasks: BackgroundTasks) -> int:
+    def generate_daily_digest(self, db: Session, project_name: str) -> int:
         """
         Orchestrates the full digest generation flow.
         Returns the ID of the created chat.
@@ -73,7 +72,7 @@ class DigestService:
         )
         fin_response = ""
         try:
-            for chunk in chat_service.ollama_client.chat(model=model, messages=[{"role": "user", "content": fin_prompt}], stream=True):
+            for chunk in ollama_client.chat(model=model, messages=[{"role": "user", "content": fin_prompt}], stream=True):
                 fin_response += chunk
         except Exception as e:
             fin_response = f"Error generating financial report: {e}"
@@ -86,7 +85,7 @@ class DigestService:
         )
         tech_response = ""
         try:
-            for chunk in chat_service.ollama_client.chat(model=model, messages=[{"role": "user", "content": tech_prompt}], stream=True):
+            for chunk in ollama_client.chat(model=model, messages=[{"role": "user", "content": tech_prompt}], stream=True):
                 tech_response += chunk
         except Exception as e:
             tech_response = f"Error generating tech report: {e}"
@@ -98,9 +97,9 @@ class DigestService:
         db.add(msg)
         db.commit()
 
-        # 6. Background RAG Indexing
+        # 6. Background RAG Indexing (on the ingestion workers)
         for paper in data['tech']['papers']:
             if paper.get('pdf_path') and paper.get('title'):
-                 background_tasks.add_task(rag_service.ingest_source, project.id, paper['pdf_path'])
+                 job_queue.enqueue(project.id, paper['pdf_path'])
 
         return chat.id
@@ -0,0 +1,119 @@
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+
+def maximal_marginal_relevance(query_embedding, embeddings, k: int, lambda_mult: float = 0.7) -> List[int]:
+    """
+    Greedy maximal-marginal-relevance selection.
+
+    Each step picks the candidate maximizing
+    `lambda_mult * sim(query, doc) - (1 - lambda_mult) * max(sim(doc, selected))`
+    (cosine similarities), so a near-duplicate of an already selected chunk
+    loses to a slightly less relevant chunk that adds new information.
+
+    Args:
+        query_embedding: The query vector.
+        embeddings: (n, dim) candidate vectors.
+        k (int): Number of candidates to select.
+        lambda_mult (float): 1 = relevance only, 0 = diversity only.
+
+    Returns:
+        List[int]: Indices of the selected candidates, in selection order.
+    """
+    vectors = np.asarray(embeddings, dtype=np.float32)
+    if len(vectors) == 0 or k <= 0:
+        return []
+    vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    query = np.asarray(query_embedding, dtype=np.float32)
+    query = query / max(float(np.linalg.norm(query)), 1e-12)
+
+    relevance = vectors @ query
+    selected = [int(np.argmax(relevance))]
+    # Highest similarity of every candidate to the selected set so far
+    redundancy = vectors @ vectors[selected[0]]
+    while len(selected) < min(k, len(vectors)):
+        scores = lambda_mult * relevance - (1 - lambda_mult) * redundancy
+        scores[selected] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        redundancy = np.maximum(redundancy, vectors @ vectors[best])
+    return selected
+
+
+def _chunk_position(chunk_id: str) -> Optional[Tuple[str, int]]:
+    """(file key, chunk index) of a `SourceManifest.chunk_ids` ID, or None for other IDs."""
+    file_key, _, index = chunk_id.rpartition(":")
+    if not file_key or not index.isdigit():
+        return None
+    return file_key, int(index)
+
+
+def _join_overlapping(first: str, second: str) -> str:
+    """Concatenate consecutive chunks, keeping the text they overlap on only once."""
+    probe = second[:20]
+    if probe:
+        position = first.find(probe)
+        while position != -1:
+            # Earliest match = longest overlap
+            if second.startswith(first[position:]):
+                return first + second[len(first) - position:]
+            position = first.find(probe, position + 1)
+    return f"{first}\n{second}"
+
+
+def merge_adjacent_chunks(hits: List[dict]) -> List[dict]:
+    """
+    Merge hits that are consecutive chunks of the same file into one hit, so
+    their shared overlap (and the repeated "Source:" header) is sent once.
+
+    A merged hit takes the place of its best-ranked chunk, keeps that chunk's
+    id and metadata, gets the smallest distance of the run, and lists the
+    merged chunk IDs under "chunk_ids".
+
+    Args:
+        hits (List[dict]): Ranked hits as returned by `RAGService.query_project`.
+
+    Returns:
+        List[dict]: The hits with adjacent runs merged, in rank order.
+    """
+    by_position = {}
+    for hit in hits:
+        position = _chunk_position(hit["id"])
+        if position is not None:
+            by_position.setdefault(position, hit)
+
+    merged = []
+    consumed = set()
+    for hit in hits:
+        if hit["id"] in consumed:
+            continue
+        position = _chunk_position(hit["id"])
+        if position is None:
+            merged.append(hit)
+            continue
+
+        file_key, index = position
+        start = index
+        while (file_key, start - 1) in by_position and by_position[(file_key, start - 1)]["id"] not in consumed:
+            start -= 1
+        run = []
+        while (file_key, start) in by_position and by_position[(file_key, start)]["id"] not in consumed:
+            run.append(by_position[(file_key, start)])
+            consumed.add(run[-1]["id"])
+            start += 1
+        if len(run) == 1:
+            merged.append(hit)
+            continue
+
+        content = run[0]["content"]
+        for chunk in run[1:]:
+            content = _join_overlapping(content, chunk["content"])
+        distances = [chunk["distance"] for chunk in run if chunk.get("distance") is not None]
+        merged.append({
+            **hit,
+            "content": content,
+            "distance": min(distances) if distances else None,
+            "chunk_ids": [chunk["id"] for chunk in run],
+        })
+    return merged
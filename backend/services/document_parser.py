@@ -0,0 +1,205 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterable, Iterator, Optional, Tuple, Any
+
+# Text parsers
+import docx
+import pypdf
+from pypdf import PdfReader
+from docx import Document
+
+# CPU-bound formats worth shipping to a worker process
+PARALLEL_EXTENSIONS = {'.pdf', '.docx'}
+
+# Identifies what `read_file` extracts; bump when its output changes (library
+# upgrades are picked up automatically). Part of the extracted-text cache key.
+PARSER_VERSION = f"1:pypdf-{pypdf.__version__}:python-docx-{getattr(docx, '__version__', '')}"
+
+
+class ParseFailure(str):
+    """
+    Empty text returned for a file that could not be parsed. Behaves like ""
+    for callers that only want text; `reason` says what went wrong.
+    """
+
+    def __new__(cls, reason: str):
+        failure = super().__new__(cls, "")
+        failure.reason = reason
+        return failure
+
+    def __reduce__(self):
+        return ParseFailure, (self.reason,)
+
+
+def read_file(path: str, ext: str) -> str:
+    """
+    Read content from a file based on its extension.
+    Supports .pdf, .docx, and plain text files.
+    Returns a `ParseFailure` (empty text) if the file cannot be read.
+
+    Module-level so it can be pickled into worker processes.
+    """
+    try:
+        if ext == '.pdf':
+            reader = PdfReader(path)
+            return "\n".join([page.extract_text() for page in reader.pages])
+        elif ext == '.docx':
+            doc = Document(path)
+            return "\n".join([p.text for p in doc.paragraphs])
+        else:
+            # Text based
+            with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+                return f.read()
+    except Exception as e:
+        print(f"Error reading {path}: {e}")
+        return ParseFailure(str(e))
+
+
+def _timed_read_file(path: str, ext: str) -> Tuple[str, float]:
+    """`read_file` plus the seconds it took, measured where it ran."""
+    started = time.perf_counter()
+    text = read_file(path, ext)
+    return text, time.perf_counter() - started
+
+
+def _has_result(future: Future) -> bool:
+    """True for a task that finished with a result (not cancelled, not broken)."""
+    return future.done() and not future.cancelled() and future.exception() is None
+
+
+def _done_future(result: Any) -> Future:
+    future = Future()
+    future.set_result(result)
+    return future
+
+
+class ParallelParser:
+    """
+    Ordered, process-parallel document parsing stage.
+
+    PDF and DOCX extraction runs in a process pool so many files are parsed at
+    once on all cores; plain text is read inline since it is I/O bound.
+    Results are yielded in input order so they can feed the chunk/embed loop
+    unchanged. A file that takes longer than `timeout` seconds is abandoned:
+    its worker is killed, the pool is rebuilt and the file yields a
+    `ParseFailure`. `parse_seconds` accumulates the time spent parsing,
+    summed over workers.
+    """
+
+    def __init__(self, workers: int = 0, timeout: float = 120.0):
+        self.workers = workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self.parse_seconds = 0.0
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        # spawn keeps torch/chroma threads of the parent out of the workers
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+
+    @staticmethod
+    def _kill_pool(pool: ProcessPoolExecutor):
+        terminate = getattr(pool, "terminate_workers", None)
+        if terminate:
+            terminate()
+        else:
+            for process in list((getattr(pool, "_processes", None) or {}).values()):
+                process.terminate()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def imap(self, items: Iterable[Tuple[Any, Optional[str], Optional[str]]]) -> Iterator[Tuple[Any, str]]:
+        """
+        Parse files concurrently, preserving order.
+
+        Args:
+            items: (payload, path, ext) tuples. Items with a `None` path are
+                passed through untouched, keeping their position in the stream.
+
+        Yields:
+            (payload, text) tuples in input order; text is None for pass-through items.
+        """
+        if self.workers <= 1:
+            for payload, path, ext in items:
+                yield payload, (self._collect(_timed_read_file(path, ext)) if path else None)
+            return
+
+        pool = self._new_pool()
+        # In-flight entries: [payload, path, ext, future, started_at]
+        in_flight = []
+        window = self.workers * 2
+        items = iter(items)
+        exhausted = False
+
+        def submit(payload, path, ext):
+            if path is None:
+                future = _done_future(None)
+            elif ext in PARALLEL_EXTENSIONS:
+                future = pool.submit(_timed_read_file, path, ext)
+            else:
+                future = _done_future(_timed_read_file(path, ext))
+            in_flight.append([payload, path, ext, future, None])
+
+        try:
+            while True:
+                while not exhausted and len(in_flight) < window:
+                    try:
+                        submit(*next(items))
+                    except StopIteration:
+                        exhausted = True
+                if not in_flight:
+                    return
+
+                payload, path, ext, future, _ = in_flight[0]
+                try:
+                    result = self._wait(in_flight, pool)
+                    text = self._collect(result) if result is not None else None
+                except (TimeoutError, BrokenProcessPool) as e:
+                    reason = f"parser {'timed out' if isinstance(e, TimeoutError) else 'crashed'}"
+                    print(f"Error reading {path}: {reason}")
+                    text = ParseFailure(reason)
+                    self.parse_seconds += self.timeout if isinstance(e, TimeoutError) else 0.0
+                    # Kill the stuck worker and resubmit everything else that was in flight. Killing
+                    # cancels queued tasks and breaks running ones, so only results that are
+                    # already in are kept
+                    pending = [(entry, _has_result(entry[3])) for entry in in_flight[1:]]
+                    self._kill_pool(pool)
+                    pool = self._new_pool()
+                    in_flight.clear()
+                    for entry, has_result in pending:
+                        if entry[1] and entry[2] in PARALLEL_EXTENSIONS and not has_result:
+                            submit(*entry[:3])
+                        else:
+                            in_flight.append(entry)
+                    yield payload, text
+                    continue
+
+                in_flight.pop(0)
+                yield payload, text
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _collect(self, result: Tuple[str, float]) -> str:
+        text, seconds = result
+        self.parse_seconds += seconds
+        return text
+
+    def _wait(self, in_flight: list, pool: ProcessPoolExecutor) -> Optional[Tuple[str, float]]:
+        """Wait for the head of the window, tracking when each task started running."""
+        head = in_flight[0][3]
+        while True:
+            try:
+                return head.result(timeout=0.25)
+            except CancelledError:
+                # Cancelled by a pool that was killed meanwhile; parse it again
+                _, path, ext = in_flight[0][:3]
+                head = in_flight[0][3] = pool.submit(_timed_read_file, path, ext)
+                in_flight[0][4] = None
+            except TimeoutError:
+                now = time.monotonic()
+                for entry in in_flight:
+                    if entry[4] is None and entry[3].running():
+                        entry[4] = now
+                started = in_flight[0][4]
+                if started is not None and now - started > self.timeout:
+                    raise
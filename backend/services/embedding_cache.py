@@ -0,0 +1,147 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List, Any
+
+import numpy as np
+
+
+class EmbeddingCache:
+    """
+    On-disk, content-addressed cache of chunk embeddings.
+
+    Entries are keyed by the embedding model name plus a SHA-256 of the chunk
+    text, so identical chunks (shared READMEs, vendored docs, digest papers)
+    are embedded once across all projects and re-indexes. Vectors are stored
+    as float32 blobs in SQLite; once the cache grows past `max_bytes` the
+    least recently used entries are evicted.
+    """
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.encode_seconds = 0.0
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used)")
+        self._conn.commit()
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM embeddings").fetchone()[0]
+
+    @staticmethod
+    def _key(model_name: str, text: str) -> str:
+        return hashlib.sha256(f"{model_name}\0{text}".encode("utf-8")).hexdigest()
+
+    def encode(self, model_name: str, texts: List[str], encode_fn: Callable[[List[str]], Any]) -> List[List[float]]:
+        """
+        Return embeddings for `texts`, calling `encode_fn` only for cache misses.
+
+        Args:
+            model_name (str): Identifies the embedding model; part of the cache key.
+            texts (List[str]): Texts to embed.
+            encode_fn (Callable): Encodes a list of texts into an (n, dim) array.
+
+        Returns:
+            List[List[float]]: One embedding per input text, in input order.
+        """
+        if not texts:
+            return []
+        keys = [self._key(model_name, text) for text in texts]
+        now = time.time()
+
+        with self._lock:
+            cached = {}
+            unique_keys = list(dict.fromkeys(keys))
+            for i in range(0, len(unique_keys), 500):
+                batch = unique_keys[i:i + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})", batch
+                ).fetchall()
+                cached.update((key, np.frombuffer(vector, dtype=np.float32)) for key, vector in rows)
+            if cached:
+                self._conn.executemany("UPDATE embeddings SET last_used = ? WHERE key = ?", [(now, k) for k in cached])
+                self._conn.commit()
+
+        miss_index = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in miss_index:
+                miss_index[key] = text
+
+        if miss_index:
+            started = time.perf_counter()
+            vectors = np.asarray(encode_fn(list(miss_index.values())), dtype=np.float32)
+            elapsed = time.perf_counter() - started
+            fresh = dict(zip(miss_index.keys(), vectors))
+            with self._lock:
+                self.encode_seconds += elapsed
+                self._store(fresh, now)
+            cached.update(fresh)
+
+        with self._lock:
+            self.misses += len(miss_index)
+            self.hits += len(keys) - len(miss_index)
+
+        return [cached[key].tolist() for key in keys]
+
+    def _store(self, vectors: Dict[str, np.ndarray], now: float):
+        rows = [(key, vector.tobytes(), vector.nbytes, now) for key, vector in vectors.items()]
+        # Keys another thread or process stored meanwhile are replaced, not added
+        replaced = 0
+        keys = list(vectors)
+        for i in range(0, len(keys), 500):
+            batch = keys[i:i + 500]
+            replaced += self._conn.execute(
+                f"SELECT COALESCE(SUM(size), 0) FROM embeddings WHERE key IN ({','.join('?' * len(batch))})", batch
+            ).fetchone()[0]
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (key, vector, size, last_used) VALUES (?, ?, ?, ?)", rows
+        )
+        self._total_bytes += sum(row[2] for row in rows) - replaced
+        if self._total_bytes > self.max_bytes:
+            self._evict()
+        self._conn.commit()
+
+    def _evict(self):
+        """Drop least recently used entries until the cache is back under 90% of its cap."""
+        target = int(self.max_bytes * 0.9)
+        while self._total_bytes > target:
+            rows = self._conn.execute(
+                "SELECT key, size FROM embeddings ORDER BY last_used ASC LIMIT 1000"
+            ).fetchall()
+            if not rows:
+                self._total_bytes = 0
+                break
+            evicted = []
+            for key, size in rows:
+                evicted.append((key,))
+                self._total_bytes -= size
+                if self._total_bytes <= target:
+                    break
+            self._conn.executemany("DELETE FROM embeddings WHERE key = ?", evicted)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters since startup plus an estimate of encode time saved."""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            lookups = self.hits + self.misses
+            seconds_per_encode = self.encode_seconds / self.misses if self.misses else 0.0
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": entries,
+                "size_bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "encode_seconds": round(self.encode_seconds, 3),
+                "estimated_seconds_saved": round(self.hits * seconds_per_encode, 3),
+            }
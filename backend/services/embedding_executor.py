@@ -0,0 +1,315 @@
+import math
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Mixed inputs (prose, code, a short query) for checking that a backend's
+# embeddings match the PyTorch model's
+PARITY_TEXTS = [
+    "How do I configure the embedding model?",
+    "Retrieval-augmented generation grounds answers in documents retrieved for each question.",
+    "def chunk(text, max_tokens):\n    return [text[i:i + max_tokens] for i in range(0, len(text), max_tokens)]",
+    "Revenue grew 12% year over year, driven by subscriptions in Europe and North America.",
+    "id,name,price\n1,keyboard,49.90\n2,monitor,189.00",
+    "jarvis",
+]
+
+# Embedding model of a pool worker process, loaded by `_init_worker`
+_worker_model = None
+
+
+def load_embedding_model(model_name: str, backend: str = "torch", onnx_file: str = ""):
+    """
+    Load a SentenceTransformer on the CPU with the given backend.
+
+    Args:
+        model_name (str): Hub name or local path of the model.
+        backend (str): "torch", or "onnx" for ONNX Runtime (needs optimum[onnxruntime]).
+        onnx_file (str): ONNX file within the model repo, e.g. "onnx/model_qint8_avx2.onnx"
+            for an int8-quantized export; empty for the default "onnx/model.onnx".
+    """
+    from sentence_transformers import SentenceTransformer
+    if backend == "torch":
+        return SentenceTransformer(model_name, device="cpu")
+    model_kwargs = {"provider": "CPUExecutionProvider"}
+    if onnx_file:
+        model_kwargs["file_name"] = onnx_file
+    return SentenceTransformer(model_name, device="cpu", backend=backend, model_kwargs=model_kwargs)
+
+
+def check_parity(model, reference, texts: List[str] = PARITY_TEXTS) -> Dict[str, float]:
+    """
+    Cosine similarity between the embeddings of `model` and `reference` for the same texts.
+
+    Returns:
+        dict: min_cosine and mean_cosine over `texts`.
+    """
+    a = np.asarray(model.encode(texts), dtype=np.float32)
+    b = np.asarray(reference.encode(texts), dtype=np.float32)
+    cosines = np.einsum("ij,ij->i", a, b) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1))
+    return {"min_cosine": float(cosines.min()), "mean_cosine": float(cosines.mean())}
+
+
+def _init_worker(model_name: str, threads: int, backend: str, onnx_file: str):
+    global _worker_model
+    import torch
+    # Split the cores between workers instead of every worker using all of them
+    torch.set_num_threads(threads)
+    _worker_model = load_embedding_model(model_name, backend, onnx_file)
+
+
+def _encode_in_worker(texts: List[str]) -> Tuple[np.ndarray, float]:
+    """Encode one batch in a pool worker; returns the vectors and the seconds it took there."""
+    started = time.perf_counter()
+    vectors = _worker_model.encode(texts, batch_size=len(texts), convert_to_numpy=True)
+    return np.asarray(vectors, dtype=np.float32), time.perf_counter() - started
+
+
+class BatchSizeTuner:
+    """
+    Hill-climbing search for the fastest encode batch size.
+
+    Throughput is measured in characters per second rather than texts, since
+    length-sorted batches differ a lot in text length. Every `probe_every`
+    batches a neighbouring size (half or double the current one) is tried;
+    it becomes the current size if it is more than 5% faster.
+    """
+
+    def __init__(self, sizes: Tuple[int, ...] = (8, 16, 32, 64, 128, 256), initial: int = 32, probe_every: int = 8):
+        self.sizes = sorted(sizes)
+        self.probe_every = probe_every
+        self._current = self.sizes.index(initial) if initial in self.sizes else 0
+        self._probe: Optional[int] = None
+        self._probe_up = True
+        self._batches = 0
+        # Exponential moving average of chars/s per batch size
+        self._rates: Dict[int, float] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def batch_size(self) -> int:
+        return self.sizes[self._current]
+
+    @property
+    def probing(self) -> bool:
+        """True while a probe size is handed out and not measured yet."""
+        return self._probe is not None
+
+    def next_size(self) -> int:
+        with self._lock:
+            if self._probe is not None:
+                return self.sizes[self._probe]
+            self._batches += 1
+            if self._batches % self.probe_every == 0:
+                step = 1 if self._probe_up else -1
+                self._probe_up = not self._probe_up
+                if not 0 <= self._current + step < len(self.sizes):
+                    step = -step
+                if 0 <= self._current + step < len(self.sizes):
+                    self._probe = self._current + step
+                    return self.sizes[self._probe]
+            return self.sizes[self._current]
+
+    def record(self, size: int, chars: int, seconds: float):
+        """Report a full batch of `size` texts that took `seconds` to encode."""
+        if seconds <= 0 or size not in self.sizes:
+            return
+        with self._lock:
+            rate = chars / seconds
+            previous = self._rates.get(size)
+            self._rates[size] = rate if previous is None else 0.7 * previous + 0.3 * rate
+            if self._probe is not None and self.sizes[self._probe] == size:
+                if self._rates[size] > self._rates.get(self.batch_size, 0.0) * 1.05:
+                    self._current = self._probe
+                self._probe = None
+
+    def discard(self, size: int):
+        """Give up a pending probe of `size`, for requests too small to fill it."""
+        with self._lock:
+            if self._probe is not None and self.sizes[self._probe] == size:
+                self._probe = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "batch_size": self.batch_size,
+                "chars_per_second": {size: round(rate) for size, rate in sorted(self._rates.items())},
+            }
+
+
+class EmbeddingExecutor:
+    """
+    Runs embedding model encodes for ingestion and queries.
+
+    Inputs are sorted by length before batching, so each batch pads to
+    similar lengths, and results are returned in input order. With
+    `workers` > 1, large requests are spread over a pool of processes that
+    each load the model and use an equal share of the cores (small models
+    like MiniLM do not scale across cores within one process); small
+    requests such as queries stay in-process to avoid the IPC round trip.
+    The batch size is fixed, or autotuned on measured throughput when
+    `batch_size` is 0. Pool workers load the model with `backend`/`onnx_file`,
+    which should match the in-process model.
+    """
+
+    # Requests smaller than this are encoded in-process even with a pool
+    POOL_MIN_TEXTS = 32
+
+    def __init__(self, model_loader: Callable[[], Any], model_name: str, workers: int = 1, batch_size: int = 0,
+                 backend: str = "torch", onnx_file: str = ""):
+        """
+        Args:
+            model_loader (Callable): Returns the in-process SentenceTransformer.
+            model_name (str): Model the pool workers load.
+            workers (int): Encode processes (1 = in-process only, 0 = one per CPU core).
+            batch_size (int): Texts per encode batch, 0 to autotune.
+            backend (str): Backend the pool workers load the model with (see `load_embedding_model`).
+            onnx_file (str): ONNX file the pool workers load, for the onnx backend.
+        """
+        self.model_loader = model_loader
+        self.model_name = model_name
+        self.backend = backend
+        self.onnx_file = onnx_file
+        self.workers = workers or os.cpu_count() or 1
+        self.fixed_batch_size = batch_size
+        self.tuner = BatchSizeTuner() if not batch_size else None
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.texts = 0
+        self.encode_seconds = 0.0
+
+    @property
+    def batch_size(self) -> int:
+        return self.tuner.batch_size if self.tuner else self.fixed_batch_size
+
+    @property
+    def preferred_request_size(self) -> int:
+        """Texts per `encode` call that keep every pool worker busy."""
+        return self.workers * self.batch_size if self.workers > 1 else self.batch_size
+
+    def warm_up(self):
+        """Load the in-process model and start the pool workers (each loads the model)."""
+        self.model_loader()
+        if self.workers > 1:
+            pool = self._get_pool()
+            for future in [pool.submit(_encode_in_worker, ["warm up"]) for _ in range(self.workers)]:
+                future.result()
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """
+        Encode texts into an (n, dim) float32 array, in input order.
+
+        Args:
+            texts (List[str]): Texts to embed.
+
+        Returns:
+            np.ndarray: One embedding per text.
+        """
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        started = time.perf_counter()
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        pooled = self.workers > 1 and len(texts) >= self.POOL_MIN_TEXTS
+        batches = self._batches([texts[i] for i in order], pooled)
+
+        vectors = None
+        if pooled:
+            try:
+                vectors = self._encode_pooled(batches)
+            except BrokenProcessPool:
+                print("Embedding worker crashed, encoding in-process")
+                self._reset_pool()
+        if vectors is None:
+            vectors = self._encode_local(batches)
+
+        out = np.empty_like(vectors)
+        out[order] = vectors
+        with self._stats_lock:
+            self.texts += len(texts)
+            self.encode_seconds += time.perf_counter() - started
+        return out
+
+    def _batches(self, texts: List[str], pooled: bool) -> List[Tuple[List[str], int]]:
+        """Split length-sorted texts into (batch, requested size) pairs."""
+        # With a pool, keep batches small enough that every worker gets one
+        cap = math.ceil(len(texts) / self.workers) if pooled else len(texts)
+        batches = []
+        start = 0
+        while start < len(texts):
+            size = self.tuner.next_size() if self.tuner else self.fixed_batch_size
+            if self.tuner and self.tuner.probing and len(texts) < size:
+                # Not measurable in this request, and small requests may never fill it
+                self.tuner.discard(size)
+                size = self.tuner.batch_size
+            # A probe of a larger size runs whole on one worker, so it can be measured
+            take = size if self.tuner and self.tuner.probing else min(size, cap)
+            batches.append((texts[start:start + take], size))
+            start += take
+        return batches
+
+    def _record(self, batch: List[str], size: int, seconds: float):
+        if self.tuner and len(batch) == size:
+            self.tuner.record(size, sum(len(text) for text in batch), seconds)
+
+    def _encode_local(self, batches: List[Tuple[List[str], int]]) -> np.ndarray:
+        model = self.model_loader()
+        results = []
+        for batch, size in batches:
+            started = time.perf_counter()
+            results.append(np.asarray(model.encode(batch, batch_size=len(batch)), dtype=np.float32))
+            self._record(batch, size, time.perf_counter() - started)
+        return np.concatenate(results)
+
+    def _encode_pooled(self, batches: List[Tuple[List[str], int]]) -> np.ndarray:
+        pool = self._get_pool()
+        futures = [pool.submit(_encode_in_worker, batch) for batch, _ in batches]
+        results = []
+        for (batch, size), future in zip(batches, futures):
+            vectors, seconds = future.result()
+            self._record(batch, size, seconds)
+            results.append(vectors)
+        return np.concatenate(results)
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        # Settles the backend (the in-process load may fall back to torch)
+        self.model_loader()
+        with self._pool_lock:
+            if self._pool is None:
+                threads = max(1, (os.cpu_count() or 1) // self.workers)
+                # spawn keeps torch/chroma threads of the parent out of the workers
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.model_name, threads, self.backend, self.onnx_file),
+                )
+            return self._pool
+
+    def _reset_pool(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+    def close(self):
+        self._reset_pool()
+
+    def stats(self) -> Dict[str, Any]:
+        """Workers, current batch size and throughput since startup."""
+        with self._stats_lock:
+            texts, seconds = self.texts, self.encode_seconds
+        return {
+            "backend": self.backend,
+            "workers": self.workers,
+            "batch_size": self.batch_size,
+            "texts": texts,
+            "texts_per_second": round(texts / seconds, 2) if seconds else 0.0,
+            "autotune": self.tuner.stats() if self.tuner else None,
+        }
@@ -0,0 +1,94 @@
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Optional
+
+# File and chunk counters of an ingestion run
+COUNTERS = (
+    "files_discovered",  # indexable files walked (or reported by the watcher)
+    "files_parsed",  # new or modified files parsed and chunked
+    "files_cached",  # of those, text served from the extracted-text cache
+    "files_skipped",  # unchanged since the last run
+    "files_failed",  # unreadable, or the parser failed / timed out
+    "files_removed",  # deleted since the last run
+    "chunks_embedded",
+    "bytes_read",  # size of the files parsed (cache hits excluded)
+)
+
+# Pipeline stages; they overlap, so each one's busy time is tracked separately
+STAGES = ("parse", "embed", "upsert")
+
+
+class IngestProgress:
+    """
+    Live counters and per-stage busy time of one `ingest_source` run, updated
+    from the pipeline's threads.
+
+    Stage times are the seconds each stage spent working (parse time is summed
+    over parser processes), not wall-clock slices: since the stages run
+    concurrently, the busiest one is the run's bottleneck.
+    """
+
+    def __init__(self, source_path: str):
+        self.source_path = source_path
+        self.status = "running"  # running, done, failed
+        self.error: Optional[str] = None
+        self.current_file: Optional[str] = None
+        self.started_at = datetime.utcnow()
+        self.finished_at: Optional[datetime] = None
+        self._started = time.perf_counter()
+        self._elapsed: Optional[float] = None
+        self._counters = dict.fromkeys(COUNTERS, 0)
+        self._stage_seconds = dict.fromkeys(STAGES, 0.0)
+        self._lock = threading.Lock()
+
+    def add(self, **counts: int):
+        with self._lock:
+            for name, count in counts.items():
+                self._counters[name] += count
+
+    def add_stage_time(self, stage: str, seconds: float):
+        with self._lock:
+            self._stage_seconds[stage] += seconds
+
+    @contextmanager
+    def stage(self, stage: str):
+        """Time a block of work of `stage`."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_stage_time(stage, time.perf_counter() - started)
+
+    def finish(self, error: Optional[BaseException] = None):
+        self.status = "failed" if error else "done"
+        self.error = str(error) if error else None
+        self.current_file = None
+        self.finished_at = datetime.utcnow()
+        self._elapsed = time.perf_counter() - self._started
+
+    def snapshot(self) -> dict:
+        """
+        Returns:
+            dict: Status, counters, stage busy seconds, elapsed time, throughput
+            and the bottleneck stage, JSON-serializable.
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            stage_seconds = {stage: round(seconds, 3) for stage, seconds in self._stage_seconds.items()}
+        elapsed = self._elapsed if self._elapsed is not None else time.perf_counter() - self._started
+        return {
+            "status": self.status,
+            "error": self.error,
+            "source": self.source_path,
+            "current_file": self.current_file,
+            "started_at": self.started_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "elapsed_seconds": round(elapsed, 3),
+            **counters,
+            "stage_seconds": stage_seconds,
+            "chunks_per_second": round(counters["chunks_embedded"] / elapsed, 2) if elapsed else 0.0,
+            "bytes_per_second": round(counters["bytes_read"] / elapsed) if elapsed else 0,
+            "bottleneck": max(stage_seconds, key=stage_seconds.get) if any(stage_seconds.values()) else None,
+        }
@@ -0,0 +1,264 @@
+import json
+import threading
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional
+
+import models
+from config import settings
+from database import SessionLocal
+from services.rag_service import rag_service
+
+
+class IngestJobQueue:
+    """
+    Persistent queue of ingestion jobs (the `ingest_jobs` table) drained by a
+    fixed pool of worker threads.
+
+    - A project's jobs run one at a time, oldest first; different projects run in parallel.
+    - Queuing a source that already has a queued job merges into that job
+      instead of indexing it twice.
+    - Failed jobs are retried with exponential backoff up to `max_attempts`.
+    - On start, jobs and sources a crashed process left running/indexing are queued again.
+    """
+
+    # Finished jobs are kept this long for the jobs API
+    RETENTION = timedelta(days=7)
+
+    def __init__(self, workers: int, max_attempts: int, retry_backoff: float):
+        self.workers = max(1, workers)
+        self.max_attempts = max(1, max_attempts)
+        self.retry_backoff = retry_backoff
+        self._threads: List[threading.Thread] = []
+        self._stop = threading.Event()
+        # Guards job claiming and `_running_projects`; notified when work may be available
+        self._condition = threading.Condition()
+        self._running_projects = set()
+
+    def enqueue(self, project_id: int, path: str, source_id: Optional[int] = None,
+                paths: Optional[Iterable[str]] = None) -> int:
+        """
+        Queue (re)indexing of a source or file.
+
+        Args:
+            project_id (int): The ID of the project.
+            path (str): The source's file or directory.
+            source_id (int, optional): KnowledgeSource ID; its status is kept up to date.
+            paths (Iterable[str], optional): Only re-check these files of the source.
+
+        Returns:
+            int: ID of the job, or of the queued job it was merged into.
+        """
+        paths = sorted(set(paths)) if paths is not None else None
+        with self._condition:
+            db = SessionLocal()
+            try:
+                job = db.query(models.IngestJob).filter(
+                    models.IngestJob.status == "queued",
+                    models.IngestJob.project_id == project_id,
+                    models.IngestJob.source_id == source_id,
+                    models.IngestJob.path == path,
+                ).first()
+                if job:
+                    # A queued whole-source job already covers any files
+                    if job.paths is not None:
+                        job.paths = None if paths is None else json.dumps(sorted(set(json.loads(job.paths)) | set(paths)))
+                else:
+                    job = models.IngestJob(
+                        project_id=project_id,
+                        source_id=source_id,
+                        path=path,
+                        paths=None if paths is None else json.dumps(paths),
+                    )
+                    db.add(job)
+                    self._set_source_status(db, source_id, "pending")
+                db.commit()
+                job_id = job.id
+            finally:
+                db.close()
+            self._condition.notify()
+        return job_id
+
+    def cancel(self, project_id: int, source_id: Optional[int] = None) -> int:
+        """
+        Drop the queued jobs of a project, or only those of one of its sources.
+        A job already running finishes and then cleans up after the deleted source/project.
+
+        Returns:
+            int: Number of jobs dropped.
+        """
+        with self._condition:
+            db = SessionLocal()
+            try:
+                query = db.query(models.IngestJob).filter(
+                    models.IngestJob.status == "queued",
+                    models.IngestJob.project_id == project_id,
+                )
+                if source_id is not None:
+                    query = query.filter(models.IngestJob.source_id == source_id)
+                cancelled = query.delete(synchronize_session=False)
+                db.commit()
+                return cancelled
+            finally:
+                db.close()
+
+    def start(self):
+        """Recover from an unclean shutdown and start the workers."""
+        self._recover()
+        self._stop.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"ingest-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: Optional[float] = 5.0):
+        """
+        Stop the workers. A job interrupted by the process exiting stays `running`
+        and is queued again on the next start.
+        """
+        self._stop.set()
+        with self._condition:
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _recover(self):
+        db = SessionLocal()
+        try:
+            # Jobs interrupted by a crash or restart
+            for job in db.query(models.IngestJob).filter(models.IngestJob.status == "running").all():
+                if job.attempts >= self.max_attempts:
+                    job.status = "failed"
+                    job.error = "Interrupted too many times"
+                    job.finished_at = datetime.utcnow()
+                    self._set_source_status(db, job.source_id, "error")
+                else:
+                    job.status = "queued"
+                    job.run_after = datetime.utcnow()
+                    print(f"Resuming interrupted ingestion of {job.path}")
+
+            # Sources stuck mid-indexing (e.g. queued through BackgroundTasks before a crash)
+            queued_sources = {
+                source_id for (source_id,) in db.query(models.IngestJob.source_id).filter(models.IngestJob.status == "queued")
+            }
+            stuck = db.query(models.KnowledgeSource).filter(models.KnowledgeSource.status.in_(["pending", "indexing"])).all()
+            for source in stuck:
+                if source.id not in queued_sources:
+                    db.add(models.IngestJob(project_id=source.project_id, source_id=source.id, path=source.path))
+                    source.status = "pending"
+
+            db.query(models.IngestJob).filter(
+                models.IngestJob.status.in_(["done", "failed"]),
+                models.IngestJob.finished_at < datetime.utcnow() - self.RETENTION,
+            ).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    def _work(self):
+        while not self._stop.is_set():
+            job = self._claim()
+            if job is None:
+                continue
+            try:
+                self._run(job)
+            finally:
+                with self._condition:
+                    self._running_projects.discard(job.project_id)
+                    # The project's next job may now run
+                    self._condition.notify_all()
+
+    def _claim(self) -> Optional[models.IngestJob]:
+        """Mark the oldest runnable job as running and return it, waiting up to a few seconds for one."""
+        with self._condition:
+            db = SessionLocal()
+            try:
+                now = datetime.utcnow()
+                query = db.query(models.IngestJob).filter(models.IngestJob.status == "queued")
+                if self._running_projects:
+                    query = query.filter(models.IngestJob.project_id.notin_(self._running_projects))
+                job = query.filter(models.IngestJob.run_after <= now).order_by(models.IngestJob.id).first()
+                if job is None:
+                    next_retry = query.order_by(models.IngestJob.run_after).first()
+                    timeout = 5.0
+                    if next_retry is not None:
+                        timeout = min(timeout, max(0.0, (next_retry.run_after - now).total_seconds()))
+                    self._condition.wait(timeout)
+                    return None
+
+                job.status = "running"
+                job.attempts += 1
+                self._set_source_status(db, job.source_id, "indexing")
+                db.commit()
+                db.refresh(job)
+                db.expunge(job)
+                self._running_projects.add(job.project_id)
+                return job
+            finally:
+                db.close()
+
+    def _run(self, job: models.IngestJob):
+        error = None
+        try:
+            paths = json.loads(job.paths) if job.paths is not None else None
+            rag_service.ingest_source(job.project_id, job.path, source_id=job.source_id, paths=paths)
+        except Exception as e:
+            error = str(e) or type(e).__name__
+            print(f"Ingestion error ({job.path}, attempt {job.attempts}): {error}")
+
+        db = SessionLocal()
+        try:
+            record = db.query(models.IngestJob).filter(models.IngestJob.id == job.id).first()
+            if record is None:
+                return
+            record.error = error
+            if error is None:
+                record.status = "done"
+                record.finished_at = datetime.utcnow()
+                source = self._set_source_status(db, job.source_id, "indexed")
+                if source:
+                    source.last_indexed = record.finished_at
+            elif record.attempts < self.max_attempts:
+                record.status = "queued"
+                record.run_after = datetime.utcnow() + timedelta(seconds=self.retry_backoff * 2 ** (record.attempts - 1))
+                self._set_source_status(db, job.source_id, "pending")
+            else:
+                record.status = "failed"
+                record.finished_at = datetime.utcnow()
+                self._set_source_status(db, job.source_id, "error")
+
+            # Keep the run's counters and timings across restarts
+            source = self._source(db, job.source_id)
+            progress = rag_service.ingest_progress(job.project_id, job.path)
+            if source and progress:
+                source.ingest_stats = json.dumps(progress)
+            db.commit()
+            self._clean_up_deleted(db, job)
+        finally:
+            db.close()
+
+    def _clean_up_deleted(self, db, job: models.IngestJob):
+        """Remove what a job indexed if its source or project was deleted while it ran."""
+        if db.query(models.Project).filter(models.Project.id == job.project_id).first() is None:
+            rag_service.delete_project_index(job.project_id)
+        elif job.source_id is not None and self._source(db, job.source_id) is None:
+            rag_service.delete_source(job.project_id, job.path, job.source_id)
+
+    def _source(self, db, source_id: Optional[int]) -> Optional[models.KnowledgeSource]:
+        if source_id is None:
+            return None
+        return db.query(models.KnowledgeSource).filter(models.KnowledgeSource.id == source_id).first()
+
+    def _set_source_status(self, db, source_id: Optional[int], status: str) -> Optional[models.KnowledgeSource]:
+        source = self._source(db, source_id)
+        if source:
+            source.status = status
+        return source
+
+
+# Global instance
+job_queue = IngestJobQueue(
+    workers=settings.INGEST_WORKERS,
+    max_attempts=settings.INGEST_MAX_ATTEMPTS,
+    retry_backoff=settings.INGEST_RETRY_BACKOFF,
+)
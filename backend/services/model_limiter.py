@@ -0,0 +1,104 @@
+import asyncio
+import threading
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Callable, Deque, Dict
+
+
+def _grant_future(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+class ModelLimiter:
+    """
+    Caps how many generations run per model at once; callers over the cap wait
+    in FIFO order.
+
+    Shared by worker threads (`slot`) and coroutines (`aslot`), so the sync
+    digest and async chat streams count against the same limit. A released
+    slot is handed straight to the longest waiting caller, and new callers
+    queue behind existing waiters, so nobody can jump the queue.
+    """
+
+    def __init__(self, limit: int):
+        """
+        Args:
+            limit (int): Concurrent generations per model, 0 for no limit.
+        """
+        self.limit = limit
+        self._lock = threading.Lock()
+        self._running: Dict[str, int] = {}
+        self._waiters: Dict[str, Deque[Callable[[], None]]] = {}
+
+    def _acquire_or_enqueue(self, model: str, grant: Callable[[], None]) -> bool:
+        """Take a free slot (True) or queue `grant` to be called when one is handed over (False)."""
+        waiters = self._waiters.setdefault(model, deque())
+        if self.limit <= 0 or (not waiters and self._running.get(model, 0) < self.limit):
+            self._running[model] = self._running.get(model, 0) + 1
+            return True
+        waiters.append(grant)
+        return False
+
+    def release(self, model: str):
+        with self._lock:
+            waiters = self._waiters.get(model)
+            if waiters:
+                # Hand the slot over; the running count stays the same
+                waiters.popleft()()
+            else:
+                self._running[model] -= 1
+
+    @contextmanager
+    def slot(self, model: str):
+        """Hold a generation slot for `model`, blocking the thread until one is free."""
+        event = threading.Event()
+        with self._lock:
+            acquired = self._acquire_or_enqueue(model, event.set)
+        if not acquired:
+            event.wait()
+        try:
+            yield
+        finally:
+            self.release(model)
+
+    @asynccontextmanager
+    async def aslot(self, model: str):
+        """Hold a generation slot for `model`, waiting without blocking the event loop."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def grant():
+            loop.call_soon_threadsafe(_grant_future, future)
+
+        with self._lock:
+            acquired = self._acquire_or_enqueue(model, grant)
+        if not acquired:
+            try:
+                await future
+            except asyncio.CancelledError:
+                with self._lock:
+                    waiters = self._waiters[model]
+                    handed_over = grant not in waiters
+                    if not handed_over:
+                        waiters.remove(grant)
+                # Cancelled after the slot was handed over: pass it on
+                if handed_over:
+                    self.release(model)
+                raise
+        try:
+            yield
+        finally:
+            self.release(model)
+
+    def stats(self) -> Dict[str, Any]:
+        """Generations running and queued per model."""
+        with self._lock:
+            models = set(self._running) | {model for model, waiters in self._waiters.items() if waiters}
+            return {
+                "limit_per_model": self.limit,
+                "models": {
+                    model: {"running": self._running.get(model, 0), "queued": len(self._waiters.get(model, ()))}
+                    for model in sorted(models)
+                },
+            }
@@ -0,0 +1,342 @@
+import json
+import os
+import shutil
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from services.vector_store import VectorStore, copy_vector_store, directory_size
+
+PRECISIONS = ("float32", "float16", "int8")
+_CODE_DTYPES = {"float32": np.float32, "float16": np.float16, "int8": np.int8}
+
+
+def _where_sql(where: Optional[Dict[str, Any]]) -> tuple:
+    """
+    Translate a Chroma-style metadata filter into SQL over the JSON metadata
+    column. Supports equality, $eq/$ne/$in/$nin and $and/$or.
+    """
+    if not where:
+        return "1", []
+    clauses, params = [], []
+    for key, value in where.items():
+        if key in ("$and", "$or"):
+            parts = [_where_sql(sub) for sub in value]
+            joiner = " AND " if key == "$and" else " OR "
+            clauses.append("(" + joiner.join(sql for sql, _ in parts) + ")")
+            params.extend(p for _, sub_params in parts for p in sub_params)
+            continue
+        column = "json_extract(metadata, ?)"
+        path = f'$."{key}"'
+        if isinstance(value, dict):
+            (op, operand), = value.items()
+            if op in ("$in", "$nin"):
+                marks = ",".join("?" * len(operand))
+                clauses.append(f"{column} {'IN' if op == '$in' else 'NOT IN'} ({marks})")
+                params.extend([path, *operand])
+                continue
+            sql_op = {"$eq": "=", "$ne": "!="}[op]
+            value = operand
+        else:
+            sql_op = "="
+        clauses.append(f"{column} {sql_op} ?")
+        params.extend([path, value])
+    return " AND ".join(clauses), params
+
+
+class NumpyVectorStore(VectorStore):
+    """
+    In-process, memory-mapped brute-force vector storage for one project.
+
+    Every query is a blocked matrix product over all vectors, which for small
+    and medium projects beats Chroma's HNSW and SQLite layers and has no
+    index to maintain. Documents and metadata live in a SQLite sidecar, so
+    the text is never loaded into memory.
+
+    With "float32" precision the scan is exact. With "int8" (per-vector scale)
+    or "float16", the scanned array is quantized and a float32 copy is kept
+    in a second array that is only read for the few candidates being
+    rescored; only the quantized array stays hot in the page cache, so
+    resident memory for vectors drops ~4x (int8) or ~2x (float16) for large
+    knowledge bases.
+    """
+
+    # Candidates kept from the quantized scan per requested result, before exact rescoring
+    RESCORE_FACTOR = 8
+    # Rows scanned per block, bounds the float32 temporaries of a query
+    SCAN_BLOCK = 16384
+
+    def __init__(self, path: str, name: str, precision: str = "float32"):
+        if precision not in PRECISIONS:
+            raise ValueError(f"Unknown precision {precision!r}, expected one of {PRECISIONS}")
+        self.path = path
+        self.name = name
+        self.precision = precision
+        self._lock = threading.RLock()
+        os.makedirs(path, exist_ok=True)
+
+        self._conn = sqlite3.connect(os.path.join(path, "store.db"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS rows ("
+            "slot INTEGER PRIMARY KEY, id TEXT UNIQUE NOT NULL, document TEXT, metadata TEXT)"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS info (key TEXT PRIMARY KEY, value TEXT)")
+        self._conn.commit()
+
+        info = dict(self._conn.execute("SELECT key, value FROM info"))
+        self.dim = int(info["dim"]) if "dim" in info else None
+        self.capacity = int(info.get("capacity", 0))
+        if "precision" in info and info["precision"] != precision:
+            raise ValueError(f"Store at {path} holds {info['precision']} vectors, not {precision}")
+
+        self._slots: Dict[str, int] = {}
+        for slot, doc_id in self._conn.execute("SELECT slot, id FROM rows"):
+            self._slots[doc_id] = slot
+        self._free = sorted(set(range(self.capacity)) - set(self._slots.values()), reverse=True)
+        self._open_arrays()
+
+    # --- storage ---
+
+    def _open_arrays(self):
+        if not self.capacity:
+            self._codes = self._scales = self._norms = self._vectors = None
+            return
+        mode = "r+"
+        code_dtype = _CODE_DTYPES[self.precision]
+        self._codes = np.memmap(os.path.join(self.path, "codes.bin"), dtype=code_dtype, mode=mode, shape=(self.capacity, self.dim))
+        self._scales = np.memmap(os.path.join(self.path, "scales.bin"), dtype=np.float32, mode=mode, shape=(self.capacity,))
+        self._norms = np.memmap(os.path.join(self.path, "norms.bin"), dtype=np.float32, mode=mode, shape=(self.capacity,))
+        if self.exact:
+            self._vectors = self._codes
+        else:
+            self._vectors = np.memmap(os.path.join(self.path, "vectors.bin"), dtype=np.float32, mode=mode, shape=(self.capacity, self.dim))
+
+    @property
+    def exact(self) -> bool:
+        """True when the scanned vectors are full precision, so no rescoring pass is needed."""
+        return self.precision == "float32"
+
+    def _grow(self, needed: int):
+        """Extend the arrays to hold at least `needed` rows; new rows start empty (norm = inf)."""
+        new_capacity = max(needed, self.capacity + self.capacity // 4, 1024)
+        files = [
+            ("codes.bin", _CODE_DTYPES[self.precision], self.dim),
+            ("scales.bin", np.float32, 1),
+            ("norms.bin", np.float32, 1),
+        ]
+        if not self.exact:
+            files.append(("vectors.bin", np.float32, self.dim))
+        for name, dtype, width in files:
+            with open(os.path.join(self.path, name), "ab") as f:
+                f.truncate(new_capacity * width * np.dtype(dtype).itemsize)
+        old_capacity = self.capacity
+        self.capacity = new_capacity
+        self._flush()
+        self._open_arrays()
+        self._norms[old_capacity:] = np.inf
+        # Free slots are popped from the end; keep lower slots first so rows fill in order
+        self._free = list(range(new_capacity - 1, old_capacity - 1, -1)) + self._free
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO info (key, value) VALUES (?, ?)",
+            [("dim", str(self.dim)), ("capacity", str(self.capacity)), ("precision", self.precision)],
+        )
+
+    def _flush(self):
+        for array in (self._codes, self._scales, self._norms, self._vectors):
+            if array is not None:
+                array.flush()
+
+    def _quantize(self, vectors: np.ndarray):
+        if self.precision != "int8":
+            return vectors.astype(_CODE_DTYPES[self.precision]), np.ones(len(vectors), dtype=np.float32)
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+        return codes, scales.astype(np.float32)
+
+    # --- VectorStore API ---
+
+    def count(self) -> int:
+        return len(self._slots)
+
+    def upsert(self, ids: List[str], embeddings, documents: Optional[List[str]] = None, metadatas: Optional[List[dict]] = None):
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        if not len(ids):
+            return
+        documents = documents or [None] * len(ids)
+        metadatas = metadatas or [None] * len(ids)
+        with self._lock:
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+            new_ids = [doc_id for doc_id in dict.fromkeys(ids) if doc_id not in self._slots]
+            if len(new_ids) > len(self._free):
+                self._grow(self.capacity + len(new_ids) - len(self._free))
+            for doc_id in new_ids:
+                self._slots[doc_id] = self._free.pop()
+            slots = np.array([self._slots[doc_id] for doc_id in ids], dtype=np.int64)
+
+            codes, scales = self._quantize(vectors)
+            self._codes[slots] = codes
+            self._scales[slots] = scales
+            self._norms[slots] = np.einsum("ij,ij->i", vectors, vectors)
+            if not self.exact:
+                self._vectors[slots] = vectors
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO rows (slot, id, document, metadata) VALUES (?, ?, ?, ?)",
+                [(int(slot), doc_id, document, json.dumps(metadata) if metadata is not None else None)
+                 for slot, doc_id, document, metadata in zip(slots, ids, documents, metadatas)],
+            )
+            self._flush()
+            self._conn.commit()
+
+    def delete(self, ids: Optional[List[str]] = None, where: Optional[Dict[str, Any]] = None):
+        with self._lock:
+            if where:
+                sql, params = _where_sql(where)
+                matched = [row[0] for row in self._conn.execute(f"SELECT id FROM rows WHERE {sql}", params)]
+                ids = matched if ids is None else list(set(ids) & set(matched))
+            slots = [self._slots.pop(doc_id) for doc_id in ids or [] if doc_id in self._slots]
+            if not slots:
+                return
+            self._norms[np.array(slots, dtype=np.int64)] = np.inf
+            self._free.extend(slots)
+            self._conn.executemany("DELETE FROM rows WHERE slot = ?", [(slot,) for slot in slots])
+            self._flush()
+            self._conn.commit()
+
+    def get(self, ids: Optional[List[str]] = None, where: Optional[Dict[str, Any]] = None,
+            limit: Optional[int] = None, offset: Optional[int] = None,
+            include: List[str] = ["metadatas", "documents"]) -> Dict[str, Any]:
+        sql, params = _where_sql(where)
+        if ids is not None:
+            sql += f" AND id IN ({','.join('?' * len(ids))})"
+            params = params + list(ids)
+        sql += " ORDER BY slot"
+        if limit is not None or offset:
+            sql += " LIMIT ? OFFSET ?"
+            params = params + [limit if limit is not None else -1, offset or 0]
+        with self._lock:
+            rows = self._conn.execute(f"SELECT slot, id, document, metadata FROM rows WHERE {sql}", params).fetchall()
+            embeddings = self._vectors[[row[0] for row in rows]].copy() if "embeddings" in include and rows else []
+        return {
+            "ids": [row[1] for row in rows],
+            "documents": [row[2] for row in rows] if "documents" in include else None,
+            "metadatas": [json.loads(row[3]) if row[3] else None for row in rows] if "metadatas" in include else None,
+            "embeddings": np.asarray(embeddings) if "embeddings" in include else None,
+        }
+
+    def query(self, query_embeddings, n_results: int = 10, **kwargs) -> Dict[str, Any]:
+        """
+        Nearest neighbours by squared L2 distance (Chroma's default space):
+        a blocked scan over the stored vectors; for quantized precisions it
+        picks RESCORE_FACTOR * n candidates, which are then rescored exactly
+        against the float32 rows.
+        """
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        result = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        with self._lock:
+            if not self._slots:
+                return {key: [[] for _ in queries] for key in result}
+            n_candidates = min(len(self._slots), n_results if self.exact else n_results * self.RESCORE_FACTOR)
+            candidates = self._scan(queries, n_candidates)
+
+            rows_by_slot = {}
+            for q, slots in zip(queries, candidates):
+                exact = self._vectors[slots]
+                distances = self._norms[slots] - 2 * exact @ q + q @ q
+                order = np.argsort(distances)[:n_results]
+                top_slots = [int(s) for s in slots[order]]
+                missing = [s for s in top_slots if s not in rows_by_slot]
+                if missing:
+                    rows_by_slot.update(
+                        (row[0], row[1:]) for row in self._conn.execute(
+                            f"SELECT slot, id, document, metadata FROM rows WHERE slot IN ({','.join('?' * len(missing))})",
+                            missing,
+                        )
+                    )
+                rows = [rows_by_slot[s] for s in top_slots]
+                result["ids"].append([row[0] for row in rows])
+                result["documents"].append([row[1] for row in rows])
+                result["metadatas"].append([json.loads(row[2]) if row[2] else None for row in rows])
+                result["distances"].append([float(max(d, 0.0)) for d in distances[order]])
+        return result
+
+    def _scan(self, queries: np.ndarray, n_candidates: int) -> List[np.ndarray]:
+        """Top `n_candidates` live slots per query by (approximate) distance."""
+        best_slots = [np.empty(0, dtype=np.int64) for _ in queries]
+        best_scores = [np.empty(0, dtype=np.float32) for _ in queries]
+        buffer = None if self.exact else np.empty((min(self.SCAN_BLOCK, self.capacity), self.dim), dtype=np.float32)
+        for start in range(0, self.capacity, self.SCAN_BLOCK):
+            codes = self._codes[start:start + self.SCAN_BLOCK]
+            if self.exact:
+                block = codes
+            else:
+                block = buffer[:len(codes)]
+                np.copyto(block, codes)
+            dots = block @ queries.T
+            if self.precision == "int8":
+                dots *= self._scales[start:start + self.SCAN_BLOCK, None]
+            # ||x||^2 - 2 x.q (the query's own norm does not change the ranking);
+            # empty and deleted slots have an infinite norm and sort last
+            scores = self._norms[start:start + self.SCAN_BLOCK, None] - 2 * dots
+            for i in range(len(queries)):
+                column = scores[:, i]
+                if len(column) > n_candidates:
+                    top = np.argpartition(column, n_candidates)[:n_candidates]
+                else:
+                    top = np.arange(len(column))
+                merged_slots = np.concatenate([best_slots[i], top + start])
+                merged_scores = np.concatenate([best_scores[i], column[top]])
+                if len(merged_slots) > n_candidates:
+                    keep = np.argpartition(merged_scores, n_candidates)[:n_candidates]
+                    merged_slots, merged_scores = merged_slots[keep], merged_scores[keep]
+                best_slots[i], best_scores[i] = merged_slots, merged_scores
+        return [slots[np.isfinite(scores)] for slots, scores in zip(best_slots, best_scores)]
+
+    # --- maintenance ---
+
+    def compact(self):
+        """Rewrite the store densely into a fresh directory, dropping the slots of deleted rows."""
+        with self._lock:
+            tmp_path = self.path.rstrip(os.sep) + ".compacting"
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            rebuilt = NumpyVectorStore(tmp_path, self.name, self.precision)
+            if self.count():
+                rebuilt.dim = self.dim
+                rebuilt._grow(self.count())
+            copy_vector_store(self, rebuilt, page_size=4096)
+            rebuilt._close()
+            self._close()
+            shutil.rmtree(self.path, ignore_errors=True)
+            os.replace(tmp_path, self.path)
+            self.__init__(self.path, self.name, self.precision)
+
+    def _close(self):
+        self._flush()
+        self._codes = self._scales = self._norms = self._vectors = None
+        self._conn.close()
+
+    def drop(self):
+        """Close the store and delete its files."""
+        with self._lock:
+            self._close()
+            shutil.rmtree(self.path, ignore_errors=True)
+
+    def disk_usage(self) -> int:
+        with self._lock:
+            self._flush()
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            return directory_size(self.path)
+
+    def stats(self) -> dict:
+        """Chunk count and bytes of the scanned (resident) and rescoring (on-disk) vector arrays."""
+        return {
+            **super().stats(),
+            "precision": self.precision,
+            "capacity": self.capacity,
+            "scanned_bytes": sum(a.nbytes for a in (self._codes, self._scales, self._norms) if a is not None),
+            "rescore_bytes": self._vectors.nbytes if self._vectors is not None and not self.exact else 0,
+        }
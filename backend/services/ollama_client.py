@@ -1,15 +1,70 @@
 import requests
-from typing import List, Dict, Generator
+import httpx
+from requests.adapters import HTTPAdapter
+from typing import List, Dict, Generator, AsyncGenerator, Optional, Any, Union
+import asyncio
 import json
 
 from config import settings
+from services.model_limiter import ModelLimiter
 
 OLLAMA_BASE_URL = settings.OLLAMA_BASE_URL
+# Seconds to connect, and to wait for the next bytes of a response (0 = no limit);
+# the first token can take a while when Ollama has to load the model
+CONNECT_TIMEOUT = settings.OLLAMA_CONNECT_TIMEOUT
+READ_TIMEOUT = settings.OLLAMA_READ_TIMEOUT or None
+
+def _parse_keep_alive(value: str) -> Union[str, int, None]:
+    """OLLAMA_KEEP_ALIVE as Ollama expects it: a duration string, or a number of seconds."""
+    if not value:
+        return None
+    return int(value) if value.lstrip("-").isdigit() else value
 
 class OllamaClient:
+    """
+    Client for the local Ollama server, shared by the whole app.
+
+    Requests reuse keep-alive connections from a pool (a requests Session for
+    sync callers, an httpx AsyncClient for async ones), and generations go
+    through a per-model limiter, so overload queues here in FIFO order instead
+    of piling up on the inference server.
+    """
+
+    def __init__(self, max_concurrent_per_model: int = 0, pool_size: int = 10, num_ctx: int = 0,
+                 keep_alive: Union[str, int, None] = None):
+        """
+        Args:
+            max_concurrent_per_model (int): Generations sent to Ollama at once per model, 0 for no limit.
+            pool_size (int): Keep-alive connections kept open.
+            num_ctx (int): Context window requested for every generation, 0 for the server default.
+            keep_alive (Union[str, int, None]): How long Ollama keeps the model loaded after a
+                request, None for the server default.
+        """
+        self.num_ctx = num_ctx
+        self.keep_alive = keep_alive
+        self.limiter = ModelLimiter(max_concurrent_per_model)
+        self.pool_size = pool_size
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        # Created on first use, inside the event loop that serves the chat streams
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._context_lengths: Dict[str, int] = {}
+
+    def _get_async_client(self) -> httpx.AsyncClient:
+        if self._async_client is None:
+            # Connections are not capped here; the limiter bounds concurrent generations
+            self._async_client = httpx.AsyncClient(
+                base_url=OLLAMA_BASE_URL,
+                timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT, pool=None),
+                limits=httpx.Limits(max_connections=None, max_keepalive_connections=self.pool_size),
+            )
+        return self._async_client
+
     def list_models(self) -> List[str]:
         try:
-            response = requests.get(f"{OLLAMA_BASE_URL}/api/tags")
+            response = self.session.get(f"{OLLAMA_BASE_URL}/api/tags", timeout=(CONNECT_TIMEOUT, READ_TIMEOUT))
             response.raise_for_status()
             models_data = response.json().get("models", [])
             return [model["name"] for model in models_data]
@@ -17,16 +72,72 @@ class OllamaClient:
             print(f"Error connecting to Ollama: {e}")
             return []
 
-    def chat(self, model: str, messages: List[Dict[str, str]], stream: bool = True) -> Generator[str, None, None]:
-        url = f"{OLLAMA_BASE_URL}/api/chat"
+    def context_length(self, model: str) -> Optional[int]:
+        """
+        The context length a model was trained for, from /api/show (cached per model).
+
+        Returns:
+            Optional[int]: Tokens, or None if Ollama does not report it.
+        """
+        if model not in self._context_lengths:
+            try:
+                response = self.session.post(f"{OLLAMA_BASE_URL}/api/show", json={"model": model},
+                                             timeout=(CONNECT_TIMEOUT, READ_TIMEOUT))
+                response.raise_for_status()
+                model_info = response.json().get("model_info", {})
+            except requests.RequestException as e:
+                print(f"Error reading model info from Ollama: {e}")
+                return None
+            lengths = [value for key, value in model_info.items() if key.endswith(".context_length")]
+            self._context_lengths[model] = lengths[0] if lengths else None
+        return self._context_lengths[model]
+
+    def context_window(self, model: str) -> Optional[int]:
+        """
+        Context window generations of `model` run with: num_ctx, capped by the
+        model's context length. None if neither is known.
+        """
+        model_context = self.context_length(model)
+        if self.num_ctx and model_context:
+            return min(self.num_ctx, model_context)
+        return self.num_ctx or model_context
+
+    def _payload(self, model: str, messages: List[Dict[str, str]], stream: bool,
+                 options: Optional[Dict[str, Any]], keep_alive: Union[str, int, None]) -> Dict[str, Any]:
         payload = {
             "model": model,
             "messages": messages,
             "stream": stream
         }
+        # The same num_ctx for every request of a model; a different one reloads the model
+        options = dict(options or {})
+        if self.num_ctx and "num_ctx" not in options:
+            options["num_ctx"] = self.context_window(model)
+        if options:
+            payload["options"] = options
+        keep_alive = self.keep_alive if keep_alive is None else keep_alive
+        if keep_alive is not None:
+            payload["keep_alive"] = keep_alive
+        return payload
+
+    def chat(self, model: str, messages: List[Dict[str, str]], stream: bool = True,
+             options: Optional[Dict[str, Any]] = None, keep_alive: Union[str, int, None] = None) -> Generator[str, None, None]:
+        """
+        Stream a chat completion.
+
+        Args:
+            model (str): Model name.
+            messages (List[dict]): Chat messages.
+            stream (bool): Stream the response.
+            options (Optional[dict]): Ollama model options; num_ctx defaults to `context_window(model)`.
+            keep_alive (Union[str, int, None]): Overrides the client's keep_alive.
+        """
+        url = f"{OLLAMA_BASE_URL}/api/chat"
+        payload = self._payload(model, messages, stream, options, keep_alive)
         
         try:
-            with requests.post(url, json=payload, stream=stream) as response:
+            with self.limiter.slot(model), \
+                    self.session.post(url, json=payload, stream=stream, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT)) as response:
                 response.raise_for_status()
                 for line in response.iter_lines():
                     if line:
@@ -37,3 +148,42 @@ class OllamaClient:
                             break
         except requests.RequestException as e:
              yield f"Error: Failed to communicate with Ollama ({str(e)})"
+
+    async def achat(self, model: str, messages: List[Dict[str, str]], stream: bool = True,
+                    options: Optional[Dict[str, Any]] = None, keep_alive: Union[str, int, None] = None) -> AsyncGenerator[str, None]:
+        """
+        Async counterpart of `chat`: streams the response over a pooled async HTTP
+        client, so an open stream holds a coroutine instead of a worker thread.
+        """
+        # Looking up the context length may need a request to Ollama (once per model)
+        payload = await asyncio.to_thread(self._payload, model, messages, stream, options, keep_alive)
+
+        try:
+            async with self.limiter.aslot(model), self._get_async_client().stream("POST", "/api/chat", json=payload) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if line:
+                        body = json.loads(line)
+                        if "message" in body and "content" in body["message"]:
+                            yield body["message"]["content"]
+                        if body.get("done", False):
+                            break
+        except httpx.HTTPError as e:
+            yield f"Error: Failed to communicate with Ollama ({str(e)})"
+
+    async def aclose(self):
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Generations running and queued per model."""
+        return self.limiter.stats()
+
+# Global instance
+ollama_client = OllamaClient(
+    max_concurrent_per_model=settings.OLLAMA_MAX_CONCURRENT_PER_MODEL,
+    pool_size=settings.OLLAMA_POOL_SIZE,
+    num_ctx=settings.OLLAMA_NUM_CTX,
+    keep_alive=_parse_keep_alive(settings.OLLAMA_KEEP_ALIVE),
+)
@@ -0,0 +1,162 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from services.chunkers import TokenCounter, approximate_token_counter
+
+# Messages cost a few tokens beyond their content (role, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+# Optional parts are dropped rather than truncated below this many tokens
+MIN_PART_TOKENS = 64
+
+TRUNCATION_MARK = "\n[...truncated]"
+
+
+class PromptPart:
+    """
+    A system message of the prompt.
+
+    Required parts (project system prompt, instructions, notes) are always
+    kept; optional ones (retrieved context, web results) are truncated to
+    `max_tokens` and to the budget that is left, or dropped.
+    """
+
+    def __init__(self, content: str, required: bool = False, max_tokens: Optional[int] = None):
+        self.content = content
+        self.required = required
+        self.max_tokens = max_tokens
+
+
+class PromptAssembler:
+    """
+    Fits a chat prompt into the model's context window.
+
+    Token counts are taken per component and the budget is filled by priority:
+    1. required system parts and the current user message;
+    2. the summary of older turns and the latest exchange;
+    3. optional parts, in the given order;
+    4. older history, newest first, until a message no longer fits.
+    Any single message may take at most a quarter of the budget (the current
+    user message half). History that does not fit is left to the chat's
+    rolling summary.
+
+    The layout keeps the prompt's prefix identical across turns, so Ollama can
+    reuse its KV cache instead of re-processing the whole context: stable
+    system parts, the summary and the history come first, the per-turn context
+    last. History messages are truncated the same way every turn, and when the
+    history window has to move it moves by at least a quarter of the budget,
+    in steps of `align` messages.
+    """
+
+    def __init__(self, count_tokens: TokenCounter = approximate_token_counter):
+        self.count_tokens = count_tokens
+
+    def count(self, text: str) -> int:
+        """Tokens `text` takes as a message."""
+        return self.count_tokens([text])[0] + MESSAGE_OVERHEAD_TOKENS
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Cut text to roughly `max_tokens` tokens (including the truncation mark)."""
+        tokens = self.count(text)
+        if tokens <= max_tokens:
+            return text
+        target = max_tokens - self.count(TRUNCATION_MARK)
+        cut = int(len(text) * max(target, 0) / tokens)
+        while cut > 0 and self.count(text[:cut]) > target:
+            cut = int(cut * 0.9)
+        return text[:cut] + TRUNCATION_MARK
+
+    def assemble(
+        self,
+        budget: int,
+        system: List[PromptPart],
+        context: List[PromptPart],
+        history: Iterable[Tuple[int, str, str]],
+        current: str,
+        summary: Optional[str] = None,
+        history_count: Optional[int] = None,
+        align: int = 1,
+    ) -> Tuple[List[Dict[str, str]], Optional[int]]:
+        """
+        Build the message list: the stable system parts, the summary, the kept
+        history in chronological order, the per-turn context parts, then the
+        current user message.
+
+        Args:
+            budget (int): Prompt tokens available (context window minus the reply).
+            system (List[PromptPart]): System messages that stay the same across turns.
+            context (List[PromptPart]): System messages of this turn only (retrieved context, notes).
+            history (Iterable[Tuple[int, str, str]]): (id, role, content) of earlier
+                messages, newest first; consumed only as far as the budget reaches.
+            current (str): The user message being answered.
+            summary (Optional[str]): Summary of the turns before `history`.
+            history_count (Optional[int]): Number of messages in `history`, needed for `align`.
+            align (int): Cut the history window only at multiples of this many messages
+                from its start.
+
+        Returns:
+            Tuple[List[dict], Optional[int]]: The messages, and the ID of the oldest
+            history message kept if older ones were left out (None if all fit).
+        """
+        parts = system + context
+        message_cap = max(budget // 4, MIN_PART_TOKENS)
+        remaining = budget
+
+        # 1. Required parts and the current message
+        current = self.truncate(current, max(budget // 2, MIN_PART_TOKENS))
+        remaining -= self.count(current)
+        contents: List[Optional[str]] = [None] * len(parts)
+        for i, part in enumerate(parts):
+            if part.required:
+                contents[i] = part.content
+                remaining -= self.count(part.content)
+
+        # 2. Summary and the latest exchange
+        summary_content = None
+        if summary:
+            summary_content = self.truncate(f"Summary of the earlier conversation:\n{summary}", message_cap)
+            remaining -= self.count(summary_content)
+        history = iter(history)
+        kept: List[Tuple[int, str, str]] = []
+        for message_id, role, content in history:
+            content = self.truncate(content, message_cap)
+            kept.append((message_id, role, content))
+            remaining -= self.count(content)
+            if len(kept) == 2:
+                break
+        latest = len(kept)
+
+        # 3. Optional parts
+        for i, part in enumerate(parts):
+            if part.required:
+                continue
+            limit = min(part.max_tokens or remaining, remaining)
+            if limit < MIN_PART_TOKENS and self.count(part.content) > limit:
+                continue
+            contents[i] = self.truncate(part.content, limit)
+            remaining -= self.count(contents[i])
+
+        # 4. Older history
+        window_start = None
+        for message_id, role, content in history:
+            content = self.truncate(content, message_cap)
+            tokens = self.count(content)
+            if tokens > remaining:
+                # Leave a quarter of the budget free, so the next turns fit without moving the window again
+                while len(kept) > latest and remaining < budget // 4:
+                    remaining += self.count(kept.pop()[2])
+                if history_count is not None and align > 1:
+                    # Start the window at the next multiple of `align` after the first message left out
+                    position = history_count - 1 - len(kept)
+                    keep = max(history_count - (position // align + 1) * align, latest)
+                    kept = kept[:keep]
+                window_start = kept[-1][0] if kept else message_id + 1
+                break
+            kept.append((message_id, role, content))
+            remaining -= tokens
+
+        messages = [{"role": "system", "content": content} for content in contents[:len(system)] if content is not None]
+        if summary_content:
+            messages.append({"role": "system", "content": summary_content})
+        messages.extend({"role": role, "content": content} for _, role, content in reversed(kept))
+        messages.extend({"role": "system", "content": content} for content in contents[len(system):] if content is not None)
+        messages.append({"role": "user", "content": current})
+        return messages, window_start
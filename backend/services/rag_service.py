@@ -1,161 +1,863 @@
 
 import os
-import chromadb
-from chromadb.config import Settings
-from sentence_transformers import SentenceTransformer
-import uuid
-from typing import List
+import shutil
+import copy
+import queue
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Iterable, Iterator, Optional
 import glob
+import json
+from config import settings
 from constants import VALID_EXTENSIONS, SKIP_EXTENSIONS
+from services.source_manifest import SourceManifest, file_content_hash
+from services.document_parser import PARALLEL_EXTENSIONS, PARSER_VERSION, ParallelParser, ParseFailure, read_file
+from services.ingest_progress import IngestProgress
+from services.embedding_cache import EmbeddingCache
+from services.embedding_executor import EmbeddingExecutor, check_parity, load_embedding_model
+from services.text_cache import TextCache
+from services.bm25_index import BM25Index, reciprocal_rank_fusion
+from services.chunkers import CHUNKER_VERSION, approximate_token_counter, get_chunker
+from services.reranker import CrossEncoderReranker
+from services.diversity import maximal_marginal_relevance, merge_adjacent_chunks
+from services.vector_store import VectorStore, ChromaVectorStore, copy_vector_store
+from services.numpy_store import NumpyVectorStore
+
+# Vector storage backends a project can use; NumPy modes map to their vector precision
+NUMPY_STORAGE_PRECISIONS = {"numpy": "float32", "float16": "float16", "int8": "int8"}
+STORAGE_MODES = ("chroma",) + tuple(NUMPY_STORAGE_PRECISIONS)
+
+# Marks the end of a pipeline stage's output
+_DONE = object()
+# Seconds between saves of a source manifest while its ingestion runs
+MANIFEST_SAVE_SECONDS = 5.0
+
+
+def _feed_queue(items: Iterable, out_queue: queue.Queue, stop: threading.Event, errors: list):
+    """
+    Push every item of `items` into a bounded queue, followed by `_DONE`.
+    Gives up early once `stop` is set, so a failed downstream stage cannot
+    leave this one blocked on a full queue.
+    """
+    try:
+        for item in items:
+            while not stop.is_set():
+                try:
+                    out_queue.put(item, timeout=0.5)
+                    break
+                except queue.Full:
+                    continue
+            if stop.is_set():
+                return
+    except Exception as e:
+        errors.append(e)
+        stop.set()
+    finally:
+        while not stop.is_set():
+            try:
+                out_queue.put(_DONE, timeout=0.5)
+                break
+            except queue.Full:
+                continue
+
+
+def _drain_queue(in_queue: queue.Queue, stop: threading.Event) -> Iterator:
+    """Yield items from a queue until `_DONE` arrives or `stop` is set."""
+    while True:
+        try:
+            item = in_queue.get(timeout=0.5)
+        except queue.Empty:
+            if stop.is_set():
+                return
+            continue
+        if item is _DONE:
+            return
+        yield item
 
-# Text parsers
-from pypdf import PdfReader
-from docx import Document
 
 class RAGService:
     def __init__(self):
         """
         Initialize the RAG Service.
-        Sets up the ChromaDB persistent client and loads the local embedding model.
+        The ChromaDB persistent client and the local embedding model are heavy,
+        so they are created lazily on first use (or by `warm_up`) rather than
+        at import time.
         """
         # Persistent storage for ChromaDB
         self.db_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "../data/chroma")
         os.makedirs(self.db_path, exist_ok=True)
-        
-        self.chroma_client = chromadb.PersistentClient(path=self.db_path)
-        
-        # Load embedding model locally
-        # This might take a moment on first load
-        self.model = SentenceTransformer('all-MiniLM-L6-v2')
+        # Per-source manifests of indexed files, used for incremental re-ingestion
+        self.manifest_dir = os.path.join(self.db_path, "manifests")
+
+        self.model_name = 'all-MiniLM-L6-v2'
+        self._chroma_client = None
+        self._model = None
+        self._client_lock = threading.Lock()
+        self._model_lock = threading.Lock()
+
+        # Vector storage per project ("chroma", "int8", "float16")
+        self.storage_modes_path = os.path.join(self.db_path, "storage_modes.json")
+        self._storage_lock = threading.Lock()
+        # Serializes ingest runs of the same source
+        self._source_locks = {}
+        # Latest run per (project_id, source_path), live while it runs
+        self._ingest_progress = {}
+
+        # Hot-path caches for query_project
+        self._collections = {}
+        self._collection_counts = {}
+        self._lexical_indexes = {}
+        self._lexical_lock = threading.Lock()
+        self._query_embeddings = OrderedDict()
+        self._query_embeddings_lock = threading.Lock()
+        self._chunk_tokenizer = None
+        self._tokenizer_lock = threading.Lock()
+
+        # Encodes for ingestion and queries (optionally on a multi-process pool)
+        self.embedder = EmbeddingExecutor(
+            lambda: self.model, self.model_name,
+            workers=settings.EMBED_WORKERS, batch_size=settings.EMBED_BATCH_SIZE,
+            backend=settings.EMBEDDING_BACKEND, onnx_file=settings.EMBEDDING_ONNX_FILE
+        )
+
+        # Content-addressed embedding cache shared by all projects
+        self.embedding_cache = None
+        if settings.EMBEDDING_CACHE_MAX_MB > 0:
+            self.embedding_cache = EmbeddingCache(
+                os.path.join(os.path.dirname(os.path.dirname(__file__)), "../data/embedding_cache.db"),
+                max_bytes=settings.EMBEDDING_CACHE_MAX_MB * 1024 * 1024
+            )
+
+        # Text extracted from PDF/DOCX files, so re-chunking never parses them again
+        self.text_cache = None
+        if settings.TEXT_CACHE_MAX_MB > 0:
+            self.text_cache = TextCache(
+                os.path.join(os.path.dirname(os.path.dirname(__file__)), "../data/text_cache.db"),
+                max_bytes=settings.TEXT_CACHE_MAX_MB * 1024 * 1024,
+                parser_version=PARSER_VERSION
+            )
+
+        # Optional cross-encoder pass over the retrieved candidates
+        self.reranker = None
+        if settings.RAG_RERANK:
+            self.reranker = CrossEncoderReranker(settings.RAG_RERANK_MODEL, budget_ms=settings.RAG_RERANK_BUDGET_MS)
+
+    @property
+    def chroma_client(self):
+        """ChromaDB persistent client, opened on first access."""
+        if self._chroma_client is None:
+            with self._client_lock:
+                if self._chroma_client is None:
+                    import chromadb
+                    self._chroma_client = chromadb.PersistentClient(path=self.db_path)
+        return self._chroma_client
+
+    @property
+    def model(self):
+        """Local embedding model, loaded on first access."""
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    # This might take a moment on first load
+                    self._model = self._load_model()
+        return self._model
 
-    def _get_collection(self, project_id: int):
-        """Retrieve or create a ChromaDB collection for a specific project."""
+    def _load_model(self):
+        """
+        Load the embedding model with the configured backend (`EMBEDDING_BACKEND`).
+        A non-PyTorch backend that fails to load, or whose embeddings diverge from
+        the PyTorch model's (cosine below `EMBEDDING_PARITY_MIN`), is replaced by
+        the PyTorch model.
+        """
+        backend = settings.EMBEDDING_BACKEND
+        reference = None
+        if backend != "torch":
+            try:
+                model = load_embedding_model(self.model_name, backend, settings.EMBEDDING_ONNX_FILE)
+                if settings.EMBEDDING_PARITY_MIN > 0:
+                    reference = load_embedding_model(self.model_name)
+                    parity = check_parity(model, reference)
+                    print(f"Embedding backend {backend} parity with torch: {parity}")
+                    if parity["min_cosine"] < settings.EMBEDDING_PARITY_MIN:
+                        print(f"Embedding backend {backend} diverges from torch, using torch")
+                        model = None
+                if model is not None:
+                    self.embedder.backend = backend
+                    return model
+            except Exception as e:
+                print(f"Error loading the {backend} embedding backend, using torch: {e}")
+        self.embedder.backend = "torch"
+        return reference or load_embedding_model(self.model_name)
+
+    @property
+    def embedding_model_id(self) -> str:
+        """The model plus its backend; keys the embedding cache, since backends' vectors differ slightly."""
+        self.model
+        if self.embedder.backend == "torch":
+            return self.model_name
+        return f"{self.model_name}@{self.embedder.backend}:{settings.EMBEDDING_ONNX_FILE or 'onnx/model.onnx'}"
+
+    @property
+    def is_ready(self) -> bool:
+        """True once both the Chroma client and the embedding model are loaded."""
+        return self._chroma_client is not None and self._model is not None
+
+    def warm_up(self):
+        """Load the Chroma client and embedding model ahead of the first RAG request."""
+        try:
+            self.chroma_client
+            self.embedder.warm_up()
+            if self.reranker:
+                self.reranker.warm_up()
+            print("RAG service ready")
+        except Exception as e:
+            print(f"Error warming up RAG service: {e}")
+
+    def _get_collection(self, project_id: int) -> VectorStore:
+        """Retrieve or create the vector store of a specific project (cached)."""
+        collection = self._collections.get(project_id)
+        if collection is None:
+            collection = self._open_store(project_id, self.get_storage_mode(project_id))
+            self._collections[project_id] = collection
+        return collection
+
+    def _open_store(self, project_id: int, storage: str) -> VectorStore:
         name = f"project_{project_id}"
-        return self.chroma_client.get_or_create_collection(name=name)
+        if storage in NUMPY_STORAGE_PRECISIONS:
+            precision = NUMPY_STORAGE_PRECISIONS[storage]
+            return NumpyVectorStore(os.path.join(self.db_path, "numpy", precision, name), name, precision=precision)
+        return ChromaVectorStore(self.chroma_client, self.db_path, name)
+
+    def _load_storage_modes(self) -> dict:
+        try:
+            with open(self.storage_modes_path, "r") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def _save_storage_modes(self, modes: dict):
+        tmp_path = self.storage_modes_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(modes, f)
+        os.replace(tmp_path, self.storage_modes_path)
+
+    def get_storage_mode(self, project_id: int) -> str:
+        """
+        Vector storage of a project: "chroma", "numpy", "int8" or "float16". New projects
+        get `RAG_VECTOR_STORAGE`; projects already indexed in Chroma stay there
+        until migrated with `set_storage_mode`.
+        """
+        with self._storage_lock:
+            modes = self._load_storage_modes()
+            storage = modes.get(str(project_id))
+            if storage is None:
+                storage = settings.RAG_VECTOR_STORAGE
+                if storage != "chroma":
+                    names = [c if isinstance(c, str) else c.name for c in self.chroma_client.list_collections()]
+                    if f"project_{project_id}" in names:
+                        storage = "chroma"
+                modes[str(project_id)] = storage
+                self._save_storage_modes(modes)
+            return storage
+
+    def set_storage_mode(self, project_id: int, storage: str) -> dict:
+        """
+        Move a project's vectors to another storage ("chroma", "numpy", "int8", "float16").
+        Stored embeddings are copied, nothing is re-encoded. Should not run while
+        the project is being ingested.
+
+        Returns:
+            dict: The new storage mode and the number of chunks moved.
+        """
+        if storage not in STORAGE_MODES:
+            raise ValueError(f"Unknown vector storage {storage!r}, expected one of {STORAGE_MODES}")
+        current = self.get_storage_mode(project_id)
+        if storage == current:
+            return {"storage": storage, "chunks": self._get_count(project_id)}
+
+        source = self._get_collection(project_id)
+        target = self._open_store(project_id, storage)
+        copy_vector_store(source, target)
+
+        with self._storage_lock:
+            modes = self._load_storage_modes()
+            modes[str(project_id)] = storage
+            self._save_storage_modes(modes)
+        self._collections[project_id] = target
+        self._collection_counts[project_id] = target.count()
+        source.drop()
+        return {"storage": storage, "chunks": self._collection_counts[project_id]}
+
+    def _get_count(self, project_id: int) -> int:
+        """Number of chunks in a project's collection; cached and refreshed by ingestion."""
+        count = self._collection_counts.get(project_id)
+        if count is None:
+            count = self._get_collection(project_id).count()
+            self._collection_counts[project_id] = count
+        return count
+
+    def _get_lexical_index(self, project_id: int) -> BM25Index:
+        """
+        Per-project BM25 index stored next to the Chroma data. Loaded on first use;
+        rebuilt from the collection if the project was indexed before it existed.
+        """
+        index = self._lexical_indexes.get(project_id)
+        if index is not None:
+            return index
+        with self._lexical_lock:
+            index = self._lexical_indexes.get(project_id)
+            if index is None:
+                path = os.path.join(self.db_path, "lexical", f"project_{project_id}.db")
+                index = BM25Index.load(path)
+                if not os.path.exists(path) and self._get_count(project_id) > 0:
+                    collection = self._get_collection(project_id)
+                    page_size = 1000
+                    for offset in range(0, self._get_count(project_id), page_size):
+                        page = collection.get(limit=page_size, offset=offset, include=["documents"])
+                        index.add(page["ids"], page["documents"])
+                    index.save()
+                self._lexical_indexes[project_id] = index
+        return index
+
+    def _embed_queries(self, queries: List[str]) -> List[List[float]]:
+        """
+        Embed queries, reusing the LRU cache for repeated or regenerated questions
+        and encoding all misses in a single batch.
+        """
+        embeddings = {}
+        with self._query_embeddings_lock:
+            for query_text in queries:
+                embedding = self._query_embeddings.get(query_text)
+                if embedding is not None:
+                    self._query_embeddings.move_to_end(query_text)
+                    embeddings[query_text] = embedding
+
+        misses = list(dict.fromkeys(q for q in queries if q not in embeddings))
+        if misses:
+            encoded = self.embedder.encode(misses).tolist()
+            with self._query_embeddings_lock:
+                for query_text, embedding in zip(misses, encoded):
+                    embeddings[query_text] = embedding
+                    self._query_embeddings[query_text] = embedding
+                while len(self._query_embeddings) > settings.QUERY_EMBEDDING_CACHE_SIZE:
+                    self._query_embeddings.popitem(last=False)
+        return [embeddings[q] for q in queries]
 
     def delete_project_index(self, project_id: int):
-        """Delete a project's index collection."""
-        name = f"project_{project_id}"
+        """Delete a project's vector store, lexical index and manifests."""
+        collection = self._collections.pop(project_id, None)
+        self._collection_counts.pop(project_id, None)
+        lexical_index = self._lexical_indexes.pop(project_id, None)
+        (lexical_index or BM25Index(os.path.join(self.db_path, "lexical", f"project_{project_id}.db"))).delete()
         try:
-            self.chroma_client.delete_collection(name=name)
-            print(f"Deleted ChromaDB collection for project {project_id}")
+            (collection or self._open_store(project_id, self.get_storage_mode(project_id))).drop()
+            print(f"Deleted vector store for project {project_id}")
         except Exception as e:
-            print(f"Error deleting collection for project {project_id}: {e}")
+            print(f"Error deleting vector store for project {project_id}: {e}")
+        with self._storage_lock:
+            modes = self._load_storage_modes()
+            if modes.pop(str(project_id), None) is not None:
+                self._save_storage_modes(modes)
+        shutil.rmtree(os.path.join(self.manifest_dir, f"project_{project_id}"), ignore_errors=True)
+        for key in [key for key in self._ingest_progress if key[0] == project_id]:
+            self._ingest_progress.pop(key, None)
 
-    def ingest_source(self, project_id: int, source_path: str):
+    def ingest_source(self, project_id: int, source_path: str, source_id: Optional[int] = None,
+                      paths: Optional[Iterable[str]] = None):
         """
         Ingest a file or directory into the RAG index.
         
         Args:
             project_id (int): The ID of the project.
             source_path (str): Absolute path to the file or directory.
+            source_id (int, optional): KnowledgeSource ID every chunk is tagged with,
+                so `delete_source` can remove them in bulk.
+            paths (Iterable[str], optional): Only re-check these files of the source
+                (e.g. the ones a file watcher reported) instead of walking all of it.
             
-        This method will:
-        1. Walk the directory tree (if path is a dir).
-        2. Filter files based on `VALID_EXTENSIONS` and `SKIP_EXTENSIONS`.
-        3. Parse content from files (PDF, DOCX, text).
-        4. Chunk the text.
-        5. Generate embeddings locally.
-        6. Upsert valid vectors to ChromaDB.
+        Runs as a streaming pipeline so peak memory is bounded by the batch size
+        and the first chunks become searchable while the walk is still running:
+
+        1. Parser thread: walk the tree, skip files unchanged since the last run
+           (per the source manifest), parse the rest in a process pool
+           (`INGEST_PARSE_WORKERS`) and chunk them in order.
+        2. Calling thread: embed chunks locally, `INGEST_BATCH_SIZE` at a time.
+        3. Writer thread: delete stale chunks and upsert new vectors to the project's
+           vector store, mirroring both into the project's BM25 index.
+
+        Stages are connected by bounded queues, so a slow stage applies
+        back-pressure instead of letting work pile up in memory. Runs for the
+        same source are serialized, since they share its manifest. Counters
+        and stage timings of the run are available from `ingest_progress`.
+        """
+        with self._source_lock(project_id, source_path):
+            progress = IngestProgress(source_path)
+            self._ingest_progress[(project_id, source_path)] = progress
+            try:
+                self._ingest_source(project_id, source_path, source_id, paths, progress)
+            except Exception as e:
+                progress.finish(e)
+                raise
+            progress.finish()
+
+    def ingest_progress(self, project_id: int, source_path: str) -> Optional[dict]:
+        """
+        Counters and stage timings of a source's running or latest ingestion
+        (see `IngestProgress.snapshot`), or None if it has not been ingested
+        since startup.
+        """
+        progress = self._ingest_progress.get((project_id, source_path))
+        return progress.snapshot() if progress else None
+
+    def _source_lock(self, project_id: int, source_path: str) -> threading.Lock:
+        with self._storage_lock:
+            return self._source_locks.setdefault((project_id, source_path), threading.Lock())
+
+    def _ingest_source(self, project_id: int, source_path: str, source_id: Optional[int], paths: Optional[Iterable[str]],
+                       progress: IngestProgress):
+        collection = self._get_collection(project_id)
+        lexical_index = self._get_lexical_index(project_id)
+        manifest = SourceManifest(self.manifest_dir, project_id, source_path, self._chunking_signature())
+        # What the writer has committed, saved as files complete so a failed run keeps track of them
+        written = SourceManifest(self.manifest_dir, project_id, source_path, self._chunking_signature())
+        if not manifest.exists:
+            # The source's unmanaged chunks are all replaced, so all of it has to be re-indexed
+            paths = None
+        # Large enough to give every embedding worker a full batch
+        batch_size = max(settings.INGEST_BATCH_SIZE, self.embedder.preferred_request_size)
+
+        stop = threading.Event()
+        errors = []
+        chunk_queue = queue.Queue(maxsize=batch_size * 2)
+        write_queue = queue.Queue(maxsize=2)
+
+        parser = threading.Thread(
+            target=_feed_queue,
+            args=(self._iter_chunk_ops(project_id, source_path, manifest, source_id, paths, progress), chunk_queue, stop, errors),
+            daemon=True
+        )
+        writer = threading.Thread(
+            target=self._write_ops,
+            args=(project_id, collection, lexical_index, written, write_queue, stop, errors, progress),
+            daemon=True
+        )
+        parser.start()
+        writer.start()
+
+        _feed_queue(self._embed_ops(_drain_queue(chunk_queue, stop), batch_size, progress), write_queue, stop, errors)
+        writer.join()
+        stop.set()
+        parser.join()
+
+        lexical_index.save()
+        if errors:
+            # Keep the files that were completed; without a manifest only once the
+            # source's unmanaged chunks are gone (they are deleted before any file completes)
+            if written.exists or written.files:
+                written.save()
+            raise errors[0]
+        manifest.save()
+
+    def delete_source(self, project_id: int, source_path: str, source_id: Optional[int] = None) -> int:
+        """
+        Remove every chunk of one knowledge source from the project's index.
+
+        Chunks tagged with `source_id` are found through a metadata filter; chunks
+        indexed before sources were tagged are found through the source manifest.
+
+        Args:
+            project_id (int): The ID of the project.
+            source_path (str): Path the source was ingested from.
+            source_id (int, optional): KnowledgeSource ID the chunks were tagged with.
+
+        Returns:
+            int: Number of chunks removed.
+        """
+        collection = self._get_collection(project_id)
+        manifest = SourceManifest(self.manifest_dir, project_id, source_path)
+        ids = set()
+        for file_path in list(manifest.files):
+            ids.update(manifest.remove(file_path))
+        if source_id is not None:
+            ids.update(collection.get(where={"source_id": source_id}, include=[])["ids"])
+
+        ids = sorted(ids)
+        # Chroma bounds the number of IDs per call
+        page_size = 5000
+        for start in range(0, len(ids), page_size):
+            collection.delete(ids=ids[start:start + page_size])
+        lexical_index = self._get_lexical_index(project_id)
+        lexical_index.remove(ids)
+        lexical_index.save()
+        self._collection_counts[project_id] = collection.count()
+        manifest.delete()
+        self._ingest_progress.pop((project_id, source_path), None)
+        return len(ids)
+
+    def compact_project_index(self, project_id: int) -> dict:
         """
-        collection = self._get_collection(project_id)        
+        Rebuild a project's vector store and lexical index without the space left
+        behind by deleted chunks.
 
-        files_to_process = []
+        Chroma's HNSW index only marks deleted vectors, so after many source
+        deletions or re-ingests the index keeps growing and search walks dead
+        entries; NumPy stores keep the slots of deleted rows. Live chunks are
+        copied (with their stored embeddings, nothing is re-encoded) into fresh
+        storage that then replaces the old one. Should not run while the
+        project is being ingested.
+
+        Args:
+            project_id (int): The ID of the project.
+
+        Sizes cover only this project's files: its vector store (for Chroma the
+        collection's HNSW segment; the shared chroma.sqlite3 is not counted)
+        and its lexical index.
+
+        Returns:
+            dict: Chunk count and on-disk size before/after, and bytes reclaimed.
+        """
+        collection = self._get_collection(project_id)
+        lexical_index = self._get_lexical_index(project_id)
+        size_before = collection.disk_usage() + lexical_index.disk_usage()
+        collection.compact()
+        self._collection_counts[project_id] = collection.count()
+        lexical_index.compact()
+
+        size_after = collection.disk_usage() + lexical_index.disk_usage()
+        return {
+            "chunks": self._collection_counts[project_id],
+            "size_before_bytes": size_before,
+            "size_after_bytes": size_after,
+            "reclaimed_bytes": max(0, size_before - size_after),
+        }
+
+    def _chunking_signature(self) -> str:
+        """Identifies how chunks were produced; a change re-chunks every file of a source."""
+        return f"{CHUNKER_VERSION}:{self.model_name}:{self.chunk_max_tokens}:{settings.CHUNK_OVERLAP_TOKENS}"
+
+    def _iter_source_files(self, source_path: str) -> Iterator[str]:
+        """Yield indexable files under `source_path` (or the path itself if it is a file)."""
         if os.path.isfile(source_path):
-            files_to_process.append(source_path)
+            candidates = [source_path]
         elif os.path.isdir(source_path):
-            for root, dirs, files in os.walk(source_path):
+            candidates = (
+                os.path.join(root, file)
+                for root, dirs, files in os.walk(source_path)
                 # Skip common ignore dirs
-                if any(x in root for x in SKIP_EXTENSIONS):
+                if not any(x in root for x in SKIP_EXTENSIONS)
+                for file in files
+            )
+        else:
+            candidates = []
+
+        for file_path in candidates:
+            if os.path.splitext(file_path)[1].lower() in VALID_EXTENSIONS:
+                yield file_path
+
+    def _is_indexable(self, file_path: str) -> bool:
+        """Whether a walk of its source would index this file (same rules as `_iter_source_files`)."""
+        if any(x in os.path.dirname(file_path) for x in SKIP_EXTENSIONS):
+            return False
+        return os.path.splitext(file_path)[1].lower() in VALID_EXTENSIONS
+
+    def _iter_changed_files(self, source_path: str, manifest: SourceManifest, paths: Optional[Iterable[str]],
+                            progress: IngestProgress) -> Iterator[tuple]:
+        """
+        Walk a source (or only `paths` within it) and diff it against its manifest,
+        yielding parse tasks for `ParallelParser.imap` in order:
+        (("delete", ids), None, None) for chunks of removed files,
+        (("manifest", file_path, entry), None, None) for manifest entries that changed
+        without re-indexing (None for removed files),
+        ((file_path, stat, content_hash, text), None, None) for files to (re)index
+        whose text is in the extracted-text cache, and
+        ((file_path, stat, content_hash, None), file_path, ext) for files to parse.
+        """
+        seen_files = set()
+        if paths is None:
+            candidates = self._iter_source_files(source_path)
+            known_files = set(manifest.files)
+        else:
+            # A path may also be a directory that was created, moved or removed as a whole
+            paths = {os.path.abspath(path) for path in paths}
+            prefixes = tuple(path + os.sep for path in paths)
+            known_files = {path for path in manifest.files if path in paths or path.startswith(prefixes)}
+            candidates = (
+                file_path
+                for path in paths
+                for file_path in (self._iter_source_files(path) if os.path.isdir(path) else [path])
+                if os.path.isfile(file_path) and self._is_indexable(file_path)
+            )
+
+        for file_path in candidates:
+            progress.add(files_discovered=1)
+            ext = os.path.splitext(file_path)[1].lower()
+            try:
+                stat = os.stat(file_path)
+                if manifest.is_unchanged(file_path, stat):
+                    seen_files.add(file_path)
+                    progress.add(files_skipped=1)
                     continue
-                
-                for file in files:
-                    files_to_process.append(os.path.join(root, file))
-        
-        documents = []
-        metadatas = []
-        ids = []
+                content_hash = file_content_hash(file_path)
+            except OSError as e:
+                print(f"Error reading {file_path}: {e}")
+                progress.add(files_failed=1)
+                continue
+            seen_files.add(file_path)
+
+            previous = manifest.get(file_path)
+            if previous and previous["hash"] == content_hash:
+                # Touched but not modified, just refresh size/mtime
+                manifest.record(file_path, stat, content_hash, previous["chunks"])
+                progress.add(files_skipped=1)
+                yield ("manifest", file_path, manifest.get(file_path)), None, None
+                continue
+            # Chunks of a modified file are replaced once it parsed (see _iter_chunk_ops)
+            if self.text_cache is not None and ext in PARALLEL_EXTENSIONS:
+                text = self.text_cache.get(content_hash, ext)
+                if text is not None:
+                    yield (file_path, stat, content_hash, text), None, None
+                    continue
+            yield (file_path, stat, content_hash, None), file_path, ext
+
+        # Files that disappeared since the last run
+        for file_path in known_files - seen_files:
+            progress.add(files_removed=1)
+            yield ("delete", manifest.remove(file_path)), None, None
+            yield ("manifest", file_path, None), None, None
+
+    def _iter_chunk_ops(self, project_id: int, source_path: str, manifest: SourceManifest, source_id: Optional[int],
+                        paths: Optional[Iterable[str]], progress: IngestProgress) -> Iterator[tuple]:
+        """
+        Walk, parse and chunk a source, yielding index operations in order:
+        ("delete", ids) for chunks of modified/removed files (and, for a source without a
+        manifest, for chunks it had indexed before),
+        ("chunk", id, text, metadata) for every new chunk and
+        ("manifest", file_path, entry) once a file's operations are complete.
+        Parsing runs in a process pool; updates `manifest` in place as files are processed.
+        A file that fails to parse keeps its previous chunks and manifest entry (or gets
+        none), so the next run retries it.
+        """
+        parser = ParallelParser(workers=settings.INGEST_PARSE_WORKERS, timeout=settings.INGEST_PARSE_TIMEOUT)
+        parse_seconds = 0.0
 
-        for file_path in files_to_process:
+        if not manifest.exists:
+            # Chunks indexed without a manifest have other IDs than the ones about to be written
+            unmanaged_ids = self._unmanaged_chunk_ids(project_id, source_path, source_id)
+            # Chroma bounds the number of IDs per call
+            for start in range(0, len(unmanaged_ids), 5000):
+                yield ("delete", unmanaged_ids[start:start + 5000])
+
+        for payload, content in parser.imap(self._iter_changed_files(source_path, manifest, paths, progress)):
+            if payload[0] in ("delete", "manifest"):
+                yield payload
+                continue
+
+            file_path, stat, content_hash, cached_text = payload
             ext = os.path.splitext(file_path)[1].lower()
-            if ext not in VALID_EXTENSIONS:
+            progress.current_file = file_path
+            progress.add_stage_time("parse", parser.parse_seconds - parse_seconds)
+            parse_seconds = parser.parse_seconds
+            if cached_text is not None:
+                content = cached_text
+                progress.add(files_parsed=1, files_cached=1)
+            elif isinstance(content, ParseFailure):
+                progress.add(files_failed=1)
                 continue
-            
-            content = self._read_file(file_path, ext)
-            if not content:
+            else:
+                progress.add(files_parsed=1, bytes_read=stat.st_size)
+                if self.text_cache is not None and ext in PARALLEL_EXTENSIONS:
+                    self.text_cache.put(content_hash, ext, content)
+
+            with progress.stage("parse"):
+                chunks = self._chunk(content, ext)
+            stale_ids = manifest.remove(file_path)
+            if stale_ids:
+                yield ("delete", stale_ids)
+            manifest.record(file_path, stat, content_hash, len(chunks))
+
+            metadata = {"source": file_path, "project_id": project_id}
+            if source_id is not None:
+                metadata["source_id"] = source_id
+            for chunk, chunk_id in zip(chunks, manifest.chunk_ids(file_path, len(chunks))):
+                yield ("chunk", chunk_id, chunk, metadata)
+            yield ("manifest", file_path, manifest.get(file_path))
+
+    def _unmanaged_chunk_ids(self, project_id: int, source_path: str, source_id: Optional[int],
+                             page_size: int = 5000) -> List[str]:
+        """
+        IDs of chunks of a source that has no manifest yet: chunks indexed before
+        manifests existed (random IDs) or left over from a lost manifest.
+        """
+        collection = self._get_collection(project_id)
+        prefix = os.path.join(source_path, "")
+        ids = []
+        offset = 0
+        while True:
+            page = collection.get(limit=page_size, offset=offset, include=["metadatas"])
+            for chunk_id, metadata in zip(page["ids"], page["metadatas"]):
+                metadata = metadata or {}
+                source = metadata.get("source", "")
+                if metadata.get("source_id", source_id) != source_id:
+                    continue
+                if source == source_path or source.startswith(prefix):
+                    ids.append(chunk_id)
+            if len(page["ids"]) < page_size:
+                return ids
+            offset += page_size
+
+    def _embed_ops(self, ops: Iterable[tuple], batch_size: int, progress: IngestProgress) -> Iterator[tuple]:
+        """
+        Group "chunk" operations into batches and embed them, yielding
+        ("upsert", ids, documents, metadatas, embeddings). Deletes pass through
+        immediately, which keeps them ahead of the re-embedded chunks of the same file;
+        manifest entries are held back until the chunks before them are upserted.
+        """
+        def embed(documents: List[str]) -> List[List[float]]:
+            with progress.stage("embed"):
+                embeddings = self._embed_documents(documents)
+            progress.add(chunks_embedded=len(documents))
+            return embeddings
+
+        ids, documents, metadatas = [], [], []
+        entries = []
+        for op in ops:
+            if op[0] == "delete":
+                yield op
+                continue
+            if op[0] == "manifest":
+                if ids:
+                    entries.append(op)
+                else:
+                    yield op
                 continue
 
-            # Simple chunking (e.g., 1000 chars with 100 overlap)
-            chunks = self._chunk_text(content, chunk_size=1000, overlap=100)
-            
-            for i, chunk in enumerate(chunks):
-                documents.append(chunk)
-                metadatas.append({"source": file_path, "project_id": project_id})
-                ids.append(str(uuid.uuid4()))
-
-        # Batch upsert to avoid memory issues
-        batch_size = 100
-        for i in range(0, len(documents), batch_size):
-            batch_docs = documents[i:i+batch_size]
-            batch_metas = metadatas[i:i+batch_size]
-            batch_ids = ids[i:i+batch_size]
-            
-            # Embeddings are generated automatically by chromadb if functionality is default? 
-            # But we are using our own model for control and local enforcement.
-            embeddings = self.model.encode(batch_docs).tolist()
-            
-            collection.upsert(
-                documents=batch_docs,
-                embeddings=embeddings,
-                metadatas=batch_metas,
-                ids=batch_ids
-            )
+            _, chunk_id, chunk, metadata = op
+            ids.append(chunk_id)
+            documents.append(chunk)
+            metadatas.append(metadata)
+            if len(ids) >= batch_size:
+                yield ("upsert", ids, documents, metadatas, embed(documents))
+                yield from entries
+                ids, documents, metadatas, entries = [], [], [], []
+
+        if ids:
+            yield ("upsert", ids, documents, metadatas, embed(documents))
+        yield from entries
+
+    def _embed_documents(self, documents: List[str]) -> List[List[float]]:
+        """Embed chunks, only sending embedding-cache misses to the model."""
+        if self.embedding_cache is None:
+            return self.embedder.encode(documents).tolist()
+        return self.embedding_cache.encode(self.embedding_model_id, documents, self.embedder.encode)
+
+    def stats(self) -> dict:
+        """
+        Embedding and extracted-text cache counters (hits, misses, size, estimated
+        encode time saved), encode throughput, reranker latency and the size of
+        loaded vector stores.
+        """
+        return {
+            "embedder": self.embedder.stats(),
+            "embedding_cache": self.embedding_cache.stats() if self.embedding_cache else None,
+            "text_cache": self.text_cache.stats() if self.text_cache else None,
+            "reranker": self.reranker.stats() if self.reranker else None,
+            "vector_stores": {
+                project_id: collection.stats() for project_id, collection in list(self._collections.items())
+            }
+        }
+
+    def _write_ops(self, project_id: int, collection, lexical_index: BM25Index, written: SourceManifest,
+                   ops_queue: queue.Queue, stop: threading.Event, errors: list, progress: IngestProgress):
+        """
+        Apply delete/upsert operations to the collection and lexical index as they arrive,
+        and record completed files in `written`, saving it every MANIFEST_SAVE_SECONDS.
+        """
+        saved_at = time.monotonic()
+        try:
+            for op in _drain_queue(ops_queue, stop):
+                if op[0] == "manifest":
+                    _, file_path, entry = op
+                    if entry is None:
+                        written.files.pop(file_path, None)
+                    else:
+                        written.files[file_path] = dict(entry)
+                    if time.monotonic() - saved_at > MANIFEST_SAVE_SECONDS:
+                        lexical_index.save()
+                        written.save()
+                        saved_at = time.monotonic()
+                    continue
+                with progress.stage("upsert"):
+                    if op[0] == "delete":
+                        collection.delete(ids=op[1])
+                        lexical_index.remove(op[1])
+                    else:
+                        _, ids, documents, metadatas, embeddings = op
+                        collection.upsert(
+                            documents=documents,
+                            embeddings=embeddings,
+                            metadatas=metadatas,
+                            ids=ids
+                        )
+                        lexical_index.add(ids, documents)
+                    # Keep the cached count query_project relies on up to date
+                    self._collection_counts[project_id] = collection.count()
+        except Exception as e:
+            errors.append(e)
+            stop.set()
 
     def _read_file(self, path: str, ext: str) -> str:
         """
         Read content from a file based on its extension.
         Supports .pdf, .docx, and plain text files.
         """
-        try:
-            if ext == '.pdf':
-                reader = PdfReader(path)
-                return "\n".join([page.extract_text() for page in reader.pages])
-            elif ext == '.docx':
-                doc = Document(path)
-                return "\n".join([p.text for p in doc.paragraphs])
-            else:
-                # Text based
-                with open(path, 'r', encoding='utf-8', errors='ignore') as f:
-                    return f.read()
-        except Exception as e:
-            print(f"Error reading {path}: {e}")
-            return ""
+        return read_file(path, ext)
 
-    def _chunk_text(self, text: str, chunk_size: int, overlap: int) -> List[str]:
+    def _chunk(self, text: str, ext: str) -> List[str]:
         """
-        Split text into overlapping chunks.
-        
-        Args:
-            text (str): Content to chunk.
-            chunk_size (int): Max characters per chunk.
-            overlap (int): Overlap characters between chunks.
-            
-        Returns:
-            List[str]: List of text chunks.
+        Split text into chunks with the strategy registered for its extension
+        (prose, code or CSV), each at most `chunk_max_tokens` model tokens.
         """
-        if not text:
+        return get_chunker(ext, self._count_tokens, self.chunk_max_tokens, settings.CHUNK_OVERLAP_TOKENS).chunk(text)
+
+    @property
+    def chunk_max_tokens(self) -> int:
+        """Chunk budget, capped so chunks are never truncated by the embedding model."""
+        max_seq_length = getattr(self.model, "max_seq_length", None)
+        if max_seq_length:
+            # Leave room for the [CLS]/[SEP] special tokens
+            return min(settings.CHUNK_MAX_TOKENS, max_seq_length - 2)
+        return settings.CHUNK_MAX_TOKENS
+
+    def _count_tokens(self, pieces: List[str]) -> List[int]:
+        """Count embedding-model tokens per string, batched through the model's tokenizer."""
+        if not pieces:
             return []
-        chunks = []
-        start = 0
-        while start < len(text):
-            end = start + chunk_size
-            chunks.append(text[start:end])
-            start += (chunk_size - overlap)
-        return chunks
+        with self._tokenizer_lock:
+            if self._chunk_tokenizer is None:
+                tokenizer = getattr(self.model, "tokenizer", None)
+                # Own copy: the embedding thread reconfigures padding/truncation on the shared one
+                self._chunk_tokenizer = copy.deepcopy(tokenizer) if tokenizer is not None else False
+            if not self._chunk_tokenizer:
+                return approximate_token_counter(pieces)
+            encoded = self._chunk_tokenizer(
+                pieces, add_special_tokens=False, return_attention_mask=False,
+                return_token_type_ids=False, verbose=False
+            )
+        return [len(ids) for ids in encoded["input_ids"]]
 
     def query_project(self, project_id: int, query_text: str, n_results: int = 3):
         """
         Query the RAG index for a project.
+
+        With `RAG_HYBRID_SEARCH` enabled, vector neighbours and BM25 matches are
+        both over-fetched and fused with reciprocal-rank fusion, so exact
+        identifiers and error strings are found even when MiniLM misses them.
+        With `RAG_RERANK` enabled, `RAG_RERANK_CANDIDATES` candidates are
+        reordered by a cross-encoder within `RAG_RERANK_BUDGET_MS`. With
+        `RAG_MMR` enabled, results are picked by maximal marginal relevance
+        to skip near-duplicates, and with `RAG_MERGE_ADJACENT` consecutive
+        chunks of the same file are returned as one merged match.
         
         Args:
             project_id (int): Project ID to query.
@@ -163,29 +865,130 @@ class RAGService:
             n_results (int): Number of top results to return.
             
         Returns:
-            List[dict]: List of matches containing content, metadata (source), and distance.
+            List[dict]: List of matches containing content, metadata (source), and distance
+            (None for chunks found only by the lexical index).
         """
-        collection = self._get_collection(project_id)
-        if collection.count() == 0:
+        hits = self._search(project_id, [query_text], n_results)[0]
+        return merge_adjacent_chunks(hits) if settings.RAG_MERGE_ADJACENT else hits
+
+    def query_project_many(self, project_id: int, queries: List[str], n_results: int = 3):
+        """
+        Query the RAG index for a project with several queries at once (sub-questions,
+        query expansion). All queries are embedded in one batch and sent to Chroma
+        in one call.
+
+        Args:
+            project_id (int): Project ID to query.
+            queries (List[str]): The search queries.
+            n_results (int): Number of top results per query.
+
+        Returns:
+            List[dict]: Matches of all queries without duplicates, interleaved by rank
+            (every query's best hit first), each with the `query` that found it.
+        """
+        queries = [q for q in dict.fromkeys(queries) if q.strip()]
+        if not queries:
             return []
 
-        query_embedding = self.model.encode([query_text]).tolist()
+        merged = []
+        seen = set()
+        per_query = self._search(project_id, queries, n_results)
+        for rank in range(n_results):
+            for query_text, hits in zip(queries, per_query):
+                if rank < len(hits) and hits[rank]["id"] not in seen:
+                    seen.add(hits[rank]["id"])
+                    merged.append({**hits[rank], "query": query_text})
+        return merge_adjacent_chunks(merged) if settings.RAG_MERGE_ADJACENT else merged
+
+    def _search(self, project_id: int, queries: List[str], n_results: int) -> List[List[dict]]:
+        """Ranked hits for each query; see `query_project`."""
+        count = self._get_count(project_id)
+        if count == 0:
+            return [[] for _ in queries]
+        collection = self._get_collection(project_id)
+
+        # MMR picks n_results out of a larger pool of the best candidates
+        n_pool = n_results * settings.RAG_MMR_POOL_FACTOR if settings.RAG_MMR else n_results
+        n_keep = max(n_pool, settings.RAG_RERANK_CANDIDATES) if self.reranker else n_pool
+        n_candidates = min(count, n_keep * 4 if settings.RAG_HYBRID_SEARCH and not self.reranker else n_keep)
         
+        query_embeddings = self._embed_queries(queries)
         results = collection.query(
-            query_embeddings=query_embedding,
-            n_results=n_results
+            query_embeddings=query_embeddings,
+            n_results=n_candidates
         )
         
         # Format results
-        hits = []
-        if results['documents']:
-            for i in range(len(results['documents'][0])):
-                hits.append({
-                    "content": results['documents'][0][i],
-                    "metadata": results['metadatas'][0][i],
-                    "distance": results['distances'][0][i] if results['distances'] else 0
-                })
-        return hits
+        per_query = []
+        for q in range(len(queries)):
+            hits = []
+            if results['documents']:
+                for i in range(len(results['documents'][q])):
+                    hits.append({
+                        "id": results['ids'][q][i],
+                        "content": results['documents'][q][i],
+                        "metadata": results['metadatas'][q][i],
+                        "distance": results['distances'][q][i] if results['distances'] else 0
+                    })
+            per_query.append(hits)
+
+        if settings.RAG_HYBRID_SEARCH:
+            per_query = self._fuse_lexical(project_id, collection, queries, per_query, n_candidates, n_keep)
+
+        if self.reranker:
+            per_query = [self.reranker.rerank(q, hits[:n_keep], n_pool) for q, hits in zip(queries, per_query)]
+        else:
+            per_query = [hits[:n_pool] for hits in per_query]
+
+        if settings.RAG_MMR:
+            per_query = self._diversify(collection, query_embeddings, per_query, n_results)
+        return per_query
+
+    def _diversify(self, collection, query_embeddings: List[List[float]], per_query: List[List[dict]],
+                   n_results: int) -> List[List[dict]]:
+        """Pick each query's `n_results` hits by maximal marginal relevance, fetching all candidate vectors in one call."""
+        ids = list(dict.fromkeys(hit["id"] for hits in per_query for hit in hits))
+        if not ids:
+            return per_query
+        stored = collection.get(ids=ids, include=["embeddings"])
+        vectors = dict(zip(stored["ids"], stored["embeddings"]))
+
+        diversified = []
+        for query_embedding, hits in zip(query_embeddings, per_query):
+            hits = [hit for hit in hits if hit["id"] in vectors]
+            if not hits:
+                diversified.append([])
+                continue
+            selected = maximal_marginal_relevance(
+                query_embedding, [vectors[hit["id"]] for hit in hits], n_results, settings.RAG_MMR_LAMBDA
+            )
+            diversified.append([hits[i] for i in selected])
+        return diversified
+
+    def _fuse_lexical(self, project_id: int, collection, queries: List[str], per_query: List[List[dict]],
+                      n_candidates: int, n_keep: int) -> List[List[dict]]:
+        """Fuse each query's vector hits with its BM25 matches (RRF), fetching lexical-only chunks in one call."""
+        lexical_index = self._get_lexical_index(project_id)
+        vector_hits = [{hit["id"]: hit for hit in hits} for hits in per_query]
+        fused_ids = []
+        for query_text, hits in zip(queries, per_query):
+            lexical_ids = [doc_id for doc_id, _ in lexical_index.search(query_text, n_candidates)]
+            fused = reciprocal_rank_fusion([[hit["id"] for hit in hits], lexical_ids])[:n_keep]
+            fused_ids.append([doc_id for doc_id, _ in fused])
+
+        lexical_hits = {}
+        missing = list(dict.fromkeys(
+            doc_id for ids, by_id in zip(fused_ids, vector_hits) for doc_id in ids if doc_id not in by_id
+        ))
+        if missing:
+            lexical_only = collection.get(ids=missing, include=["documents", "metadatas"])
+            for doc_id, document, metadata in zip(lexical_only["ids"], lexical_only["documents"], lexical_only["metadatas"]):
+                lexical_hits[doc_id] = {"id": doc_id, "content": document, "metadata": metadata, "distance": None}
+
+        return [
+            [by_id.get(doc_id) or lexical_hits[doc_id] for doc_id in ids if doc_id in by_id or doc_id in lexical_hits]
+            for ids, by_id in zip(fused_ids, vector_hits)
+        ]
 
 # Global instance
 rag_service = RAGService()
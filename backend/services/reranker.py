@@ -0,0 +1,121 @@
+import threading
+import time
+from typing import List
+
+
+class CrossEncoderReranker:
+    """
+    Reorders retrieval candidates with a small local cross-encoder.
+
+    Each query spends at most `budget_ms` scoring (query, chunk) pairs in
+    batches. When the next batch would not fit in the budget, or the model is
+    not loaded yet, the candidates are returned in their original (vector /
+    fused) order instead, so a slow CPU never delays the chat response by more
+    than the budget.
+    """
+
+    def __init__(self, model_name: str, budget_ms: float, batch_size: int = 8):
+        self.model_name = model_name
+        self.budget_ms = budget_ms
+        self.batch_size = batch_size
+        self._model = None
+        self._model_lock = threading.Lock()
+        self._loading = False
+        # Moving average of the time one batch takes, used to predict overruns
+        self._batch_ms = None
+        self._stats_lock = threading.Lock()
+        self.reranked = 0
+        self.fallbacks = 0
+        self.total_ms = 0.0
+
+    @property
+    def model(self):
+        """The cross-encoder, loaded on first access."""
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    from sentence_transformers import CrossEncoder
+                    self._model = CrossEncoder(self.model_name, device="cpu")
+        return self._model
+
+    def warm_up(self):
+        try:
+            self.model.predict([("warm up", "warm up")])
+        except Exception as e:
+            print(f"Error loading reranker {self.model_name}: {e}")
+        finally:
+            self._loading = False
+
+    def _load_in_background(self):
+        with self._model_lock:
+            if self._loading or self._model is not None:
+                return
+            self._loading = True
+        threading.Thread(target=self.warm_up, daemon=True).start()
+
+    def rerank(self, query_text: str, hits: List[dict], n_results: int) -> List[dict]:
+        """
+        Return the best `n_results` hits by cross-encoder score.
+
+        Args:
+            query_text (str): The search query.
+            hits (List[dict]): Candidates in retrieval order, each with a "content" key.
+            n_results (int): Number of hits to return.
+
+        Returns:
+            List[dict]: Top hits with a "rerank_score" key, or the first `n_results`
+            candidates unchanged if the latency budget was exceeded.
+        """
+        if len(hits) <= 1:
+            return hits[:n_results]
+        if self._model is None:
+            # Never pay the model load inside a query
+            self._load_in_background()
+            return self._fallback(hits, n_results, 0.0)
+
+        started = time.perf_counter()
+        scores = []
+        try:
+            for start in range(0, len(hits), self.batch_size):
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                if self._batch_ms is not None and elapsed_ms + self._batch_ms > self.budget_ms:
+                    if start == 0:
+                        # Let the estimate decay so a temporary slowdown doesn't disable reranking for good
+                        self._batch_ms *= 0.9
+                    return self._fallback(hits, n_results, elapsed_ms)
+                batch_started = time.perf_counter()
+                batch = hits[start:start + self.batch_size]
+                scores.extend(float(s) for s in self.model.predict([(query_text, hit["content"]) for hit in batch]))
+                batch_ms = (time.perf_counter() - batch_started) * 1000 * self.batch_size / len(batch)
+                self._batch_ms = batch_ms if self._batch_ms is None else 0.8 * self._batch_ms + 0.2 * batch_ms
+        except Exception as e:
+            print(f"Error reranking: {e}")
+            return self._fallback(hits, n_results, (time.perf_counter() - started) * 1000)
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if elapsed_ms > self.budget_ms:
+            return self._fallback(hits, n_results, elapsed_ms)
+
+        with self._stats_lock:
+            self.reranked += 1
+            self.total_ms += elapsed_ms
+        ranked = sorted(zip(scores, range(len(hits))), key=lambda item: item[0], reverse=True)[:n_results]
+        return [{**hits[i], "rerank_score": score} for score, i in ranked]
+
+    def _fallback(self, hits: List[dict], n_results: int, elapsed_ms: float) -> List[dict]:
+        with self._stats_lock:
+            self.fallbacks += 1
+            self.total_ms += elapsed_ms
+        return hits[:n_results]
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            queries = self.reranked + self.fallbacks
+            return {
+                "model": self.model_name,
+                "loaded": self._model is not None,
+                "budget_ms": self.budget_ms,
+                "reranked": self.reranked,
+                "fallbacks": self.fallbacks,
+                "mean_ms": self.total_ms / queries if queries else 0.0,
+            }
@@ -0,0 +1,88 @@
+import hashlib
+import json
+import os
+from typing import Dict, Any, List, Optional
+
+
+def file_content_hash(path: str, block_size: int = 1 << 20) -> str:
+    """Return the SHA-256 hex digest of a file's content, read in blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class SourceManifest:
+    """
+    Persisted record of what has been indexed for one knowledge source.
+
+    For every file under the source it stores size, mtime, content hash and the
+    number of chunks written, so re-ingestion can skip unchanged files and
+    delete the chunks of modified or removed ones. Chunk IDs are derived from
+    the source path, the file path and the chunk index, so they are stable
+    across runs and upserts overwrite instead of duplicating.
+    """
+
+    def __init__(self, manifest_dir: str, project_id: int, source_path: str, signature: str = ""):
+        self.source_path = source_path
+        self.signature = signature
+        self.source_key = hashlib.sha1(source_path.encode("utf-8")).hexdigest()[:16]
+        self.dir_path = os.path.join(manifest_dir, f"project_{project_id}")
+        self.file_path = os.path.join(self.dir_path, f"{self.source_key}.json")
+        # False for a source never ingested with a manifest (or whose manifest was lost)
+        self.exists = os.path.exists(self.file_path)
+        self.files: Dict[str, Dict[str, Any]] = self._load()
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if not os.path.exists(self.file_path):
+            return {}
+        try:
+            with open(self.file_path, "r") as f:
+                data = json.load(f)
+        except (json.JSONDecodeError, OSError):
+            return {}
+        files = data.get("files", {})
+        if data.get("signature", "") != self.signature:
+            # Chunking changed: keep chunk counts for cleanup but force every file to be re-chunked
+            for entry in files.values():
+                entry["size"] = entry["mtime"] = entry["hash"] = None
+        return files
+
+    def save(self):
+        os.makedirs(self.dir_path, exist_ok=True)
+        tmp_path = self.file_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"source": self.source_path, "signature": self.signature, "files": self.files}, f)
+        os.replace(tmp_path, self.file_path)
+
+    def delete(self):
+        if os.path.exists(self.file_path):
+            os.remove(self.file_path)
+
+    def get(self, file_path: str) -> Optional[Dict[str, Any]]:
+        return self.files.get(file_path)
+
+    def is_unchanged(self, file_path: str, stat: os.stat_result) -> bool:
+        """Cheap check: same size and mtime as the last indexed version."""
+        entry = self.files.get(file_path)
+        return bool(entry) and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime_ns
+
+    def record(self, file_path: str, stat: os.stat_result, content_hash: str, chunk_count: int):
+        self.files[file_path] = {
+            "size": stat.st_size,
+            "mtime": stat.st_mtime_ns,
+            "hash": content_hash,
+            "chunks": chunk_count,
+        }
+
+    def remove(self, file_path: str) -> List[str]:
+        """Forget a file and return the chunk IDs it had in the index."""
+        entry = self.files.pop(file_path, None)
+        if not entry:
+            return []
+        return self.chunk_ids(file_path, entry["chunks"])
+
+    def chunk_ids(self, file_path: str, count: int) -> List[str]:
+        file_key = hashlib.sha1(f"{self.source_path}\0{file_path}".encode("utf-8")).hexdigest()[:20]
+        return [f"{file_key}:{i}" for i in range(count)]
@@ -0,0 +1,163 @@
+import os
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+from config import settings
+from constants import VALID_EXTENSIONS, SKIP_EXTENSIONS
+
+
+def _is_relevant(path: str, modified: bool = False) -> bool:
+    """
+    Whether a change to `path` can affect the index: an indexable file, or
+    something without an extension that may be a directory (created, moved or
+    removed as a whole). A directory's own modification (entries added or
+    removed) is reported separately for those entries, so it is skipped.
+    """
+    if modified and os.path.isdir(path):
+        return False
+    if any(x in os.path.dirname(path) for x in SKIP_EXTENSIONS) or os.path.basename(path) in SKIP_EXTENSIONS:
+        return False
+    ext = os.path.splitext(path)[1].lower()
+    return ext in VALID_EXTENSIONS or not ext or os.path.isdir(path)
+
+
+class SourceWatcher:
+    """
+    Watches knowledge sources for file changes, one thread per source.
+
+    Uses OS change notifications (inotify, FSEvents, ...) through `watchfiles`,
+    polling when notifications are unavailable (network drives, watch limits
+    exhausted) or `watchfiles` is not installed. Bursts of changes are
+    coalesced: a batch is handed to the callback once no change arrived for
+    `debounce_ms`, or after `max_batch_ms` of continuous changes. Changes made
+    while the callback runs are collected and delivered as the next batch.
+    """
+
+    def __init__(self, debounce_ms: int, max_batch_ms: int, poll_interval_ms: int, force_polling: bool = False):
+        self.debounce_ms = debounce_ms
+        self.max_batch_ms = max_batch_ms
+        self.poll_interval_ms = poll_interval_ms
+        self.force_polling = force_polling
+        self._watches: Dict[int, Tuple[threading.Thread, threading.Event]] = {}
+        self._lock = threading.Lock()
+
+    def watch(self, source_id: int, path: str, on_change: Callable[[List[str]], None]):
+        """
+        Start watching a source; no-op if it is already watched.
+
+        Args:
+            source_id (int): KnowledgeSource ID the watch is registered under.
+            path (str): File or directory to watch (recursively).
+            on_change (Callable): Called from the watch thread with the changed paths of each batch.
+        """
+        with self._lock:
+            if source_id in self._watches:
+                return
+            stop = threading.Event()
+            thread = threading.Thread(
+                target=self._run, args=(path, on_change, stop), name=f"source-watcher-{source_id}", daemon=True
+            )
+            self._watches[source_id] = (thread, stop)
+        thread.start()
+
+    def unwatch(self, source_id: int, timeout: Optional[float] = 5.0):
+        """Stop watching a source, waiting up to `timeout` seconds for a running batch to finish."""
+        with self._lock:
+            watch = self._watches.pop(source_id, None)
+        if watch:
+            thread, stop = watch
+            stop.set()
+            if thread is not threading.current_thread():
+                thread.join(timeout)
+
+    def is_watching(self, source_id: int) -> bool:
+        with self._lock:
+            return source_id in self._watches
+
+    def stop_all(self):
+        with self._lock:
+            source_ids = list(self._watches)
+        for source_id in source_ids:
+            self.unwatch(source_id)
+
+    def _run(self, path: str, on_change: Callable[[List[str]], None], stop: threading.Event):
+        try:
+            import watchfiles
+        except ImportError:
+            print("watchfiles is not installed, polling knowledge sources for changes")
+            self._poll(path, on_change, stop)
+            return
+
+        force_polling = self.force_polling
+        while not stop.is_set():
+            try:
+                for changes in watchfiles.watch(
+                    path,
+                    watch_filter=lambda change, changed_path: _is_relevant(
+                        changed_path, modified=change == watchfiles.Change.modified
+                    ),
+                    step=self.debounce_ms,
+                    debounce=self.max_batch_ms,
+                    stop_event=stop,
+                    force_polling=force_polling,
+                    poll_delay_ms=self.poll_interval_ms,
+                    raise_interrupt=False,
+                ):
+                    self._deliver(sorted({changed_path for _, changed_path in changes}), on_change)
+                return
+            except Exception as e:
+                if force_polling:
+                    print(f"Error watching {path}: {e}")
+                    return
+                # E.g. the inotify watch limit is exhausted on a large tree
+                print(f"Change notifications unavailable for {path} ({e}), falling back to polling")
+                force_polling = True
+
+    def _poll(self, path: str, on_change: Callable[[List[str]], None], stop: threading.Event):
+        """Stat-only polling: compare size/mtime snapshots of the source's files."""
+        previous = self._snapshot(path)
+        while not stop.wait(self.poll_interval_ms / 1000):
+            current = self._snapshot(path)
+            changed = sorted(
+                file_path for file_path in previous.keys() | current.keys()
+                if previous.get(file_path) != current.get(file_path)
+            )
+            previous = current
+            if changed:
+                self._deliver(changed, on_change)
+
+    def _snapshot(self, path: str) -> Dict[str, Tuple[int, int]]:
+        if os.path.isfile(path):
+            candidates = [path]
+        else:
+            candidates = (
+                os.path.join(root, file)
+                for root, dirs, files in os.walk(path)
+                if not any(x in root for x in SKIP_EXTENSIONS)
+                for file in files
+            )
+        snapshot = {}
+        for file_path in candidates:
+            if os.path.splitext(file_path)[1].lower() not in VALID_EXTENSIONS:
+                continue
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                continue
+            snapshot[file_path] = (stat.st_size, stat.st_mtime_ns)
+        return snapshot
+
+    def _deliver(self, changed: List[str], on_change: Callable[[List[str]], None]):
+        try:
+            on_change(changed)
+        except Exception as e:
+            print(f"Error handling changes to {len(changed)} watched file(s): {e}")
+
+
+# Global instance
+source_watcher = SourceWatcher(
+    debounce_ms=settings.SOURCE_WATCH_DEBOUNCE_MS,
+    max_batch_ms=settings.SOURCE_WATCH_MAX_BATCH_MS,
+    poll_interval_ms=settings.SOURCE_WATCH_POLL_INTERVAL_MS,
+    force_polling=settings.SOURCE_WATCH_POLLING,
+)
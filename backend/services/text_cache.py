@@ -0,0 +1,111 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Dict, Optional
+
+
+class TextCache:
+    """
+    On-disk cache of text extracted from documents (PDF, DOCX).
+
+    Entries are keyed by the file's content hash, its extension and the parser
+    version, so re-indexing, changing chunk settings or adding the same paper
+    to another project reuses the extraction instead of parsing again, while a
+    parser upgrade invalidates everything. Text is stored zlib-compressed in
+    SQLite; once the cache grows past `max_bytes` the least recently used
+    entries are evicted.
+    """
+
+    def __init__(self, path: str, max_bytes: int, parser_version: str):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.parser_version = parser_version
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS texts ("
+            "key TEXT PRIMARY KEY, text BLOB NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_texts_last_used ON texts(last_used)")
+        self._conn.commit()
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM texts").fetchone()[0]
+
+    def _key(self, content_hash: str, ext: str) -> str:
+        return hashlib.sha256(f"{self.parser_version}\0{ext}\0{content_hash}".encode("utf-8")).hexdigest()
+
+    def get(self, content_hash: str, ext: str) -> Optional[str]:
+        """
+        Args:
+            content_hash (str): SHA-256 of the file's content.
+            ext (str): The file's extension (selects the parser).
+
+        Returns:
+            Optional[str]: The cached text, or None on a miss.
+        """
+        key = self._key(content_hash, ext)
+        with self._lock:
+            row = self._conn.execute("SELECT text FROM texts WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute("UPDATE texts SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+        return zlib.decompress(row[0]).decode("utf-8")
+
+    def put(self, content_hash: str, ext: str, text: str):
+        """Store the text extracted from a file, evicting old entries if over the cap."""
+        blob = zlib.compress(text.encode("utf-8"))
+        if len(blob) > self.max_bytes:
+            return
+        key = self._key(content_hash, ext)
+        with self._lock:
+            previous = self._conn.execute("SELECT size FROM texts WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO texts (key, text, size, last_used) VALUES (?, ?, ?, ?)",
+                (key, blob, len(blob), time.time())
+            )
+            self._total_bytes += len(blob) - (previous[0] if previous else 0)
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """Drop least recently used entries until the cache is back under 90% of its cap."""
+        target = int(self.max_bytes * 0.9)
+        while self._total_bytes > target:
+            rows = self._conn.execute(
+                "SELECT key, size FROM texts ORDER BY last_used ASC LIMIT 100"
+            ).fetchall()
+            if not rows:
+                self._total_bytes = 0
+                break
+            evicted = []
+            for key, size in rows:
+                evicted.append((key,))
+                self._total_bytes -= size
+                if self._total_bytes <= target:
+                    break
+            self._conn.executemany("DELETE FROM texts WHERE key = ?", evicted)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters since startup and the cache's size."""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM texts").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": entries,
+                "size_bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+            }
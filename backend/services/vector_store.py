@@ -0,0 +1,184 @@
+import os
+import re
+import shutil
+import sqlite3
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+
+# Chroma names segment directories by UUID
+_UUID_RE = re.compile(r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$")
+
+
+class VectorStore(ABC):
+    """
+    Vector storage of one project's chunks.
+
+    Method signatures and result shapes follow the Chroma collection API
+    (`query` returns one list per query embedding under "ids", "documents",
+    "metadatas" and "distances"; distances are squared L2), so RAGService
+    works the same with every backend.
+    """
+
+    name: str
+
+    @abstractmethod
+    def count(self) -> int:
+        """Number of chunks stored."""
+
+    @abstractmethod
+    def upsert(self, ids: List[str], embeddings, documents: Optional[List[str]] = None,
+               metadatas: Optional[List[dict]] = None):
+        """Insert chunks, replacing any with the same ID."""
+
+    @abstractmethod
+    def query(self, query_embeddings, n_results: int = 10) -> Dict[str, Any]:
+        """Nearest `n_results` chunks for each query embedding."""
+
+    @abstractmethod
+    def get(self, ids: Optional[List[str]] = None, where: Optional[Dict[str, Any]] = None,
+            limit: Optional[int] = None, offset: Optional[int] = None,
+            include: List[str] = ["metadatas", "documents"]) -> Dict[str, Any]:
+        """Chunks by ID and/or metadata filter, optionally paged."""
+
+    @abstractmethod
+    def delete(self, ids: Optional[List[str]] = None, where: Optional[Dict[str, Any]] = None):
+        """Delete chunks by ID and/or metadata filter."""
+
+    @abstractmethod
+    def compact(self):
+        """Rebuild the storage without the space held by deleted chunks."""
+
+    @abstractmethod
+    def drop(self):
+        """Delete the store and all of its data."""
+
+    @abstractmethod
+    def disk_usage(self) -> int:
+        """Bytes on disk of this store's own files (not of files shared with other projects)."""
+
+    def stats(self) -> dict:
+        return {"backend": type(self).__name__, "chunks": self.count()}
+
+
+class ChromaVectorStore(VectorStore):
+    """A project's ChromaDB collection (persistent HNSW index + SQLite)."""
+
+    def __init__(self, client, db_path: str, name: str):
+        self.client = client
+        self.db_path = db_path
+        self.name = name
+        self.collection = client.get_or_create_collection(name=name)
+        self._recover()
+
+    def count(self) -> int:
+        return self.collection.count()
+
+    def upsert(self, ids, embeddings, documents=None, metadatas=None):
+        self.collection.upsert(ids=ids, embeddings=embeddings, documents=documents, metadatas=metadatas)
+
+    def query(self, query_embeddings, n_results=10):
+        return self.collection.query(query_embeddings=query_embeddings, n_results=n_results)
+
+    def get(self, ids=None, where=None, limit=None, offset=None, include=["metadatas", "documents"]):
+        return self.collection.get(ids=ids, where=where, limit=limit, offset=offset, include=include)
+
+    def delete(self, ids=None, where=None):
+        self.collection.delete(ids=ids, where=where)
+
+    def compact(self):
+        """
+        Chroma's HNSW index only marks deleted vectors, so live chunks are copied
+        (with their stored embeddings) into a fresh collection that replaces this one.
+        """
+        self._recover()
+        rebuilt = self.client.create_collection(name=f"{self.name}_compacting")
+        copy_vector_store(self, rebuilt)
+        self.client.delete_collection(name=self.name)
+        rebuilt.modify(name=self.name)
+        self.collection = rebuilt
+        remove_orphan_segments(self.db_path)
+
+    def _recover(self):
+        """
+        Clean up after an interrupted compaction. Interrupted while copying, the
+        original is intact and the copy is dropped; interrupted between dropping
+        the original and renaming the copy, the copy holds the only data (opening
+        the store recreated the original empty), so it is renamed back.
+        """
+        try:
+            leftover = self.client.get_collection(name=f"{self.name}_compacting")
+        except Exception:
+            return
+        if self.collection.count() == 0 and leftover.count() > 0:
+            self.client.delete_collection(name=self.name)
+            leftover.modify(name=self.name)
+            self.collection = leftover
+        else:
+            self.client.delete_collection(name=leftover.name)
+        remove_orphan_segments(self.db_path)
+
+    def drop(self):
+        self.client.delete_collection(name=self.name)
+        remove_orphan_segments(self.db_path)
+
+    def disk_usage(self) -> int:
+        """
+        Size of the collection's segment directories (its HNSW index). Documents
+        and metadata live in chroma.sqlite3, which all collections share.
+        """
+        try:
+            conn = sqlite3.connect(f"file:{os.path.join(self.db_path, 'chroma.sqlite3')}?mode=ro", uri=True)
+            try:
+                segments = [row[0] for row in conn.execute(
+                    "SELECT id FROM segments WHERE collection = ?", (str(self.collection.id),)
+                )]
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            print(f"Error reading Chroma segments: {e}")
+            return 0
+        return sum(directory_size(os.path.join(self.db_path, segment)) for segment in segments)
+
+
+def directory_size(path: str) -> int:
+    """Total size in bytes of the files under a directory."""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def copy_vector_store(source, target, page_size: int = 1000):
+    """Copy every chunk (document, metadata and stored embedding) from one store or collection to another."""
+    offset = 0
+    while True:
+        page = source.get(limit=page_size, offset=offset, include=["documents", "metadatas", "embeddings"])
+        if not len(page["ids"]):
+            break
+        target.upsert(ids=page["ids"], documents=page["documents"], metadatas=page["metadatas"], embeddings=page["embeddings"])
+        offset += len(page["ids"])
+
+
+def remove_orphan_segments(db_path: str):
+    """
+    Delete HNSW segment directories no collection refers to anymore. Chroma
+    drops a deleted collection's segments from its catalog but leaves the
+    files on disk.
+    """
+    try:
+        conn = sqlite3.connect(f"file:{os.path.join(db_path, 'chroma.sqlite3')}?mode=ro", uri=True)
+        try:
+            live = {row[0] for row in conn.execute("SELECT id FROM segments")}
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        print(f"Error reading Chroma segments: {e}")
+        return
+    for name in os.listdir(db_path):
+        path = os.path.join(db_path, name)
+        if os.path.isdir(path) and _UUID_RE.match(name) and name not in live:
+            shutil.rmtree(path, ignore_errors=True)
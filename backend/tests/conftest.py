@@ -0,0 +1,51 @@
+import hashlib
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# Keep the module-level service instances from opening caches in the data directory
+os.environ.setdefault("EMBEDDING_CACHE_MAX_MB", "0")
+os.environ.setdefault("TEXT_CACHE_MAX_MB", "0")
+os.environ.setdefault("RAG_WARMUP", "false")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class FakeEmbeddingModel:
+    """In-process stand-in for the SentenceTransformer: hashed bag-of-words vectors."""
+
+    dimensions = 32
+    max_seq_length = 256
+
+    def __init__(self):
+        self.encoded = 0
+
+    def encode(self, texts, **kwargs):
+        self.encoded += len(texts)
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                vectors[row, int(hashlib.md5(word.encode("utf-8")).hexdigest(), 16) % self.dimensions] += 1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+
+@pytest.fixture
+def rag(tmp_path, monkeypatch):
+    """A RAGService on NumPy storage under tmp_path, with the fake embedding model."""
+    from config import settings
+    from services.rag_service import RAGService
+
+    monkeypatch.setattr(settings, "RAG_VECTOR_STORAGE", "numpy")
+    monkeypatch.setattr(settings, "INGEST_PARSE_WORKERS", 1)
+    service = RAGService()
+    service.db_path = str(tmp_path / "index")
+    os.makedirs(service.db_path)
+    service.manifest_dir = os.path.join(service.db_path, "manifests")
+    service.storage_modes_path = os.path.join(service.db_path, "storage_modes.json")
+    service._model = FakeEmbeddingModel()
+    service.embedding_cache = None
+    service.text_cache = None
+    return service
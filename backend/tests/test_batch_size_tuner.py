@@ -0,0 +1,75 @@
+import numpy as np
+
+from conftest import FakeEmbeddingModel
+from services.embedding_executor import BatchSizeTuner, EmbeddingExecutor
+
+
+def _run(tuner, chars_per_second, batches=400):
+    """Feed the tuner timings from a model whose throughput depends only on the batch size."""
+    for _ in range(batches):
+        size = tuner.next_size()
+        chars = size * 200
+        tuner.record(size, chars, chars / chars_per_second(size))
+
+
+def test_tuner_climbs_to_the_fastest_size():
+    fastest = {8: 1000, 16: 1800, 32: 2600, 64: 3200, 128: 3500, 256: 3000}
+    tuner = BatchSizeTuner()
+    _run(tuner, fastest.get)
+    assert tuner.batch_size == 128
+    assert set(tuner.stats()["chars_per_second"]) >= {64, 128, 256}
+
+
+def test_tuner_stays_when_neighbours_are_not_clearly_faster():
+    # Within the 5% margin: measurement noise must not move the size
+    tuner = BatchSizeTuner()
+    _run(tuner, {8: 1000, 16: 2000, 32: 2600, 64: 2700, 128: 2000, 256: 1000}.get)
+    assert tuner.batch_size == 32
+
+
+def test_tuner_probes_both_directions_and_stays_in_range():
+    tuner = BatchSizeTuner(sizes=(8, 16), initial=8, probe_every=2)
+    seen = {tuner.next_size() for _ in range(20)}
+    assert seen == {8, 16}
+
+
+def test_only_full_batches_are_recorded():
+    model = FakeEmbeddingModel()
+    executor = EmbeddingExecutor(lambda: model, "fake", workers=1, batch_size=0)
+    texts = [f"text number {i}" for i in range(40)]
+
+    vectors = executor.encode(texts)
+
+    # Results come back in input order although batches are length-sorted
+    assert np.allclose(vectors, model.encode(texts))
+    # 40 texts at the initial 32: one full batch of 32 and a partial one of 8
+    assert list(executor.tuner.stats()["chars_per_second"]) == [32]
+
+
+def test_pooled_requests_keep_tuning():
+    # Throughput by batch length, as the pool workers would measure it
+    rates = {8: 1000, 16: 1800, 32: 2600, 64: 3200, 128: 3000, 256: 2000}
+    model = FakeEmbeddingModel()
+    executor = EmbeddingExecutor(lambda: model, "fake", workers=4, batch_size=0)
+
+    def encode_pooled(batches):
+        for batch, size in batches:
+            executor._record(batch, size, sum(len(text) for text in batch) / rates[len(batch)])
+        return np.concatenate([model.encode(batch) for batch, _ in batches])
+
+    executor._encode_pooled = encode_pooled
+    for request in range(100):
+        # Requests are sized the way ingestion sizes them
+        texts = [f"chunk {request} {i} " + "x" * 100 for i in range(executor.preferred_request_size)]
+        executor.encode(texts)
+    assert executor.batch_size == 64
+    assert not executor.tuner.probing
+
+
+def test_requests_smaller_than_the_probe_give_it_up():
+    model = FakeEmbeddingModel()
+    executor = EmbeddingExecutor(lambda: model, "fake", workers=1, batch_size=0)
+    executor.tuner = BatchSizeTuner(sizes=(8, 16), initial=8, probe_every=1)
+    for i in range(5):
+        executor.encode([f"query {i}"])
+    assert not executor.tuner.probing
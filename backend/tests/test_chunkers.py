@@ -0,0 +1,42 @@
+import pytest
+
+from services.chunkers import Chunker, CsvChunker, approximate_token_counter
+
+
+def _tokens(text):
+    return approximate_token_counter([text])[0]
+
+
+def test_chunker_requires_a_split_strategy():
+    with pytest.raises(TypeError):
+        Chunker(approximate_token_counter, 100, 0)
+
+
+def test_csv_rows_are_grouped_behind_the_header():
+    header = "name,city\n"
+    rows = [f"person {i},city {i}\n" for i in range(40)]
+    chunks = CsvChunker(approximate_token_counter, 40, 0).chunk(header + "".join(rows))
+
+    assert len(chunks) > 1
+    assert all(chunk.startswith(header) and _tokens(chunk) <= 40 for chunk in chunks)
+    assert "".join(chunk[len(header):] for chunk in chunks) == "".join(rows)
+
+
+def test_oversized_csv_row_is_split_into_windows():
+    header = "id,notes\n"
+    long_row = "1," + " ".join(f"word{i}" for i in range(200)) + "\n"
+    chunks = CsvChunker(approximate_token_counter, 40, 0).chunk(header + long_row + "2,short\n")
+
+    assert len(chunks) > 2
+    assert all(chunk.startswith(header) and _tokens(chunk) <= 40 for chunk in chunks)
+    assert chunks[-1] == header + "2,short\n"
+    assert "".join(chunk[len(header):] for chunk in chunks[:-1]) == long_row
+
+
+def test_csv_with_oversized_header_falls_back_to_windows():
+    header = ",".join(f"column_{i}" for i in range(60)) + "\n"
+    text = header + "".join(f"{i}," * 60 + "\n" for i in range(5))
+    chunks = CsvChunker(approximate_token_counter, 40, 0).chunk(text)
+
+    assert all(_tokens(chunk) <= 40 for chunk in chunks)
+    assert "".join(chunks).split() == text.split()
@@ -0,0 +1,76 @@
+import os
+
+import pytest
+
+from config import settings
+from services.vector_store import copy_vector_store, directory_size
+
+
+def _ingest(rag, project_id, source, files):
+    os.makedirs(source, exist_ok=True)
+    for i in range(files):
+        with open(os.path.join(source, f"{i}.md"), "w") as f:
+            f.write(f"Document {i} of project {project_id}. " * 40)
+    rag.ingest_source(project_id, source)
+
+
+@pytest.mark.parametrize("storage", ["numpy", "chroma"])
+def test_compaction_reports_only_the_projects_own_files(rag, tmp_path, monkeypatch, storage):
+    monkeypatch.setattr(settings, "RAG_VECTOR_STORAGE", storage)
+    # Another, larger project in the same store must not show up in the sizes
+    _ingest(rag, 2, str(tmp_path / "other"), 60)
+    source = str(tmp_path / "docs")
+    _ingest(rag, 1, source, 30)
+    for i in range(25):
+        os.remove(os.path.join(source, f"{i}.md"))
+    rag.ingest_source(1, source)
+    chunks = rag._get_collection(1).count()
+
+    report = rag.compact_project_index(1)
+
+    assert report["chunks"] == chunks
+    assert 0 < report["size_after_bytes"] <= report["size_before_bytes"]
+    assert report["reclaimed_bytes"] == report["size_before_bytes"] - report["size_after_bytes"]
+    other_size = rag._get_collection(2).disk_usage() + rag._get_lexical_index(2).disk_usage()
+    assert report["size_after_bytes"] + other_size <= directory_size(rag.db_path)
+    assert rag._get_collection(1).count() == chunks
+
+
+def _chroma_store(path, name="project_1"):
+    import chromadb
+
+    from services.vector_store import ChromaVectorStore
+
+    return ChromaVectorStore(chromadb.PersistentClient(path=path), path, name)
+
+
+def _fill(collection, n):
+    collection.upsert(ids=[f"c{i}" for i in range(n)], embeddings=[[float(i), 1.0] for i in range(n)],
+                      documents=[f"chunk {i}" for i in range(n)])
+
+
+def test_compaction_interrupted_before_the_rename_is_recovered(tmp_path):
+    path = str(tmp_path / "chroma")
+    store = _chroma_store(path)
+    _fill(store, 5)
+    # Crash after the copy was made and the original dropped, before the rename
+    rebuilt = store.client.create_collection(name="project_1_compacting")
+    copy_vector_store(store, rebuilt)
+    store.client.delete_collection(name="project_1")
+
+    reopened = _chroma_store(path)
+    assert reopened.count() == 5
+    assert "project_1_compacting" not in [c.name for c in reopened.client.list_collections()]
+    reopened.compact()
+    assert reopened.count() == 5
+
+
+def test_compaction_interrupted_while_copying_keeps_the_original(tmp_path):
+    path = str(tmp_path / "chroma")
+    store = _chroma_store(path)
+    _fill(store, 5)
+    _fill(store.client.create_collection(name="project_1_compacting"), 2)
+
+    reopened = _chroma_store(path)
+    assert reopened.count() == 5
+    assert "project_1_compacting" not in [c.name for c in reopened.client.list_collections()]
@@ -0,0 +1,30 @@
+import numpy as np
+
+from services.embedding_cache import EmbeddingCache
+
+
+def _encode(texts):
+    return np.ones((len(texts), 8), dtype=np.float32)
+
+
+def test_replaced_entries_are_not_counted_twice(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "embeddings.db"), max_bytes=1 << 20)
+    cache.encode("model", ["a", "b"], _encode)
+    size = cache.stats()["size_bytes"]
+    assert size == 2 * 8 * 4
+
+    # As when two ingests embed the same chunk at once
+    cache._store({cache._key("model", "a"): np.zeros(8, dtype=np.float32)}, 0.0)
+    assert cache.stats()["size_bytes"] == size
+    reopened = EmbeddingCache(str(tmp_path / "embeddings.db"), max_bytes=1 << 20)
+    assert reopened.stats()["size_bytes"] == size
+
+
+def test_eviction_keeps_the_cache_under_its_cap(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "embeddings.db"), max_bytes=10 * 8 * 4)
+    for i in range(30):
+        cache.encode("model", [f"text {i}"], _encode)
+        cache.encode("model", [f"text {i}"], _encode)
+    stats = cache.stats()
+    assert stats["size_bytes"] <= stats["max_bytes"]
+    assert stats["entries"] * 8 * 4 == stats["size_bytes"]
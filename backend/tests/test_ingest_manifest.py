@@ -0,0 +1,191 @@
+import os
+
+from services.document_parser import ParseFailure
+from services.source_manifest import SourceManifest
+
+PROJECT_ID = 1
+
+
+def _write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
+
+
+def _ids(rag):
+    return set(rag._get_collection(PROJECT_ID).get(include=[])["ids"])
+
+
+def _progress(rag, source):
+    return rag.ingest_progress(PROJECT_ID, source)
+
+
+def test_unchanged_files_are_skipped(rag, tmp_path):
+    source = str(tmp_path / "docs")
+    _write(os.path.join(source, "a.md"), "Alpha notes about widgets.")
+    _write(os.path.join(source, "b.md"), "Beta notes about gadgets.")
+
+    rag.ingest_source(PROJECT_ID, source)
+    first = _ids(rag)
+    assert len(first) == 2
+    assert _progress(rag, source)["files_parsed"] == 2
+
+    rag.ingest_source(PROJECT_ID, source)
+    progress = _progress(rag, source)
+    assert progress["files_parsed"] == 0
+    assert progress["files_skipped"] == 2
+    assert _ids(rag) == first
+
+
+def test_modified_and_removed_files_replace_their_chunks(rag, tmp_path):
+    source = str(tmp_path / "docs")
+    a, b = os.path.join(source, "a.md"), os.path.join(source, "b.md")
+    _write(a, "Alpha notes about widgets.")
+    _write(b, "Beta notes about gadgets.")
+    rag.ingest_source(PROJECT_ID, source)
+
+    _write(a, "Alpha notes, rewritten.\n\n" + "More alpha text. " * 200)
+    os.remove(b)
+    rag.ingest_source(PROJECT_ID, source)
+
+    progress = _progress(rag, source)
+    assert progress["files_parsed"] == 1
+    assert progress["files_removed"] == 1
+    manifest = SourceManifest(rag.manifest_dir, PROJECT_ID, source, rag._chunking_signature())
+    assert set(manifest.files) == {a}
+    assert _ids(rag) == set(manifest.chunk_ids(a, manifest.get(a)["chunks"]))
+    documents = rag._get_collection(PROJECT_ID).get()["documents"]
+    assert not any("Beta" in document for document in documents)
+
+
+def test_touched_file_is_not_reparsed(rag, tmp_path):
+    source = str(tmp_path / "docs")
+    a = os.path.join(source, "a.md")
+    _write(a, "Alpha notes about widgets.")
+    rag.ingest_source(PROJECT_ID, source)
+
+    stat = os.stat(a)
+    os.utime(a, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10_000_000_000))
+    rag.ingest_source(PROJECT_ID, source)
+    progress = _progress(rag, source)
+    assert progress["files_parsed"] == 0
+    assert progress["files_skipped"] == 1
+
+
+def test_failed_parse_keeps_chunks_and_is_retried(rag, tmp_path, monkeypatch):
+    import services.document_parser as document_parser
+
+    source = str(tmp_path / "docs")
+    a = os.path.join(source, "a.md")
+    _write(a, "Alpha notes about widgets.")
+    rag.ingest_source(PROJECT_ID, source)
+    indexed = _ids(rag)
+
+    _write(a, "Alpha notes, second version.")
+    real_read_file = document_parser.read_file
+    monkeypatch.setattr(document_parser, "read_file", lambda path, ext: ParseFailure("parser timed out"))
+    rag.ingest_source(PROJECT_ID, source)
+    assert _progress(rag, source)["files_failed"] == 1
+    # The previous version stays searchable until the file parses again
+    assert _ids(rag) == indexed
+
+    monkeypatch.setattr(document_parser, "read_file", real_read_file)
+    rag.ingest_source(PROJECT_ID, source)
+    assert _progress(rag, source)["files_parsed"] == 1
+    assert "second version" in rag._get_collection(PROJECT_ID).get()["documents"][0]
+
+
+def test_new_file_that_fails_to_parse_is_not_recorded(rag, tmp_path, monkeypatch):
+    import services.document_parser as document_parser
+
+    source = str(tmp_path / "docs")
+    _write(os.path.join(source, "a.md"), "Alpha notes about widgets.")
+    real_read_file = document_parser.read_file
+    monkeypatch.setattr(document_parser, "read_file", lambda path, ext: ParseFailure("corrupt"))
+    rag.ingest_source(PROJECT_ID, source)
+
+    manifest = SourceManifest(rag.manifest_dir, PROJECT_ID, source, rag._chunking_signature())
+    assert manifest.files == {}
+    monkeypatch.setattr(document_parser, "read_file", real_read_file)
+    rag.ingest_source(PROJECT_ID, source)
+    assert _progress(rag, source)["files_parsed"] == 1
+
+
+def test_chunks_indexed_without_manifest_are_replaced(rag, tmp_path):
+    source = str(tmp_path / "docs")
+    a = os.path.join(source, "a.md")
+    _write(a, "Alpha notes about widgets.")
+    other = os.path.join(str(tmp_path / "other"), "c.md")
+    # Chunks from before manifests existed: random IDs, no manifest on disk
+    collection = rag._get_collection(PROJECT_ID)
+    collection.upsert(
+        ids=["legacy-1", "legacy-2", "legacy-other"],
+        embeddings=rag.model.encode(["old alpha", "old beta", "other source"]).tolist(),
+        documents=["old alpha", "old beta", "other source"],
+        metadatas=[{"source": a, "project_id": PROJECT_ID},
+                   {"source": os.path.join(source, "gone.md"), "project_id": PROJECT_ID},
+                   {"source": other, "project_id": PROJECT_ID}],
+    )
+
+    rag.ingest_source(PROJECT_ID, source)
+    manifest = SourceManifest(rag.manifest_dir, PROJECT_ID, source, rag._chunking_signature())
+    assert _ids(rag) == set(manifest.chunk_ids(a, 1)) | {"legacy-other"}
+
+
+def test_watcher_paths_without_manifest_reindex_the_whole_source(rag, tmp_path):
+    source = str(tmp_path / "docs")
+    a, b = os.path.join(source, "a.md"), os.path.join(source, "b.md")
+    _write(a, "Alpha notes about widgets.")
+    _write(b, "Beta notes about gadgets.")
+    rag._get_collection(PROJECT_ID).upsert(
+        ids=["legacy-a", "legacy-b"],
+        embeddings=rag.model.encode(["old alpha", "old beta"]).tolist(),
+        documents=["old alpha", "old beta"],
+        metadatas=[{"source": a, "project_id": PROJECT_ID}, {"source": b, "project_id": PROJECT_ID}],
+    )
+
+    # Only `a` changed, but b's legacy chunk is replaced too, so b must be indexed as well
+    rag.ingest_source(PROJECT_ID, source, paths=[a])
+    manifest = SourceManifest(rag.manifest_dir, PROJECT_ID, source, rag._chunking_signature())
+    assert set(manifest.files) == {a, b}
+    assert _ids(rag) == set(manifest.chunk_ids(a, 1)) | set(manifest.chunk_ids(b, 1))
+
+
+def test_failed_run_keeps_the_files_it_completed(rag, tmp_path, monkeypatch):
+    import pytest
+
+    from config import settings
+    from services.embedding_executor import EmbeddingExecutor
+
+    # One chunk per upsert, so every file is written on its own
+    monkeypatch.setattr(settings, "INGEST_BATCH_SIZE", 1)
+    monkeypatch.setattr(EmbeddingExecutor, "preferred_request_size", 1)
+    source = str(tmp_path / "docs")
+    for name in "abcde":
+        _write(os.path.join(source, f"{name}.md"), f"Notes of {name}.")
+    collection = rag._get_collection(PROJECT_ID)
+    real_upsert = collection.upsert
+    upserts = []
+
+    def upsert(ids, embeddings, documents=None, metadatas=None):
+        # The third file fails to be written
+        upserts.append(metadatas[0]["source"])
+        if len(upserts) == 3:
+            raise OSError("disk full")
+        real_upsert(ids=ids, embeddings=embeddings, documents=documents, metadatas=metadatas)
+
+    monkeypatch.setattr(collection, "upsert", upsert)
+    with pytest.raises(OSError):
+        rag.ingest_source(PROJECT_ID, source)
+
+    saved = SourceManifest(rag.manifest_dir, PROJECT_ID, source, rag._chunking_signature())
+    assert set(saved.files) == set(upserts[:2])
+    written = set()
+    for file_path, entry in saved.files.items():
+        written |= set(saved.chunk_ids(file_path, entry["chunks"]))
+    assert written <= _ids(rag)
+
+    monkeypatch.setattr(collection, "upsert", real_upsert)
+    rag.ingest_source(PROJECT_ID, source)
+    assert _progress(rag, source)["files_parsed"] == 5 - len(saved.files)
+    assert len(_ids(rag)) == 5
@@ -0,0 +1,68 @@
+import os
+import sqlite3
+
+from services.bm25_index import BM25Index, reciprocal_rank_fusion, tokenize
+
+PROJECT_ID = 1
+
+
+def test_tokenize_keeps_unicode_words_and_splits_identifiers():
+    assert tokenize("Příliš žluťoučký kůň") == ["příliš", "žluťoučký", "kůň"]
+    assert tokenize("getUserById") == ["getuserbyid", "get", "user", "by", "id"]
+    assert tokenize("uložit_soubor") == ["uložit_soubor", "uložit", "soubor"]
+
+
+def test_bm25_matches_words_with_diacritics(tmp_path):
+    index = BM25Index.load(str(tmp_path / "lexical.db"))
+    index.add(["cz", "en", "code"], [
+        "Faktura za elektřinu je splatná do pátku.",
+        "The invoice for electricity is due on Friday.",
+        "def get_invoice(invoice_id): return db.invoices[invoice_id]",
+    ])
+    index.save()
+
+    assert [doc_id for doc_id, _ in index.search("elektřinu", 3)] == ["cz"]
+    # No accent folding: the unaccented spelling is a different word
+    assert index.search("elektrinu", 3) == []
+    assert index.search("invoice", 3)[0][0] == "code"
+
+    reloaded = BM25Index.load(index.path)
+    assert [doc_id for doc_id, _ in reloaded.search("splatná", 3)] == ["cz"]
+
+
+def test_index_from_an_older_tokenizer_is_dropped(tmp_path):
+    path = str(tmp_path / "lexical.db")
+    index = BM25Index.load(path)
+    index.add(["a"], ["old text"])
+    index.save()
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA user_version = 1")
+    conn.commit()
+    conn.close()
+
+    assert len(BM25Index.load(path)) == 0
+
+
+def test_reciprocal_rank_fusion_prefers_ids_ranked_by_both():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "d", "a"]])
+    assert [doc_id for doc_id, _ in fused] == ["b", "a", "d", "c"]
+
+
+def test_hybrid_search_adds_lexical_only_matches(rag, tmp_path):
+    source = str(tmp_path / "docs")
+    os.makedirs(source)
+    for name, text in (("cz.md", "Faktura za elektřinu je splatná do pátku."),
+                       ("en.md", "The invoice for electricity is due on Friday.")):
+        with open(os.path.join(source, name), "w") as f:
+            f.write(text)
+    rag.ingest_source(PROJECT_ID, source)
+
+    # No vector hits at all: the chunk comes from the lexical index only
+    collection = rag._get_collection(PROJECT_ID)
+    fused = rag._fuse_lexical(PROJECT_ID, collection, ["splatná elektřinu"], [[]], 2, 2)[0]
+    assert len(fused) == 1
+    assert fused[0]["metadata"]["source"].endswith("cz.md")
+    assert fused[0]["distance"] is None
+
+    hits = rag.query_project(PROJECT_ID, "splatná elektřinu", n_results=1)
+    assert hits[0]["metadata"]["source"].endswith("cz.md")
@@ -0,0 +1,126 @@
+import asyncio
+import json
+import threading
+import time
+
+import httpx
+
+from services.model_limiter import ModelLimiter
+from services.ollama_client import OllamaClient
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def _queued(limiter, model="m"):
+    return limiter.stats()["models"].get(model, {}).get("queued", 0)
+
+
+def test_threads_get_slots_in_arrival_order():
+    limiter = ModelLimiter(1)
+    order = []
+
+    def worker(i):
+        with limiter.slot("m"):
+            order.append(i)
+
+    with limiter.slot("m"):
+        threads = []
+        for i in range(5):
+            thread = threading.Thread(target=worker, args=(i,))
+            thread.start()
+            threads.append(thread)
+            _wait_for(lambda: _queued(limiter) == i + 1)
+    for thread in threads:
+        thread.join(5)
+    assert order == [0, 1, 2, 3, 4]
+    assert limiter.stats()["models"]["m"] == {"running": 0, "queued": 0}
+
+
+def test_limit_is_per_model_and_shared_by_threads_and_coroutines():
+    limiter = ModelLimiter(2)
+
+    async def main():
+        running, peak = [0], [0]
+
+        async def generation(model):
+            async with limiter.aslot(model):
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+                await asyncio.sleep(0.01)
+                running[0] -= 1
+
+        # A thread holds one of the two slots of "m" the whole time
+        held, release = threading.Event(), threading.Event()
+
+        def digest():
+            with limiter.slot("m"):
+                held.set()
+                release.wait(5)
+
+        thread = threading.Thread(target=digest)
+        thread.start()
+        held.wait(5)
+        await asyncio.gather(*(generation("m") for _ in range(6)), *(generation("other") for _ in range(2)))
+        release.set()
+        thread.join(5)
+        return peak[0]
+
+    # 1 free slot of "m" plus both slots of "other"
+    assert asyncio.run(main()) <= 3
+
+
+def test_coroutines_get_slots_in_arrival_order_and_cancelled_waiters_give_way():
+    limiter = ModelLimiter(1)
+    order = []
+
+    async def generation(i):
+        async with limiter.aslot("m"):
+            order.append(i)
+
+    async def main():
+        async with limiter.aslot("m"):
+            tasks = []
+            for i in range(4):
+                tasks.append(asyncio.create_task(generation(i)))
+                await asyncio.sleep(0)
+            assert _queued(limiter) == 4
+            tasks[1].cancel()
+            await asyncio.sleep(0)
+            assert _queued(limiter) == 3
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    asyncio.run(main())
+    assert order == [0, 2, 3]
+    assert limiter.stats()["models"]["m"] == {"running": 0, "queued": 0}
+
+
+def test_no_limit():
+    limiter = ModelLimiter(0)
+    with limiter.slot("m"), limiter.slot("m"), limiter.slot("m"):
+        assert limiter.stats()["models"]["m"] == {"running": 3, "queued": 0}
+
+
+def test_achat_streams_through_the_limiter():
+    def handler(request):
+        assert json.loads(request.content)["model"] == "fake"
+        lines = [{"message": {"role": "assistant", "content": word}, "done": False} for word in ("Hello", " there")]
+        lines.append({"message": {"role": "assistant", "content": ""}, "done": True})
+        return httpx.Response(200, content="".join(json.dumps(line) + "\n" for line in lines))
+
+    client = OllamaClient(max_concurrent_per_model=1)
+    client._async_client = httpx.AsyncClient(base_url="http://ollama", transport=httpx.MockTransport(handler))
+
+    async def main():
+        async def reply():
+            return "".join([token async for token in client.achat("fake", [{"role": "user", "content": "hi"}])])
+        replies = await asyncio.gather(reply(), reply())
+        await client.aclose()
+        return replies
+
+    assert asyncio.run(main()) == ["Hello there", "Hello there"]
+    assert client.stats()["models"]["fake"] == {"running": 0, "queued": 0}
@@ -0,0 +1,60 @@
+import os
+
+import pytest
+
+from services.document_parser import ParallelParser, ParseFailure
+
+
+def test_stuck_and_corrupt_files_fail_in_order(tmp_path):
+    if not hasattr(os, "mkfifo"):
+        pytest.skip("needs os.mkfifo")
+    # Opening a FIFO without a writer blocks, like a parser stuck on a hostile file
+    stuck = str(tmp_path / "stuck.pdf")
+    os.mkfifo(stuck)
+    corrupt = str(tmp_path / "corrupt.pdf")
+    with open(corrupt, "wb") as f:
+        f.write(b"not a pdf")
+    text = str(tmp_path / "notes.txt")
+    with open(text, "w") as f:
+        f.write("plain notes")
+
+    parser = ParallelParser(workers=2, timeout=1.0)
+    results = list(parser.imap([
+        ("stuck", stuck, ".pdf"),
+        ("removed", None, None),
+        ("corrupt", corrupt, ".pdf"),
+        ("text", text, ".txt"),
+    ]))
+
+    assert [payload for payload, _ in results] == ["stuck", "removed", "corrupt", "text"]
+    assert isinstance(results[0][1], ParseFailure)
+    assert results[0][1].reason == "parser timed out"
+    assert results[1][1] is None
+    assert isinstance(results[2][1], ParseFailure)
+    assert results[3][1] == "plain notes"
+    assert parser.parse_seconds >= 1.0
+
+
+def test_files_queued_behind_stuck_ones_still_parse(tmp_path):
+    if not hasattr(os, "mkfifo"):
+        pytest.skip("needs os.mkfifo")
+    from docx import Document
+
+    items = []
+    for i in range(2):
+        stuck = str(tmp_path / f"stuck{i}.pdf")
+        os.mkfifo(stuck)
+        items.append((f"stuck{i}", stuck, ".pdf"))
+    # More than the 2 * workers window: some are queued, some running when a stuck worker is killed
+    for i in range(6):
+        path = str(tmp_path / f"p{i}.docx")
+        document = Document()
+        document.add_paragraph(f"paragraph {i}")
+        document.save(path)
+        items.append((f"p{i}", path, ".docx"))
+
+    results = list(ParallelParser(workers=2, timeout=1.0).imap(items))
+
+    assert [payload for payload, _ in results] == [payload for payload, _, _ in items]
+    assert all(isinstance(text, ParseFailure) for _, text in results[:2])
+    assert [text for _, text in results[2:]] == [f"paragraph {i}" for i in range(6)]
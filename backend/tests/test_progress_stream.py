@@ -0,0 +1,49 @@
+import asyncio
+import json
+
+import pytest
+from fastapi import HTTPException
+
+import routers.knowledge as knowledge
+
+
+class FakeQuery:
+    def __init__(self, result):
+        self.result = result
+
+    def filter(self, *conditions):
+        return self
+
+    def first(self):
+        return self.result
+
+
+class FakeDB:
+    def __init__(self, result):
+        self.result = result
+
+    def query(self, model):
+        return FakeQuery(self.result)
+
+
+async def _events(response):
+    return [json.loads(chunk[len("data: "):]) async for chunk in response.body_iterator]
+
+
+def test_progress_streams_until_the_source_is_done(monkeypatch):
+    polls = iter([("indexing", {"files_parsed": 1}), ("indexing", {"files_parsed": 2}), ("ready", {"files_parsed": 3})])
+    monkeypatch.setattr(knowledge, "_poll_source", lambda source_id: next(polls))
+
+    async def main():
+        response = await knowledge.stream_source_progress(1, 7, interval=0.2, db=FakeDB(object()))
+        return await _events(response)
+
+    events = asyncio.run(main())
+    assert [event["status"] for event in events] == ["indexing", "indexing", "ready"]
+    assert events[-1] == {"source_id": 7, "status": "ready", "progress": {"files_parsed": 3}}
+
+
+def test_progress_of_a_missing_source_is_404():
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(knowledge.stream_source_progress(1, 7, db=FakeDB(None)))
+    assert error.value.status_code == 404
@@ -0,0 +1,205 @@
+import pytest
+
+from services.prompt_assembler import MIN_PART_TOKENS, TRUNCATION_MARK, PromptAssembler, PromptPart
+
+
+def _history(n, words=30):
+    """(id, role, content) of `n` messages with IDs 1..n, newest first."""
+    messages = [(i, "user" if i % 2 else "assistant", f"message {i} " + "word " * words) for i in range(1, n + 1)]
+    return list(reversed(messages))
+
+
+def _tokens(assembler, messages):
+    return sum(assembler.count(message["content"]) for message in messages)
+
+
+def test_everything_fits():
+    assembler = PromptAssembler()
+    messages, window_start = assembler.assemble(
+        4000, [PromptPart("You are Jarvis.", required=True)], [PromptPart("Retrieved context.")],
+        _history(4), "What next?", summary="Earlier, the user asked about invoices.",
+    )
+    assert window_start is None
+    assert [m["role"] for m in messages] == ["system", "system", "user", "assistant", "user", "assistant", "system", "user"]
+    assert messages[1]["content"].endswith("invoices.")
+    assert messages[-2]["content"] == "Retrieved context."
+    assert messages[-1]["content"] == "What next?"
+
+
+@pytest.mark.parametrize("budget", [300, 600, 1200, 2400])
+def test_prompt_stays_within_budget_and_keeps_required_parts(budget):
+    assembler = PromptAssembler()
+    system = [PromptPart("You are Jarvis.", required=True), PromptPart("Notes: " + "note " * 40, required=True)]
+    context = [PromptPart("Web results: " + "result " * 2000), PromptPart("Files: " + "chunk " * 2000, max_tokens=200)]
+    messages, window_start = assembler.assemble(budget, system, context, _history(40), "Question " + "why " * 100)
+
+    assert _tokens(assembler, messages) <= budget
+    contents = [m["content"] for m in messages]
+    assert contents[0] == "You are Jarvis."
+    assert contents[1].startswith("Notes: ")
+    assert contents[-1].startswith("Question")
+    # The latest exchange is always kept; older history only as far as the budget reaches
+    assert any(c.startswith("message 40 ") for c in contents) and any(c.startswith("message 39 ") for c in contents)
+    assert window_start is not None
+    for content in contents:
+        if content.startswith("Files: "):
+            assert assembler.count(content) <= 200
+            assert content.endswith(TRUNCATION_MARK)
+
+
+def test_optional_part_is_dropped_rather_than_cut_to_a_stub():
+    assembler = PromptAssembler()
+    budget = 200
+    system = PromptPart("system " * 80, required=True)
+    messages, _ = assembler.assemble(budget, [system], [PromptPart("context " * 500)], [], "Why?")
+    assert budget - assembler.count(system.content) - assembler.count("Why?") < MIN_PART_TOKENS
+    assert [m["content"] for m in messages] == [system.content, "Why?"]
+
+
+def test_window_moves_in_aligned_steps_and_keeps_the_prefix_stable():
+    assembler = PromptAssembler()
+    system = [PromptPart("You are Jarvis.", required=True)]
+    history = _history(60)
+    budget = 1500
+    align = 4
+
+    previous = None
+    for turn in range(6):
+        # Every turn adds an exchange to the chat
+        current_history = history[len(history) - 40 - 2 * turn:]
+        messages, window_start = assembler.assemble(
+            budget, system, [PromptPart(f"Context of turn {turn}")], current_history, f"Question {turn}",
+            history_count=len(current_history), align=align,
+        )
+        assert _tokens(assembler, messages) <= budget
+        oldest = current_history[-1][0]
+        assert window_start is not None
+        assert (window_start - oldest) % align == 0
+        kept = [m["content"] for m in messages[:-2]]
+        if previous is not None and previous[0] == window_start:
+            # Same window: the previous prompt (up to its per-turn part) is a prefix of this one
+            assert kept[:len(previous[1])] == previous[1]
+        previous = (window_start, kept)
+
+
+@pytest.fixture
+def chat_service(tmp_path, monkeypatch):
+    """A ChatService on a throwaway database, with a mocked Ollama client."""
+    # chat_service pulls in the analysis and web tools
+    for module in ("pandas", "matplotlib", "seaborn", "bs4"):
+        pytest.importorskip(module)
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    import database
+    from services.chat_service import ChatService
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'jarvis.db'}", connect_args={"check_same_thread": False})
+    database.Base.metadata.create_all(bind=engine)
+    monkeypatch.setattr(database, "SessionLocal", sessionmaker(autocommit=False, autoflush=False, bind=engine))
+    service = ChatService()
+    service.ollama_client = FakeOllama()
+    return service
+
+
+class FakeOllama:
+    def __init__(self, context_window=4096, replies=None):
+        self.window = context_window
+        self.replies = replies
+        self.prompts = []
+
+    def context_window(self, model):
+        return self.window
+
+    def chat(self, model, messages, stream=True, **kwargs):
+        self.prompts.append(messages[-1]["content"])
+        reply = self.replies.pop(0) if self.replies else f"summary {len(self.prompts)}"
+        yield from reply.split(" ")[:1] + [" " + word for word in reply.split(" ")[1:]]
+
+
+def _chat(n_messages, words=10):
+    import database
+    import models
+
+    db = database.SessionLocal()
+    chat = models.Chat(project_id=1)
+    db.add(chat)
+    db.commit()
+    for i in range(n_messages):
+        db.add(models.Message(chat_id=chat.id, role="user" if i % 2 == 0 else "assistant",
+                              content=f"message {i} " + "word " * words))
+    db.commit()
+    ids = [m.id for m in db.query(models.Message).filter(models.Message.chat_id == chat.id).order_by(models.Message.id)]
+    db.close()
+    return chat.id, ids
+
+
+def _load_chat(chat_id):
+    import database
+    import models
+
+    db = database.SessionLocal()
+    try:
+        return db.query(models.Chat).filter(models.Chat.id == chat_id).first()
+    finally:
+        db.close()
+
+
+def test_prompt_budget_keeps_room_for_the_reply(chat_service, monkeypatch):
+    from config import settings
+    from services.chat_service import CHAT_RESPONSE_TOKENS, OLLAMA_DEFAULT_NUM_CTX
+
+    chat_service.ollama_client.window = 8192
+    assert chat_service._prompt_budget("m") == 8192 - CHAT_RESPONSE_TOKENS
+    # A small window still leaves half of it for the prompt
+    chat_service.ollama_client.window = CHAT_RESPONSE_TOKENS
+    assert chat_service._prompt_budget("m") == CHAT_RESPONSE_TOKENS // 2
+    # No window from the model nor the settings: Ollama's default
+    chat_service.ollama_client.window = None
+    monkeypatch.setattr(settings, "OLLAMA_NUM_CTX", 0)
+    assert chat_service._prompt_budget("m") == max(OLLAMA_DEFAULT_NUM_CTX - CHAT_RESPONSE_TOKENS,
+                                                   OLLAMA_DEFAULT_NUM_CTX // 2)
+
+
+def test_summary_folds_only_messages_before_the_window(chat_service):
+    chat_id, ids = _chat(12)
+    chat_service._update_summary(chat_id, "m", window_start=ids[8])
+
+    chat = _load_chat(chat_id)
+    assert chat.summary == "summary 1"
+    assert chat.summary_message_id == ids[7]
+    prompt = chat_service.ollama_client.prompts[0]
+    assert "(none yet)" in prompt
+    assert "message 7 " in prompt and "message 8 " not in prompt
+
+    # Next time only what is new since the summary is folded in, on top of it
+    chat_service._update_summary(chat_id, "m", window_start=ids[11])
+    assert _load_chat(chat_id).summary_message_id == ids[7]
+    chat_service._update_summary(chat_id, "m", window_start=ids[11] + 1)
+    prompt = chat_service.ollama_client.prompts[1]
+    assert "summary 1" in prompt and "message 7 " not in prompt and "message 11 " in prompt
+    assert _load_chat(chat_id).summary_message_id == ids[11]
+
+
+def test_summary_runs_in_rounds_that_fit_the_model(chat_service):
+    from services.chat_service import CHAT_RESPONSE_TOKENS
+
+    chat_service.ollama_client.window = CHAT_RESPONSE_TOKENS + 400
+    chat_id, ids = _chat(40, words=60)
+    chat_service._update_summary(chat_id, "m", window_start=ids[-1] + 1)
+
+    prompts = chat_service.ollama_client.prompts
+    assert len(prompts) > 1
+    budget = chat_service._prompt_budget("m") // 2
+    assert all(chat_service.assembler.count(p.split("New messages:")[1]) <= budget for p in prompts)
+    assert f"summary {len(prompts) - 1}" in prompts[-1]
+    assert _load_chat(chat_id).summary_message_id == ids[-1]
+
+
+def test_failed_summary_leaves_the_chat_unchanged(chat_service):
+    chat_service.ollama_client.replies = ["Error: Failed to communicate with Ollama"]
+    chat_id, ids = _chat(12)
+    chat_service._update_summary(chat_id, "m", window_start=ids[8])
+
+    chat = _load_chat(chat_id)
+    assert chat.summary is None and chat.summary_message_id is None